@@ -0,0 +1,191 @@
+"""Local cache for the Excalidraw bundle and fonts used by render_template.html.
+
+The template imports a pinned ``@excalidraw/excalidraw`` build from esm.sh,
+and exported SVGs pull fonts from the network. ``AssetCache`` sits in front
+of the requests a render page makes to those origins (``ASSET_ORIGINS``)
+and serves them from ``vendor/`` when a recorded copy exists, so warm-up is
+a disk read and renders work without network access. Requests to any other
+origin are left to the browser, not proxied through Python.
+
+    uv run python render_excalidraw.py --vendor-assets   # record once (needs network)
+    uv run python render_excalidraw.py a.excalidraw --offline
+
+``vendor/manifest.json`` records the pinned version and a sha256 per URL.
+Bodies are re-hashed before they are served; a mismatch is an error, not a
+silent network fallback.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+VENDOR_DIR = Path(__file__).parent / "vendor"
+TEMPLATE_PATH = Path(__file__).parent / "render_template.html"
+
+# The pinned bundle (and the modules it imports) on esm.sh, Excalidraw's font
+# asset path on unpkg, and the font URLs exported SVGs embed
+ASSET_ORIGINS = ("https://esm.sh/", "https://unpkg.com/", "https://excalidraw.com/")
+
+# Headers that describe the original transfer, not the body we hand back
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class AssetIntegrityError(Exception):
+    """A vendored asset is missing, stale or doesn't match its recorded hash."""
+
+
+def pinned_version(template_path: Path = TEMPLATE_PATH) -> str | None:
+    """The ``@excalidraw/excalidraw@<version>`` pinned in the render template."""
+    match = re.search(r"@excalidraw/excalidraw@([\w.\-]+)", template_path.read_text(encoding="utf-8"))
+    return match.group(1) if match else None
+
+
+class AssetCache:
+    """Serves recorded http(s) responses to Playwright pages from local disk.
+
+    ``record=True`` fetches misses from the network and stores them;
+    ``offline=True`` aborts misses instead of letting them hit the network. Only
+    ``ASSET_ORIGINS`` are routed through the cache.
+    """
+
+    def __init__(self, root: Path = VENDOR_DIR, offline: bool = False, record: bool = False) -> None:
+        self.root = root
+        self.offline = offline
+        self.record = record
+        self.version = pinned_version()
+        self.misses: list[str] = []
+        self.failures: list[str] = []
+        self._entries: dict[str, dict] = {}
+        # Verified bodies, so each asset is hashed once per process
+        self._bodies: dict[str, bytes] = {}
+        self._load()
+
+    def _load(self) -> None:
+        manifest_path = self.root / "manifest.json"
+        if not manifest_path.exists():
+            return
+        try:
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            if not isinstance(manifest, dict):
+                raise ValueError("not a JSON object")
+        except ValueError as e:
+            if self.record:
+                # About to re-record; start from scratch
+                print(f"Ignoring unreadable {manifest_path}: {e}", file=sys.stderr)
+                return
+            raise AssetIntegrityError(
+                f"Vendored asset manifest {manifest_path} is corrupt ({e}). Re-run with --vendor-assets."
+            ) from e
+        if manifest.get("version") != self.version:
+            if self.offline and not self.record:
+                raise AssetIntegrityError(
+                    f"Vendored assets are for Excalidraw {manifest.get('version')}, "
+                    f"template pins {self.version}. Re-run with --vendor-assets."
+                )
+            print(
+                f"Ignoring vendored assets for Excalidraw {manifest.get('version')} (template pins {self.version})",
+                file=sys.stderr,
+            )
+            return
+        self._entries = manifest.get("assets", {})
+
+    def save(self) -> Path:
+        """Write the manifest. Only meaningful after a recording session."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        manifest_path = self.root / "manifest.json"
+        manifest = {"version": self.version, "assets": dict(sorted(self._entries.items()))}
+        manifest_path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        return manifest_path
+
+    def problems(self) -> list[str]:
+        """Integrity failures and offline misses seen so far, for error messages."""
+        return self.failures + [f"Not vendored (offline): {url}" for url in self.misses]
+
+    def install(self, page) -> None:
+        """Route a sync-API ``page``'s requests to ``ASSET_ORIGINS`` through the cache."""
+        for origin in ASSET_ORIGINS:
+            page.route(origin + "**", self._handle)
+
+    async def install_async(self, page) -> None:
+        """Route an async-API ``page``'s requests to ``ASSET_ORIGINS`` through the cache."""
+        for origin in ASSET_ORIGINS:
+            await page.route(origin + "**", self._handle_async)
+
+    def _body(self, url: str) -> bytes:
+        body = self._bodies.get(url)
+        if body is not None:
+            return body
+        entry = self._entries[url]
+        path = self.root / entry["sha256"]
+        try:
+            body = path.read_bytes()
+        except OSError as e:
+            raise AssetIntegrityError(f"Vendored asset missing for {url}: {path}") from e
+        if hashlib.sha256(body).hexdigest() != entry["sha256"]:
+            raise AssetIntegrityError(f"Vendored asset for {url} fails its sha256 check: {path}")
+        self._bodies[url] = body
+        return body
+
+    def _decide(self, url: str) -> tuple[str, object]:
+        """What to do with a request: ("continue"|"fulfill"|"abort"|"fetch", detail)."""
+        if not url.startswith(("http://", "https://")):
+            return "continue", None
+
+        if url in self._entries:
+            entry = self._entries[url]
+            try:
+                body = self._body(url)
+            except AssetIntegrityError as e:
+                self.failures.append(str(e))
+                return "abort", "failed"
+            return "fulfill", {"status": entry["status"], "headers": entry["headers"], "body": body}
+
+        if self.offline and not self.record:
+            self.misses.append(url)
+            return "abort", "internetdisconnected"
+
+        return "fetch", None
+
+    def _store(self, url: str, status: int, headers: dict, body: bytes) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / digest).write_bytes(body)
+        headers = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        self._entries[url] = {"sha256": digest, "status": status, "headers": headers}
+        self._bodies[url] = body
+
+    def _handle(self, route) -> None:
+        url = route.request.url
+        action, detail = self._decide(url)
+        if action == "continue":
+            route.continue_()
+        elif action == "abort":
+            route.abort(detail)
+        elif action == "fulfill":
+            route.fulfill(**detail)
+        else:
+            response = route.fetch()
+            body = response.body()
+            if self.record and response.ok:
+                self._store(url, response.status, response.headers, body)
+            route.fulfill(response=response, body=body)
+
+    async def _handle_async(self, route) -> None:
+        url = route.request.url
+        action, detail = self._decide(url)
+        if action == "continue":
+            await route.continue_()
+        elif action == "abort":
+            await route.abort(detail)
+        elif action == "fulfill":
+            await route.fulfill(**detail)
+        else:
+            response = await route.fetch()
+            body = await response.body()
+            if self.record and response.ok:
+                self._store(url, response.status, response.headers, body)
+            await route.fulfill(response=response, body=body)
@@ -0,0 +1,350 @@
+"""Benchmark: how the renderer scales with diagram size and content.
+
+Generates synthetic diagrams of four kinds at several element counts and
+times each stage of the pipeline on them:
+
+- ``shapes``: a grid of rectangles, ellipses and diamonds with bound labels
+- ``arrows``: a grid of boxes meshed by bound arrows to their right and lower neighbours
+- ``text``: free-standing multi-line text blocks
+- ``images``: image elements backed by large embedded ``files`` payloads
+
+Stages are ``load`` (read + validate, streaming for big files), ``bbox``
+(viewport from the rotation-aware boxes), ``lint``, ``native`` (in-process
+SVG export, where supported) and ``render`` (the Playwright path, one warm
+session for all cases; skip it with ``--no-render``). For each stage the
+best of ``--repeat`` runs is recorded with its throughput in elements per
+second and, for the in-process stages, the peak Python heap
+(tracemalloc). Results are one JSON document, suitable as a baseline:
+
+    uv run python bench_render.py --out baseline.json
+    uv run python bench_render.py --compare baseline.json    # exit 1 on regressions
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from diagram_lint import lint_diagram
+from render_excalidraw import RenderError, RenderSession, compute_viewport, load_diagram
+from render_metrics import RenderMetrics
+from svg_export import export_svg, unsupported_reasons
+
+KINDS = ("shapes", "arrows", "text", "images")
+DEFAULT_SIZES = (10, 100, 1000, 5000, 20000)
+
+# Grid pitch of the synthetic layouts (px)
+_PITCH_X, _PITCH_Y = 220, 140
+# Distinct embedded files in an ``images`` diagram, and the size of each
+_IMAGE_FILES = 40
+_IMAGE_BYTES = 256 * 1024
+
+# A stage this much slower than the baseline is a regression
+DEFAULT_THRESHOLD = 1.25
+
+
+def _element(rng: random.Random, el_id: str, el_type: str, x: float, y: float, w: float, h: float) -> dict:
+    return {
+        "id": el_id,
+        "type": el_type,
+        "x": x,
+        "y": y,
+        "width": w,
+        "height": h,
+        "angle": 0,
+        "strokeColor": "#1e1e1e",
+        "backgroundColor": rng.choice(["#a5d8ff", "#b2f2bb", "#ffec99", "transparent"]),
+        "fillStyle": rng.choice(["solid", "hachure"]),
+        "strokeWidth": 2,
+        "strokeStyle": "solid",
+        "roughness": 1,
+        "opacity": 100,
+        "seed": rng.randrange(1, 2**31),
+        "version": 1,
+        "versionNonce": rng.randrange(1, 2**31),
+        "isDeleted": False,
+        "groupIds": [],
+        "boundElements": [],
+        "roundness": None,
+        "locked": False,
+    }
+
+
+def _text(rng: random.Random, el_id: str, x: float, y: float, text: str, container_id: str | None = None) -> dict:
+    lines = text.split("\n")
+    el = _element(rng, el_id, "text", x, y, max(len(line) for line in lines) * 10, len(lines) * 25)
+    el.update({
+        "backgroundColor": "transparent",
+        "text": text,
+        "originalText": text,
+        "fontSize": 20,
+        "fontFamily": 1,
+        "textAlign": "center" if container_id else "left",
+        "verticalAlign": "middle" if container_id else "top",
+        "containerId": container_id,
+        "lineHeight": 1.25,
+    })
+    return el
+
+
+def _grid(count: int) -> tuple[int, int]:
+    cols = max(1, math.ceil(math.sqrt(count)))
+    return cols, math.ceil(count / cols)
+
+
+def _shapes(rng: random.Random, count: int) -> list[dict]:
+    # Each node is a shape plus its label
+    nodes = max(1, count // 2)
+    cols, _ = _grid(nodes)
+    elements = []
+    for i in range(nodes):
+        x, y = (i % cols) * _PITCH_X, (i // cols) * _PITCH_Y
+        shape = _element(rng, f"s{i}", rng.choice(["rectangle", "ellipse", "diamond"]), x, y, 180, 100)
+        label = _text(rng, f"s{i}_t", x + 40, y + 37, f"Node {i}", container_id=shape["id"])
+        shape["boundElements"].append({"id": label["id"], "type": "text"})
+        elements += [shape, label]
+    return elements
+
+
+def _arrows(rng: random.Random, count: int) -> list[dict]:
+    # n boxes carry up to 2n arrows, so a third of the budget goes to boxes
+    nodes = max(2, count // 3)
+    cols, _ = _grid(nodes)
+    boxes = [
+        _element(rng, f"b{i}", "rectangle", (i % cols) * _PITCH_X, (i // cols) * _PITCH_Y, 160, 80)
+        for i in range(nodes)
+    ]
+    arrows = []
+    for i, start in enumerate(boxes):
+        for j in (i + 1 if (i + 1) % cols else None, i + cols):
+            if j is None or j >= nodes or len(boxes) + len(arrows) >= count:
+                continue
+            end = boxes[j]
+            sx, sy = start["x"] + 160, start["y"] + 40
+            ex, ey = end["x"], end["y"] + 40
+            if j == i + cols:
+                sx, sy, ex, ey = start["x"] + 80, start["y"] + 80, end["x"] + 80, end["y"]
+            arrow = _element(rng, f"a{i}_{j}", "arrow", sx, sy, ex - sx, ey - sy)
+            arrow.update({
+                "backgroundColor": "transparent",
+                "points": [[0, 0], [ex - sx, ey - sy]],
+                "startBinding": {"elementId": start["id"], "focus": 0, "gap": 1},
+                "endBinding": {"elementId": end["id"], "focus": 0, "gap": 1},
+                "startArrowhead": None,
+                "endArrowhead": "arrow",
+            })
+            start["boundElements"].append({"id": arrow["id"], "type": "arrow"})
+            end["boundElements"].append({"id": arrow["id"], "type": "arrow"})
+            arrows.append(arrow)
+    return boxes + arrows
+
+
+def _texts(rng: random.Random, count: int) -> list[dict]:
+    words = ["render", "diagram", "element", "arrow", "layout", "browser", "cache", "scene", "export", "font"]
+    cols, _ = _grid(count)
+    elements = []
+    for i in range(count):
+        lines = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 7))) for _ in range(rng.randint(2, 5))]
+        elements.append(_text(rng, f"t{i}", (i % cols) * _PITCH_X * 2, (i // cols) * _PITCH_Y, "\n".join(lines)))
+    return elements
+
+
+def _images(rng: random.Random, count: int) -> tuple[list[dict], dict]:
+    cols, _ = _grid(count)
+    files = {}
+    for f in range(min(count, _IMAGE_FILES)):
+        payload = base64.b64encode(rng.randbytes(_IMAGE_BYTES * 3 // 4)).decode("ascii")
+        files[f"file{f}"] = {
+            "id": f"file{f}",
+            "mimeType": "image/png",
+            "dataURL": f"data:image/png;base64,{payload}",
+            "created": 0,
+        }
+    elements = []
+    for i in range(count):
+        el = _element(rng, f"i{i}", "image", (i % cols) * _PITCH_X, (i // cols) * _PITCH_Y, 180, 120)
+        el.update({"fileId": f"file{i % len(files)}", "status": "saved", "scale": [1, 1]})
+        elements.append(el)
+    return elements, files
+
+
+def synthetic_diagram(kind: str, count: int, seed: int = 0) -> dict:
+    """A valid diagram of ``kind`` (see KINDS) with about ``count`` elements."""
+    rng = random.Random(seed)
+    files: dict = {}
+    if kind == "shapes":
+        elements = _shapes(rng, count)
+    elif kind == "arrows":
+        elements = _arrows(rng, count)
+    elif kind == "text":
+        elements = _texts(rng, count)
+    elif kind == "images":
+        elements, files = _images(rng, count)
+    else:
+        raise ValueError(f"unknown diagram kind {kind!r}")
+    return {
+        "type": "excalidraw",
+        "version": 2,
+        "source": "bench_render.py",
+        "elements": elements,
+        "appState": {"viewBackgroundColor": "#ffffff", "gridSize": None},
+        "files": files,
+    }
+
+
+def _measure(fn, repeat: int, elements: int, trace: bool = True) -> dict:
+    """Best-of-``repeat`` seconds, throughput and (with ``trace``) peak Python heap of ``fn()``."""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    stage = {"seconds": round(best, 5), "elements_per_s": round(elements / best) if best > 0 else None}
+    if trace:
+        # tracemalloc slows allocation-heavy code several times over, so the heap is measured in a separate run
+        tracemalloc.start()
+        try:
+            fn()
+            stage["peak_heap_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return stage
+
+
+def bench_case(
+    kind: str,
+    count: int,
+    work_dir: Path,
+    repeat: int = 3,
+    session: RenderSession | None = None,
+    scale: int = 1,
+) -> dict:
+    """Time every stage on one synthetic diagram. ``session=None`` skips the browser render."""
+    data = synthetic_diagram(kind, count)
+    path = work_dir / f"{kind}_{count}.excalidraw"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    elements = len(data["elements"])
+    del data
+
+    stages = {"load": _measure(lambda: load_diagram(path), repeat, elements)}
+    loaded = load_diagram(path)
+    stages["bbox"] = _measure(lambda: compute_viewport(loaded), repeat, elements)
+    stages["lint"] = _measure(lambda: lint_diagram(loaded), repeat, elements)
+    if not unsupported_reasons(loaded):
+        stages["native"] = _measure(lambda: export_svg(loaded), repeat, elements)
+    if session is not None:
+        out = path.with_suffix(".png")
+        # The first render warms the page for this scale; only steady-state renders count
+        session.render(path, out, scale=scale)
+        stages["render"] = _measure(lambda: session.render(path, out, scale=scale), repeat, elements, trace=False)
+        stages["render"]["output_bytes"] = out.stat().st_size
+
+    return {
+        "kind": kind,
+        "elements": elements,
+        "file_bytes": path.stat().st_size,
+        "viewport": list(compute_viewport(loaded)),
+        "stages": stages,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Stages at least ``threshold`` times slower than in ``baseline``, as report lines."""
+    previous = {(c["kind"], c["elements"]): c["stages"] for c in baseline.get("cases", [])}
+    regressions = []
+    for case in results["cases"]:
+        before = previous.get((case["kind"], case["elements"]))
+        if before is None:
+            continue
+        for stage, now in case["stages"].items():
+            old = before.get(stage)
+            if not old or not old["seconds"]:
+                continue
+            ratio = now["seconds"] / old["seconds"]
+            if ratio >= threshold:
+                regressions.append(
+                    f"{case['kind']}/{case['elements']} {stage}: {old['seconds'] * 1000:.1f} ms -> "
+                    f"{now['seconds'] * 1000:.1f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def _print_case(case: dict) -> None:
+    parts = [f"{name} {stage['seconds'] * 1000:8.1f} ms" for name, stage in case["stages"].items()]
+    print(f"{case['kind']:>7} {case['elements']:>6}  " + "  ".join(parts), file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the renderer on synthetic diagrams")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Element counts (default: 10 100 1000 5000 20000)")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS), help="Diagram kinds (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the best is reported (default: 3)")
+    parser.add_argument("--scale", type=int, default=1, help="Device scale factor for the render stage (default: 1)")
+    parser.add_argument("--no-render", action="store_true", help="Skip the browser render stage")
+    parser.add_argument("--offline", action="store_true", help="Render from vendored assets only")
+    parser.add_argument("--out", type=Path, default=None, help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", type=Path, default=None, metavar="BASELINE",
+                        help="Report stages slower than in this earlier results file; exit 1 if any")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Slowdown ratio counted as a regression (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--keep", type=Path, default=None, metavar="DIR",
+                        help="Write the synthetic diagrams (and renders) here instead of a temp dir")
+    args = parser.parse_args()
+
+    metrics = RenderMetrics()
+    cases = []
+    with tempfile.TemporaryDirectory(prefix="excalidraw-bench-") as tmp:
+        work_dir = args.keep or Path(tmp)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        session = None if args.no_render else RenderSession(offline=args.offline, metrics=metrics)
+        try:
+            for kind in args.kinds:
+                for count in args.sizes:
+                    case = bench_case(kind, count, work_dir, args.repeat, session, args.scale)
+                    cases.append(case)
+                    _print_case(case)
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if session is not None:
+                session.close()
+
+    process = metrics.as_dict()
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "scale": args.scale,
+        "cases": cases,
+        "peak_rss_bytes": process["peak_rss_bytes"],
+        "peak_child_rss_bytes": process["peak_child_rss_bytes"],
+    }
+    text = json.dumps(results, indent=2)
+    if args.out is None:
+        print(text)
+    else:
+        args.out.write_text(text + "\n", encoding="utf-8")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than {args.threshold:g}x the baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
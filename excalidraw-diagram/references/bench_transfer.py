@@ -0,0 +1,183 @@
+"""Benchmark: getting diagram data into the page.
+
+Compares three ways in:
+
+- ``literal``: the old injection, the diagram spliced into the evaluated
+  source as a JS object literal;
+- ``argument``: ``RENDER_JS`` for diagrams loaded in memory, the diagram as a
+  single JSON string argument that is ``JSON.parse``d in the page;
+- ``streamed``: ``RENDER_JS`` for big files (see diagram_stream.py), where
+  the JSON argument leaves the image payloads out and the page fetches each
+  one from the ``files_url`` route, served from the file on disk.
+
+Each case measures one ``page.evaluate`` call end to end: building the
+payload in Python, the Playwright pipe, any route round trips, and parsing
+in V8. Payloads are made unique per run so V8's compilation cache can't help.
+
+The synthetic diagrams are roughly half elements and half one embedded
+base64 image, like a real diagram with a screenshot pasted in.
+
+    uv run python bench_transfer.py [--sizes 1 10 100] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from diagram_stream import load_streaming
+from render_excalidraw import SETUP_HINT, close_diagram, file_response, files_url_for, render_args
+
+MB = 1024 * 1024
+
+# Legacy injection, kept only for comparison
+_LITERAL_JS = "void (window.__bench = {})"
+# RENDER_JS minus the render call
+_ARGUMENT_JS = "([json, options]) => { window.__bench = JSON.parse(json); }"
+# RENDER_JS minus the render call, with the template's on-demand file fetch
+_STREAMED_JS = """async ([json, options]) => {
+  const data = JSON.parse(json);
+  await Promise.all(
+    Object.entries(data.files || {})
+      .filter(([, file]) => !file.dataURL)
+      .map(async ([id, file]) => {
+        const resp = await fetch(options.filesUrl + encodeURIComponent(id));
+        if (!resp.ok) throw new Error(`Could not load file ${id} (HTTP ${resp.status})`);
+        file.dataURL = await resp.text();
+      })
+  );
+  window.__bench = data;
+}"""
+
+
+def synthetic_diagram(size_bytes: int, seed: int = 0) -> dict:
+    """A valid diagram of about ``size_bytes`` of JSON, half elements and half image payload."""
+    rng = random.Random(seed)
+    elements = []
+    size = 0
+    while size < size_bytes // 2:
+        i = len(elements)
+        el = {
+            "id": f"el_{i}",
+            "type": rng.choice(["rectangle", "ellipse", "diamond", "text"]),
+            "x": rng.uniform(0, 5000),
+            "y": rng.uniform(0, 5000),
+            "width": 160,
+            "height": 80,
+            "angle": 0,
+            "strokeColor": "#1e1e1e",
+            "backgroundColor": "#a5d8ff",
+            "fillStyle": "solid",
+            "strokeWidth": 2,
+            "roughness": 1,
+            "opacity": 100,
+            "seed": rng.randrange(1, 2**31),
+            "version": 1,
+            "versionNonce": rng.randrange(1, 2**31),
+            "groupIds": [],
+            "boundElements": [],
+        }
+        if el["type"] == "text":
+            el.update({"text": f"Label {i}", "fontSize": 20, "fontFamily": 1})
+        elements.append(el)
+        size += len(json.dumps(el))
+
+    payload = base64.b64encode(rng.randbytes(max(0, size_bytes - size) * 3 // 4)).decode("ascii")
+    return {
+        "type": "excalidraw",
+        "version": 2,
+        "elements": elements,
+        "appState": {"viewBackgroundColor": "#ffffff"},
+        "files": {"img": {"id": "img", "mimeType": "image/png", "dataURL": f"data:image/png;base64,{payload}"}},
+    }
+
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for run in range(repeat):
+        start = time.perf_counter()
+        fn(run)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark diagram transfer into the render page")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Diagram sizes in MB (default: 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the best is reported (default: 3)")
+    args = parser.parse_args()
+
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        print(f"ERROR: playwright not installed.\n{SETUP_HINT}", file=sys.stderr)
+        sys.exit(1)
+
+    rows = []
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.launch(headless=True)
+        except Exception as e:
+            if "Executable doesn't exist" in str(e) or "browserType.launch" in str(e):
+                print(f"ERROR: Chromium not installed for Playwright.\n{SETUP_HINT}", file=sys.stderr)
+                sys.exit(1)
+            raise
+        page = browser.new_page()
+        tmp_dir = tempfile.TemporaryDirectory(prefix="bench-transfer-")
+        for size_mb in args.sizes:
+            data = synthetic_diagram(size_mb * MB)
+            source_path = Path(tmp_dir.name) / f"{size_mb}mb.excalidraw"
+            source_path.write_text(json.dumps(data), encoding="utf-8")
+            streamed_data = load_streaming(source_path)
+
+            def literal(run: int) -> None:
+                source = json.dumps(data) + " " * run
+                page.evaluate(_LITERAL_JS.format(source))
+
+            def argument(run: int) -> None:
+                json_str, _ = render_args(data)
+                page.evaluate(_ARGUMENT_JS, [json_str + " " * run, None])
+
+            def streamed(run: int) -> None:
+                # Same route and fetch as RenderSession.start_render; a fresh URL per run
+                files_url = files_url_for(streamed_data)
+                page.route(
+                    files_url + "*",
+                    lambda route: route.fulfill(**file_response(streamed_data, files_url, route.request.url)),
+                )
+                try:
+                    json_str, options = render_args(streamed_data, files_url=files_url)
+                    page.evaluate(_STREAMED_JS, [json_str + " " * run, options])
+                finally:
+                    page.unroute(files_url + "*")
+
+            literal_s = _best(literal, args.repeat)
+            argument_s = _best(argument, args.repeat)
+            streamed_s = _best(streamed, args.repeat)
+            close_diagram(streamed_data)
+            rows.append({
+                "mb": size_mb,
+                "literal_s": round(literal_s, 4),
+                "argument_s": round(argument_s, 4),
+                "streamed_s": round(streamed_s, 4),
+            })
+            page.evaluate("window.__bench = null")
+            print(
+                f"{size_mb:>5} MB  literal {literal_s * 1000:9.1f} ms  argument {argument_s * 1000:9.1f} ms"
+                f"  ({literal_s / argument_s:.1f}x)  streamed {streamed_s * 1000:9.1f} ms",
+                file=sys.stderr,
+            )
+        browser.close()
+        tmp_dir.cleanup()
+
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Browser-free layout lint for .excalidraw files.
+
+Catches the layout bugs the render-view-fix loop usually finds by eye:
+
+- shapes (and free-standing text) that partly overlap each other
+- bound text that spills out of its container
+- arrows and lines that cut through a shape they aren't connected to
+
+Element boxes come from geometry.element_boxes and go into a uniform grid
+index, so each element is only compared with its spatial neighbours and a
+lint pass stays near-linear in the number of elements. The few elements far
+larger than the grid cell are kept out of the grid and compared with every
+element instead. Text extents are
+estimated from the font size and character count, since the declared
+``width``/``height`` of hand-written text is often stale; treat text
+findings as hints rather than guarantees.
+
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --lint
+"""
+
+from __future__ import annotations
+
+import math
+from collections import defaultdict
+from collections.abc import Iterator
+
+from geometry import LINEAR_TYPES, element_boxes
+
+# Types whose overlap with each other is worth reporting
+SHAPE_TYPES = {"rectangle", "ellipse", "diamond", "image", "text"}
+
+# Average glyph width as a fraction of fontSize, per fontFamily (1 Virgil, 2 Helvetica, 3 Cascadia)
+_GLYPH_WIDTH = {1: 0.5, 2: 0.45, 3: 0.6}
+_DEFAULT_LINE_HEIGHT = 1.25
+
+# Overlaps and crossings thinner than this (px) are touching edges, not bugs
+TOLERANCE = 2.0
+
+# A box spanning more grid cells than this is checked against everything instead
+MAX_CELLS_PER_BOX = 64
+
+Box = tuple[float, float, float, float]
+
+
+class GridIndex:
+    """Uniform grid over element boxes; each box is filed under every cell it covers.
+
+    A box that would cover more than ``max_cells`` cells (a backdrop zone, or
+    one element far bigger than the rest) goes into ``oversized`` instead and
+    is checked against every row, so one huge element can't fill millions of
+    cells.
+    """
+
+    def __init__(self, cell: float, max_cells: int = MAX_CELLS_PER_BOX) -> None:
+        self.cell = cell
+        self.max_cells = max_cells
+        self.cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        self.rows: list[int] = []
+        self.oversized: list[int] = []
+
+    def _bounds(self, box: Box) -> tuple[int, int, int, int]:
+        c = self.cell
+        return math.floor(box[0] / c), math.floor(box[1] / c), math.floor(box[2] / c), math.floor(box[3] / c)
+
+    def _too_big(self, box: Box) -> bool:
+        gx0, gy0, gx1, gy1 = self._bounds(box)
+        return (gx1 - gx0 + 1) * (gy1 - gy0 + 1) > self.max_cells
+
+    def _span(self, box: Box) -> Iterator[tuple[int, int]]:
+        gx0, gy0, gx1, gy1 = self._bounds(box)
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                yield gx, gy
+
+    def insert(self, row: int, box: Box) -> None:
+        self.rows.append(row)
+        if self._too_big(box):
+            self.oversized.append(row)
+            return
+        for key in self._span(box):
+            self.cells[key].append(row)
+
+    def query(self, box: Box) -> set[int]:
+        """Rows whose cells intersect ``box`` (a superset of the boxes that do)."""
+        if self._too_big(box):
+            return set(self.rows)
+        found = set(self.oversized)
+        for key in self._span(box):
+            found.update(self.cells.get(key, ()))
+        return found
+
+    def pairs(self) -> Iterator[tuple[int, int]]:
+        """Each pair of rows that shares at least one cell, or involves an oversized row, once."""
+        seen: set[tuple[int, int]] = set()
+        for rows in self.cells.values():
+            for i, a in enumerate(rows):
+                for b in rows[i + 1 :]:
+                    pair = (a, b) if a < b else (b, a)
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+        for a in self.oversized:
+            for b in self.rows:
+                pair = (a, b) if a < b else (b, a)
+                if a != b and pair not in seen:
+                    seen.add(pair)
+                    yield pair
+
+
+def _cell_size(boxes: list[Box]) -> float:
+    # About twice the median element size keeps most elements in 1-4 cells
+    sizes = sorted(max(b[2] - b[0], b[3] - b[1]) for b in boxes)
+    return max(2 * sizes[len(sizes) // 2], 16.0)
+
+
+def _text_box(el: dict, box: Box) -> Box:
+    """Grow an unrotated text box to its estimated rendered size."""
+    if el.get("angle"):
+        return box
+    font_size = float(el.get("fontSize") or 20)
+    lines = str(el.get("text") or "").split("\n")
+    glyph = _GLYPH_WIDTH.get(el.get("fontFamily"), 0.5)
+    width = max(box[2] - box[0], max(len(line) for line in lines) * font_size * glyph)
+    height = max(box[3] - box[1], len(lines) * font_size * float(el.get("lineHeight") or _DEFAULT_LINE_HEIGHT))
+    align = el.get("textAlign", "left")
+    if align == "center":
+        x0 = (box[0] + box[2]) / 2 - width / 2
+    elif align == "right":
+        x0 = box[2] - width
+    else:
+        x0 = box[0]
+    return x0, box[1], x0 + width, box[1] + height
+
+
+def _overlap(a: Box, b: Box) -> tuple[float, float]:
+    return min(a[2], b[2]) - max(a[0], b[0]), min(a[3], b[3]) - max(a[1], b[1])
+
+
+def _contains(outer: Box, inner: Box, slack: float = TOLERANCE) -> bool:
+    return (
+        inner[0] >= outer[0] - slack
+        and inner[1] >= outer[1] - slack
+        and inner[2] <= outer[2] + slack
+        and inner[3] <= outer[3] + slack
+    )
+
+
+def _segment_hits_box(x0: float, y0: float, x1: float, y1: float, box: Box) -> bool:
+    """Liang-Barsky: does the segment pass through ``box``?"""
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, x0 - box[0]), (dx, box[2] - x0), (-dy, y0 - box[1]), (dy, box[3] - y0)):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+        if t0 > t1:
+            return False
+    return True
+
+
+def _segments(el: dict) -> list[tuple[float, float, float, float]]:
+    """Straight segments through a linear element's points, rotated like geometry does."""
+    x, y = float(el.get("x", 0)), float(el.get("y", 0))
+    pts = [(x + float(p[0]), y + float(p[1])) for p in el.get("points") or []]
+    if len(pts) < 2:
+        return []
+    angle = float(el.get("angle") or 0)
+    if angle:
+        xs, ys = [p[0] for p in pts], [p[1] for p in pts]
+        cx, cy = (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+        cos, sin = math.cos(angle), math.sin(angle)
+        pts = [(cx + (px - cx) * cos - (py - cy) * sin, cy + (px - cx) * sin + (py - cy) * cos) for px, py in pts]
+    return [(*pts[i], *pts[i + 1]) for i in range(len(pts) - 1)]
+
+
+def _shrink(box: Box, by: float) -> Box:
+    return box[0] + by, box[1] + by, box[2] - by, box[3] - by
+
+
+def _label(el: dict) -> str:
+    label = f"{el.get('type')} '{el.get('id')}'"
+    text = el.get("text")
+    if text:
+        snippet = str(text).replace("\n", " ")
+        label += f' ("{snippet[:24]}{"..." if len(snippet) > 24 else ""}")'
+    return label
+
+
+def lint_diagram(data: dict) -> list[str]:
+    """Layout warnings for a validated diagram; empty when nothing looks wrong."""
+    elements = [e for e in data.get("elements", []) if not e.get("isDeleted")]
+    if not elements:
+        return []
+    by_id = {e.get("id"): e for e in elements}
+    computed = element_boxes(elements)
+    boxes: list[Box] = [box for _, box in computed.items()]
+    for row, el in enumerate(elements):
+        if el.get("type") == "text":
+            boxes[row] = _text_box(el, boxes[row])
+
+    warnings: list[str] = []
+
+    # Shapes and free-standing text go into the index; bound text travels with its container
+    shape_rows = [
+        row
+        for row, el in enumerate(elements)
+        if el.get("type") in SHAPE_TYPES and not (el.get("type") == "text" and el.get("containerId"))
+    ]
+    grid = GridIndex(_cell_size(boxes))
+    for row in shape_rows:
+        grid.insert(row, boxes[row])
+
+    def related(a: dict, b: dict) -> bool:
+        # Members of one group are laid out together on purpose
+        return bool(set(a.get("groupIds") or ()) & set(b.get("groupIds") or ()))
+
+    for a, b in grid.pairs():
+        ea, eb = elements[a], elements[b]
+        ow, oh = _overlap(boxes[a], boxes[b])
+        if ow <= TOLERANCE or oh <= TOLERANCE or related(ea, eb):
+            continue
+        # Full containment is nesting (a label on a zone, a card inside a panel), not a collision
+        if _contains(boxes[a], boxes[b]) or _contains(boxes[b], boxes[a]):
+            continue
+        warnings.append(f"{_label(ea)} overlaps {_label(eb)} by {ow:.0f}x{oh:.0f}px")
+
+    for row, el in enumerate(elements):
+        container = by_id.get(el.get("containerId")) if el.get("type") == "text" else None
+        if container is None or container.get("type") in LINEAR_TYPES:
+            continue
+        outer = computed[container["id"]]
+        if not _contains(outer, boxes[row]):
+            text_w, text_h = boxes[row][2] - boxes[row][0], boxes[row][3] - boxes[row][1]
+            warnings.append(
+                f"{_label(el)} (~{text_w:.0f}x{text_h:.0f}px) overflows its container "
+                f"{_label(container)} ({outer[2] - outer[0]:.0f}x{outer[3] - outer[1]:.0f}px)"
+            )
+
+    for el in elements:
+        if el.get("type") not in ("arrow", "line"):
+            continue
+        ends = {(el.get(end) or {}).get("elementId") for end in ("startBinding", "endBinding")} - {None}
+        segments = _segments(el)
+        if not segments:
+            continue
+        arrow_box = computed[el["id"]]
+        crossed: set[int] = set()
+        for row in grid.query(arrow_box):
+            other = elements[row]
+            if other.get("id") in ends or row in crossed or related(el, other):
+                continue
+            # A zone drawn around the whole arrow is background, not an obstacle
+            if _contains(boxes[row], arrow_box):
+                continue
+            inner = _shrink(boxes[row], TOLERANCE)
+            if inner[0] >= inner[2] or inner[1] >= inner[3]:
+                continue
+            # Endpoints inside a shape mean the arrow starts/ends there, even if unbound
+            first, last = segments[0][:2], segments[-1][2:]
+            if any(_contains(inner, (*p, *p), 0) for p in (first, last)):
+                continue
+            if any(_segment_hits_box(*seg, inner) for seg in segments):
+                crossed.add(row)
+                warnings.append(f"{_label(el)} crosses {_label(other)}")
+
+    return warnings
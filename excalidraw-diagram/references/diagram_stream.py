@@ -0,0 +1,216 @@
+"""Streaming loader for very large .excalidraw files.
+
+A diagram with embedded images is mostly base64 in ``files``. Loading it
+with ``json.loads(path.read_text())`` holds the raw text, the parsed dict
+and later a ``json.dumps`` copy for the page. This module memory-maps the
+file and scans it instead: ``load_streaming`` parses everything except the
+``dataURL`` strings in ``files``; those stay on disk as byte spans in a
+``FileSource`` and are handed to the page one blob at a time. The
+elements themselves are still parsed into a list, since validation needs
+every id and the page needs the whole scene.
+
+Only the standard library is used, so there is no extra dependency.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import re
+from collections.abc import Iterator
+from pathlib import Path
+
+# Files at least this big are loaded with load_streaming by render_excalidraw
+STREAM_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+_WS = re.compile(rb"[ \t\r\n]*")
+_STRUCTURAL = re.compile(rb'["{}\[\]]')
+_LITERAL = re.compile(rb"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+
+
+class _Scanner:
+    """Minimal byte-level JSON scanner: finds value spans without decoding them."""
+
+    def __init__(self, buf) -> None:
+        self.buf = buf
+        self.pos = 0
+
+    def error(self, msg: str) -> ValueError:
+        return ValueError(f"{msg} at byte {self.pos}")
+
+    def peek(self) -> bytes:
+        self.pos = _WS.match(self.buf, self.pos).end()
+        return self.buf[self.pos : self.pos + 1]
+
+    def expect(self, ch: bytes) -> None:
+        if self.peek() != ch:
+            raise self.error(f"Expected {ch.decode()!r}")
+        self.pos += 1
+
+    def accept(self, ch: bytes) -> bool:
+        if self.peek() == ch:
+            self.pos += 1
+            return True
+        return False
+
+    def _string_end(self, start: int) -> int:
+        # find() is C-speed even across a multi-MB base64 string
+        p = start + 1
+        while True:
+            q = self.buf.find(b'"', p)
+            if q < 0:
+                raise self.error("Unterminated string")
+            backslashes = 0
+            while self.buf[q - 1 - backslashes] == 0x5C:
+                backslashes += 1
+            if backslashes % 2 == 0:
+                return q + 1
+            p = q + 1
+
+    def skip_value(self) -> tuple[int, int]:
+        """Advance past one JSON value and return its (start, end) span."""
+        c = self.peek()
+        start = self.pos
+        if c == b'"':
+            self.pos = self._string_end(start)
+        elif c in (b"{", b"["):
+            depth = 0
+            p = start
+            while True:
+                m = _STRUCTURAL.search(self.buf, p)
+                if m is None:
+                    raise self.error("Unterminated container")
+                ch = m.group()
+                if ch == b'"':
+                    p = self._string_end(m.start())
+                    continue
+                depth += 1 if ch in (b"{", b"[") else -1
+                p = m.end()
+                if depth == 0:
+                    break
+            self.pos = p
+        else:
+            m = _LITERAL.match(self.buf, start)
+            if m is None:
+                raise self.error("Unexpected token")
+            self.pos = m.end()
+        return start, self.pos
+
+    def value(self):
+        start, end = self.skip_value()
+        return json.loads(self.buf[start:end])
+
+    def key(self) -> str:
+        if self.peek() != b'"':
+            raise self.error("Expected object key")
+        start, end = self.skip_value()
+        self.expect(b":")
+        return json.loads(self.buf[start:end])
+
+    def members(self) -> Iterator[str]:
+        """Iterate the keys of the object at the cursor; caller consumes each value."""
+        self.expect(b"{")
+        if self.accept(b"}"):
+            return
+        while True:
+            yield self.key()
+            if self.accept(b"}"):
+                return
+            self.expect(b",")
+
+    def items(self) -> Iterator[None]:
+        """Iterate the array at the cursor; caller consumes each item."""
+        self.expect(b"[")
+        if self.accept(b"]"):
+            return
+        while True:
+            yield None
+            if self.accept(b"]"):
+                return
+            self.expect(b",")
+
+
+class FileSource:
+    """``dataURL`` strings left in place in a memory-mapped .excalidraw file.
+
+    The map is only valid while the file keeps its size: close it as soon as
+    the render that needs it is done, since truncating a mapped file in place
+    makes later reads fault.
+    """
+
+    def __init__(self, mm: mmap.mmap, spans: dict[str, tuple[int, int]]) -> None:
+        self._mm = mm
+        self.spans = spans
+
+    def read(self, file_id: str) -> bytes:
+        start, end = self.spans[file_id]
+        raw = self._mm[start:end]
+        # Some serializers escape "/" as "\/"; only then pay for a decode
+        if b"\\" in raw:
+            raw = json.loads(b'"' + raw + b'"').encode("utf-8")
+        return raw
+
+    def digest(self, file_id: str) -> str:
+        """sha256 of the raw span, hashed in chunks without copying the whole blob."""
+        start, end = self.spans[file_id]
+        h = hashlib.sha256()
+        view = memoryview(self._mm)
+        try:
+            for p in range(start, end, 1 << 20):
+                h.update(view[p : min(p + (1 << 20), end)])
+        finally:
+            view.release()
+        return h.hexdigest()
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class Diagram(dict):
+    """Parsed diagram dict whose ``files`` dataURLs may live in ``file_source``."""
+
+    file_source: FileSource | None = None
+
+
+def _open_mmap(path: Path) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def load_streaming(path: Path) -> Diagram:
+    """Parse an .excalidraw file, leaving ``files[*].dataURL`` on disk. Raises ValueError on bad JSON."""
+    mm = _open_mmap(path)
+    scanner = _Scanner(mm)
+    data = Diagram()
+    spans: dict[str, tuple[int, int]] = {}
+    try:
+        for key in scanner.members():
+            if key == "elements" and scanner.peek() == b"[":
+                data["elements"] = [scanner.value() for _ in scanner.items()]
+            elif key == "files" and scanner.peek() == b"{":
+                files: dict[str, dict] = {}
+                for file_id in scanner.members():
+                    entry: dict = {}
+                    for field in scanner.members():
+                        if field == "dataURL" and scanner.peek() == b'"':
+                            start, end = scanner.skip_value()
+                            spans[file_id] = (start + 1, end - 1)
+                        else:
+                            entry[field] = scanner.value()
+                    files[file_id] = entry
+                data["files"] = files
+            else:
+                data[key] = scanner.value()
+        if scanner.peek():
+            raise scanner.error("Extra data after document")
+    except Exception:
+        mm.close()
+        raise
+
+    if spans:
+        data.file_source = FileSource(mm, spans)
+    else:
+        mm.close()
+    return data
+
@@ -0,0 +1,175 @@
+"""Rotation-aware bounding boxes for Excalidraw elements.
+
+Every element is reduced to outline points (rectangle/text/image corners,
+diamond vertices, line/arrow/freedraw points), packed into contiguous
+coordinate arrays, rotated by its ``angle`` about its center and reduced to
+one (min_x, min_y, max_x, max_y) box per element. Ellipses use their exact
+rotated extents. With NumPy installed all of that is vectorized; without it
+the same math runs in a plain loop.
+
+``element_boxes`` is the shared entry point for anything that needs
+per-element geometry (viewport sizing, overlap checks, cropping). It raises
+ValueError naming the element for non-numeric coordinates or ragged
+``points``; render_excalidraw.validate_references reports the same problems
+as validation errors before rendering gets this far.
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+LINEAR_TYPES = {"arrow", "line", "freedraw"}
+
+
+class ElementBoxes:
+    """Per-element axis-aligned boxes, in element order, for live elements only."""
+
+    def __init__(self, ids: list[str], boxes) -> None:
+        self.ids = ids
+        # NumPy (n, 4) float array, or a list of 4-tuples without NumPy
+        self.boxes = boxes
+        self._rows: dict[str, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, element_id: str) -> tuple[float, float, float, float]:
+        if self._rows is None:
+            self._rows = {el_id: i for i, el_id in enumerate(self.ids)}
+        return tuple(float(v) for v in self.boxes[self._rows[element_id]])
+
+    def items(self):
+        for i, el_id in enumerate(self.ids):
+            yield el_id, tuple(float(v) for v in self.boxes[i])
+
+    def bounds(self) -> tuple[float, float, float, float] | None:
+        """Union of all boxes, or None if there are no elements."""
+        if not self.ids:
+            return None
+        if np is not None:
+            return (
+                float(self.boxes[:, 0].min()),
+                float(self.boxes[:, 1].min()),
+                float(self.boxes[:, 2].max()),
+                float(self.boxes[:, 3].max()),
+            )
+        return (
+            min(b[0] for b in self.boxes),
+            min(b[1] for b in self.boxes),
+            max(b[2] for b in self.boxes),
+            max(b[3] for b in self.boxes),
+        )
+
+
+def _outline(el: dict) -> tuple[list[float], list[float], float, float]:
+    """Outline points in scene coordinates plus the rotation center."""
+    x = float(el.get("x", 0))
+    y = float(el.get("y", 0))
+    if el.get("type") in LINEAR_TYPES and el.get("points"):
+        xs = [x + float(p[0]) for p in el["points"]]
+        ys = [y + float(p[1]) for p in el["points"]]
+        # Excalidraw rotates linear elements about the center of their points
+        return xs, ys, (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+
+    w = float(el.get("width", 0))
+    h = float(el.get("height", 0))
+    cx, cy = x + w / 2, y + h / 2
+    if el.get("type") == "diamond":
+        return [cx, x + w, cx, x], [y, cy, y + h, cy], cx, cy
+    return [x, x + w, x + w, x], [y, y, y + h, y + h], cx, cy
+
+
+def _ellipse_box(el: dict) -> tuple[float, float, float, float]:
+    x, y = float(el.get("x", 0)), float(el.get("y", 0))
+    a, b = abs(float(el.get("width", 0))) / 2, abs(float(el.get("height", 0))) / 2
+    cx, cy = x + float(el.get("width", 0)) / 2, y + float(el.get("height", 0)) / 2
+    t = float(el.get("angle") or 0)
+    hw = math.hypot(a * math.cos(t), b * math.sin(t))
+    hh = math.hypot(a * math.sin(t), b * math.cos(t))
+    return cx - hw, cy - hh, cx + hw, cy + hh
+
+
+def element_boxes(elements: Iterable[dict]) -> ElementBoxes:
+    """Rotation-aware boxes for every non-deleted element. Accepts any iterable (e.g. a stream)."""
+    ids: list[str] = []
+    # Packed outline coordinates, one contiguous run per element
+    xs: list[float] = []
+    ys: list[float] = []
+    starts: list[int] = []
+    centers_x: list[float] = []
+    centers_y: list[float] = []
+    angles: list[float] = []
+    # Row -> exact box for ellipses, filled in after the vectorized pass
+    ellipses: dict[int, tuple[float, float, float, float]] = {}
+
+    for el in elements:
+        if el.get("isDeleted"):
+            continue
+        row = len(ids)
+        ids.append(str(el.get("id", row)))
+        try:
+            if el.get("type") == "ellipse":
+                ellipses[row] = _ellipse_box(el)
+                ex, ey, _, _ = ellipses[row]
+                px, py, cx, cy = [ex], [ey], ex, ey
+                angle = 0.0
+            else:
+                px, py, cx, cy = _outline(el)
+                angle = float(el.get("angle") or 0)
+        except (TypeError, ValueError, IndexError, KeyError) as e:
+            raise ValueError(f"{ids[row]}: malformed geometry ({type(e).__name__}: {e})") from e
+        starts.append(len(xs))
+        xs.extend(px)
+        ys.extend(py)
+        centers_x.append(cx)
+        centers_y.append(cy)
+        angles.append(angle)
+
+    if not ids:
+        return ElementBoxes([], np.empty((0, 4)) if np is not None else [])
+
+    if np is not None:
+        x = np.asarray(xs)
+        y = np.asarray(ys)
+        start = np.asarray(starts)
+        counts = np.diff(np.append(start, len(xs)))
+        owner = np.repeat(np.arange(len(ids)), counts)
+
+        angle = np.asarray(angles)[owner]
+        cx = np.asarray(centers_x)[owner]
+        cy = np.asarray(centers_y)[owner]
+        cos, sin = np.cos(angle), np.sin(angle)
+        dx, dy = x - cx, y - cy
+        rx = cx + dx * cos - dy * sin
+        ry = cy + dx * sin + dy * cos
+
+        boxes = np.column_stack(
+            (
+                np.minimum.reduceat(rx, start),
+                np.minimum.reduceat(ry, start),
+                np.maximum.reduceat(rx, start),
+                np.maximum.reduceat(ry, start),
+            )
+        )
+        for row, box in ellipses.items():
+            boxes[row] = box
+        return ElementBoxes(ids, boxes)
+
+    boxes = []
+    ends = starts[1:] + [len(xs)]
+    for row, (s, e) in enumerate(zip(starts, ends)):
+        if row in ellipses:
+            boxes.append(ellipses[row])
+            continue
+        t, cx, cy = angles[row], centers_x[row], centers_y[row]
+        cos, sin = math.cos(t), math.sin(t)
+        rx = [cx + (px - cx) * cos - (py - cy) * sin for px, py in zip(xs[s:e], ys[s:e])]
+        ry = [cy + (px - cx) * sin + (py - cy) * cos for px, py in zip(xs[s:e], ys[s:e])]
+        boxes.append((min(rx), min(ry), max(rx), max(ry)))
+    return ElementBoxes(ids, boxes)
@@ -0,0 +1,336 @@
+"""Perceptual diff between two renders of a diagram.
+
+Answers "did this edit change the picture, and where?" without anyone
+having to look at both images:
+
+1. Pixels that differ at all are found with one vectorized comparison of the
+   decoded RGB arrays. Identical renders stop here.
+2. Only those pixels are converted to CIELAB, and a change counts as visible
+   when its color difference (CIE76 delta E) is above ``threshold``
+   (2.3 is about one just-noticeable difference).
+3. Visible changes are binned into ``BLOCK`` px cells. Neighbouring cells are
+   merged into regions with a one-cell dilation, so an edited label is one
+   region and not one per glyph. Each region box is then trimmed to the
+   changed pixels inside it.
+4. The perceptual score is the mean SSIM of the luma over the whole image.
+   A window that touches no changed pixel has an SSIM of exactly 1, so SSIM
+   is only computed inside the changed areas, padded by one window.
+
+Renders of different sizes (the diagram's bounds moved) are compared
+top-left aligned on a white canvas. ``write_changes`` saves a side-by-side
+before | after crop of the changed area for review.
+
+    uv run python render_excalidraw.py --diff before.png after.png
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# CIE76 delta E below which a pixel change is invisible
+DEFAULT_THRESHOLD = 2.3
+
+# Region grid cell (px); changes within one cell of each other form one region
+BLOCK = 16
+
+# SSIM window (px) and constants for 8-bit data
+_WINDOW = 8
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+# Padding (px) around the changed area in the review crop
+_CROP_MARGIN = 24
+
+# sRGB (D65) -> XYZ, normalized by the D65 white point
+_RGB_TO_XYZ = np.array(
+    [
+        [0.4124564 / 0.95047, 0.3575761 / 0.95047, 0.1804375 / 0.95047],
+        [0.2126729, 0.7151522, 0.0721750],
+        [0.0193339 / 1.08883, 0.1191920 / 1.08883, 0.9503041 / 1.08883],
+    ],
+    dtype=np.float32,
+)
+
+Box = tuple[int, int, int, int]
+
+
+@dataclass
+class DiffResult:
+    """Outcome of ``diff_images``; regions are (x, y, width, height) in after-image pixels."""
+
+    size_before: tuple[int, int]
+    size_after: tuple[int, int]
+    differing_pixels: int
+    changed_pixels: int
+    changed_fraction: float
+    ssim: float
+    regions: list[Box] = field(default_factory=list)
+
+    @property
+    def identical(self) -> bool:
+        return self.differing_pixels == 0 and self.size_before == self.size_after
+
+    @property
+    def changed(self) -> bool:
+        """True when a change is visible (above the delta E threshold) or the size changed."""
+        return bool(self.regions) or self.size_before != self.size_after
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "identical": self.identical, "changed": self.changed}
+
+
+def load_rgb(path: Path) -> np.ndarray:
+    """Decode an image as (height, width, 3) uint8 RGB, flattening transparency onto white."""
+    with Image.open(path) as im:
+        if im.mode in ("RGBA", "LA", "P"):
+            rgba = im.convert("RGBA")
+            canvas = Image.new("RGBA", rgba.size, "white")
+            canvas.alpha_composite(rgba)
+            return np.asarray(canvas.convert("RGB"))
+        return np.asarray(im.convert("RGB"))
+
+
+def _common_canvas(a: np.ndarray, b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    if a.shape == b.shape:
+        return a, b
+    h, w = max(a.shape[0], b.shape[0]), max(a.shape[1], b.shape[1])
+
+    def pad(img: np.ndarray) -> np.ndarray:
+        out = np.full((h, w, 3), 255, dtype=np.uint8)
+        out[: img.shape[0], : img.shape[1]] = img
+        return out
+
+    return pad(a), pad(b)
+
+
+def _lab(rgb: np.ndarray) -> np.ndarray:
+    """(n, 3) uint8 sRGB -> (n, 3) float32 CIELAB."""
+    c = rgb.astype(np.float32) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def _blocks(mask: np.ndarray, block: int) -> np.ndarray:
+    """Boolean grid: does each ``block`` x ``block`` cell contain a set pixel?"""
+    h, w = mask.shape
+    gh, gw = -(-h // block), -(-w // block)
+    padded = np.zeros((gh * block, gw * block), dtype=bool)
+    padded[:h, :w] = mask
+    return padded.reshape(gh, block, gw, block).any(axis=(1, 3))
+
+
+def _dilate(grid: np.ndarray) -> np.ndarray:
+    out = grid.copy()
+    out[1:] |= grid[:-1]
+    out[:-1] |= grid[1:]
+    step = out.copy()
+    out[:, 1:] |= step[:, :-1]
+    out[:, :-1] |= step[:, 1:]
+    return out
+
+
+def _components(grid: np.ndarray) -> list[Box]:
+    """Cell bounding boxes (x0, y0, x1, y1), exclusive ends, of the 8-connected components of ``grid``."""
+    seen = np.zeros_like(grid)
+    boxes = []
+    for start in zip(*np.nonzero(grid)):
+        if seen[start]:
+            continue
+        seen[start] = True
+        stack = [start]
+        y0, x0, y1, x1 = start[0], start[1], start[0], start[1]
+        while stack:
+            y, x = stack.pop()
+            y0, x0, y1, x1 = min(y0, y), min(x0, x), max(y1, y), max(x1, x)
+            for ny in (y - 1, y, y + 1):
+                for nx in (x - 1, x, x + 1):
+                    if 0 <= ny < grid.shape[0] and 0 <= nx < grid.shape[1] and grid[ny, nx] and not seen[ny, nx]:
+                        seen[ny, nx] = True
+                        stack.append((ny, nx))
+        boxes.append((int(x0), int(y0), int(x1) + 1, int(y1) + 1))
+    return boxes
+
+
+def changed_regions(mask: np.ndarray, block: int = BLOCK) -> list[Box]:
+    """Boxes (x, y, width, height) around clusters of set pixels in ``mask``, largest first."""
+    if not mask.any():
+        return []
+    regions = []
+    for cx0, cy0, cx1, cy1 in _components(_dilate(_blocks(mask, block))):
+        x0, y0 = cx0 * block, cy0 * block
+        sub = mask[y0 : cy1 * block, x0 : cx1 * block]
+        rows, cols = np.nonzero(sub.any(axis=1))[0], np.nonzero(sub.any(axis=0))[0]
+        if rows.size == 0:
+            # Only dilation reached this cell
+            continue
+        regions.append((x0 + int(cols[0]), y0 + int(rows[0]), int(cols[-1] - cols[0]) + 1, int(rows[-1] - rows[0]) + 1))
+    return sorted(regions, key=lambda r: r[2] * r[3], reverse=True)
+
+
+def _window_sums(x: np.ndarray, w: int) -> np.ndarray:
+    """Sum over every ``w`` x ``w`` window of ``x`` (valid positions), via an integral image."""
+    ii = np.zeros((x.shape[0] + 1, x.shape[1] + 1), dtype=np.float64)
+    ii[1:, 1:] = x.cumsum(axis=0).cumsum(axis=1)
+    return ii[w:, w:] - ii[:-w, w:] - ii[w:, :-w] + ii[:-w, :-w]
+
+
+def _ssim_sum(a: np.ndarray, b: np.ndarray, w: int = _WINDOW) -> float:
+    """Sum of SSIM over all ``w`` x ``w`` windows of two float luma arrays."""
+    n = w * w
+    sa, sb = _window_sums(a, w), _window_sums(b, w)
+    saa, sbb, sab = _window_sums(a * a, w), _window_sums(b * b, w), _window_sums(a * b, w)
+    mu_a, mu_b = sa / n, sb / n
+    var_a, var_b = saa / n - mu_a**2, sbb / n - mu_b**2
+    cov = sab / n - mu_a * mu_b
+    ssim = ((2 * mu_a * mu_b + _C1) * (2 * cov + _C2)) / ((mu_a**2 + mu_b**2 + _C1) * (var_a + var_b + _C2))
+    return float(ssim.sum())
+
+
+def _luma(rgb: np.ndarray) -> np.ndarray:
+    return rgb.astype(np.float64) @ np.array([0.299, 0.587, 0.114])
+
+
+def _merge_overlapping(boxes: list[Box]) -> list[Box]:
+    """Merge (x0, y0, x1, y1) boxes until none overlap."""
+    boxes = list(boxes)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def _mean_ssim(a: np.ndarray, b: np.ndarray, differing: np.ndarray) -> float:
+    """Mean SSIM over the whole image, computed only around ``differing`` pixels."""
+    h, w = differing.shape
+    if h < _WINDOW or w < _WINDOW:
+        return 1.0 - float(differing.mean())
+    total = (h - _WINDOW + 1) * (w - _WINDOW + 1)
+    pad = _WINDOW
+    areas = _merge_overlapping(
+        [
+            (max(0, x - pad), max(0, y - pad), min(w, x + rw + pad), min(h, y + rh + pad))
+            for x, y, rw, rh in changed_regions(differing)
+        ]
+    )
+    la, lb = _luma(a), _luma(b)
+    ssim_sum, windows = 0.0, 0
+    for x0, y0, x1, y1 in areas:
+        if x1 - x0 < _WINDOW or y1 - y0 < _WINDOW:
+            continue
+        ssim_sum += _ssim_sum(la[y0:y1, x0:x1], lb[y0:y1, x0:x1])
+        windows += (x1 - x0 - _WINDOW + 1) * (y1 - y0 - _WINDOW + 1)
+    # Every other window sees identical pixels
+    return (ssim_sum + (total - windows)) / total
+
+
+def diff_arrays(before: np.ndarray, after: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> DiffResult:
+    """Compare two (h, w, 3) uint8 RGB arrays; see the module docstring."""
+    size_before, size_after = (before.shape[1], before.shape[0]), (after.shape[1], after.shape[0])
+    a, b = _common_canvas(before, after)
+    differing = (a != b).any(axis=2)
+    count = int(differing.sum())
+    if count == 0:
+        return DiffResult(size_before, size_after, 0, 0, 0.0, 1.0)
+
+    ys, xs = np.nonzero(differing)
+    delta_e = np.linalg.norm(_lab(a[ys, xs]) - _lab(b[ys, xs]), axis=1)
+    visible = np.zeros_like(differing)
+    keep = delta_e > threshold
+    visible[ys[keep], xs[keep]] = True
+    changed = int(keep.sum())
+
+    return DiffResult(
+        size_before,
+        size_after,
+        count,
+        changed,
+        round(changed / differing.size, 6),
+        round(_mean_ssim(a, b, differing), 6),
+        changed_regions(visible),
+    )
+
+
+def diff_images(before: Path, after: Path, threshold: float = DEFAULT_THRESHOLD) -> DiffResult:
+    """Compare two image files (PNG, JPEG, WebP, ...)."""
+    return diff_arrays(load_rgb(before), load_rgb(after), threshold)
+
+
+def changes_path(after: Path) -> Path:
+    """Default review crop next to the new render: ``a.png`` -> ``a.changes.png``."""
+    return after.with_name(f"{after.stem}.changes.png")
+
+
+def write_changes(before: np.ndarray, after: np.ndarray, result: DiffResult, output_path: Path) -> Path | None:
+    """Save a before | after crop of the changed area, regions outlined in red. None if nothing changed."""
+    if not result.regions:
+        return None
+    a, b = _common_canvas(before, after)
+    h, w = a.shape[:2]
+    x0 = max(0, min(r[0] for r in result.regions) - _CROP_MARGIN)
+    y0 = max(0, min(r[1] for r in result.regions) - _CROP_MARGIN)
+    x1 = min(w, max(r[0] + r[2] for r in result.regions) + _CROP_MARGIN)
+    y1 = min(h, max(r[1] + r[3] for r in result.regions) + _CROP_MARGIN)
+
+    crop_w, gap = x1 - x0, 8
+    sheet = Image.new("RGB", (crop_w * 2 + gap, y1 - y0), (200, 200, 200))
+    sheet.paste(Image.fromarray(a[y0:y1, x0:x1]), (0, 0))
+    sheet.paste(Image.fromarray(b[y0:y1, x0:x1]), (crop_w + gap, 0))
+    draw = ImageDraw.Draw(sheet)
+    for rx, ry, rw, rh in result.regions:
+        left, top = crop_w + gap + rx - x0, ry - y0
+        draw.rectangle([left - 1, top - 1, left + rw, top + rh], outline=(224, 49, 49), width=2)
+    sheet.save(output_path, format="PNG")
+    return output_path
+
+
+def format_summary(result: DiffResult) -> str:
+    """One line for humans: unchanged, or how much changed and where."""
+    if result.identical:
+        return "unchanged (pixel-identical)"
+    if not result.changed:
+        return f"no visible change ({result.differing_pixels} px differ below the threshold, SSIM {result.ssim:.4f})"
+    parts = [f"{len(result.regions)} changed region(s)", f"{result.changed_fraction:.2%} of pixels", f"SSIM {result.ssim:.4f}"]
+    if result.size_before != result.size_after:
+        parts.append(f"size {result.size_before[0]}x{result.size_before[1]} -> {result.size_after[0]}x{result.size_after[1]}")
+    largest = result.regions[0] if result.regions else None
+    if largest:
+        parts.append(f"largest at {largest[0]},{largest[1]} {largest[2]}x{largest[3]}")
+    return ", ".join(parts)
+
+
+def snapshot(path: Path) -> np.ndarray | None:
+    """Decode an existing render before it is overwritten; None if there is none."""
+    try:
+        return load_rgb(path)
+    except OSError:
+        return None
+
+
+def diff_against(previous: np.ndarray | None, output_path: Path, threshold: float = DEFAULT_THRESHOLD) -> str:
+    """Diff a fresh render with its ``snapshot``, write (or clear) the review crop, and summarize."""
+    if previous is None:
+        return "first render, nothing to compare"
+    after = load_rgb(output_path)
+    result = diff_arrays(previous, after, threshold)
+    crop = write_changes(previous, after, result, changes_path(output_path))
+    if crop is None:
+        # A crop from an earlier edit would be misleading now
+        changes_path(output_path).unlink(missing_ok=True)
+        return format_summary(result)
+    return f"{format_summary(result)}; crop: {crop}"
@@ -0,0 +1,298 @@
+"""Asyncio render engine for render_excalidraw.py.
+
+Built on ``playwright.async_api``: one Chromium, several browser contexts,
+and a fixed pool of warm template pages spread across them. Each render
+borrows a page from the pool, and ``concurrency`` workers pull jobs from a
+bounded queue, so at most ``concurrency`` diagrams are loaded or in flight
+and further work waits for a free worker (backpressure). Chromium runs
+each context's renderers in their own processes, so a many-core box renders
+many diagrams at once while this process only orchestrates.
+
+    import asyncio
+    from render_async import render_many
+
+    results = asyncio.run(render_many(paths, concurrency=16, timeout=20))
+
+Every file gets a ``BatchResult``; one failure or timeout never cancels the rest.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from pathlib import Path
+
+from asset_cache import AssetCache, AssetIntegrityError
+from render_batch import BatchJob, BatchResult, plan_jobs
+from render_cache import RenderCache, canonical_key
+from render_excalidraw import (
+    DEFAULT_TIMEOUT,
+    JPEG_QUALITY,
+    MODULE_READY_JS,
+    RENDER_COMPLETE_JS,
+    RENDER_JS,
+    SETUP_HINT,
+    TEMPLATE_PATH,
+    RenderError,
+    check_render_result,
+    close_diagram,
+    compute_viewport,
+    file_response,
+    files_url_for,
+    load_diagram,
+    pdf_options,
+    preview_diagram,
+    render_args,
+    webp_bytes,
+    write_atomic,
+)
+from render_recycle import PageRecycler, RecyclePolicy
+
+# Pages per browser context when the caller doesn't choose
+PAGES_PER_CONTEXT = 4
+
+
+def _describe(e: BaseException) -> str:
+    if isinstance(e, RenderError):
+        return str(e)
+    if isinstance(e, asyncio.TimeoutError):
+        return "Render timed out"
+    return f"{type(e).__name__}: {e}"
+
+
+async def _open_page(context, assets: AssetCache, timeout: float):
+    page = await context.new_page()
+    await assets.install_async(page)
+    await page.goto(TEMPLATE_PATH.as_uri())
+    try:
+        await page.wait_for_function(MODULE_READY_JS, timeout=timeout * 1000)
+    except Exception as e:
+        problems = assets.problems()
+        if problems:
+            raise RenderError("Excalidraw module failed to load:\n" + "\n".join(f"  - {p}" for p in problems)) from e
+        raise
+    return page
+
+
+async def _write_output(page, svg_el, result: dict, output: Path, fmt: str) -> None:
+    """Async twin of RenderSession.write_output."""
+    if fmt == "svg":
+        markup = await svg_el.evaluate("el => el.outerHTML")
+        await asyncio.to_thread(write_atomic, output, markup.encode("utf-8"))
+    elif fmt == "pdf":
+        pdf = await page.pdf(**pdf_options(result))
+        await asyncio.to_thread(write_atomic, output, pdf)
+    elif fmt == "webp":
+        png = await svg_el.screenshot()
+        await asyncio.to_thread(lambda: write_atomic(output, webp_bytes(png)))
+    elif fmt == "jpeg":
+        jpeg = await svg_el.screenshot(type="jpeg", quality=JPEG_QUALITY)
+        await asyncio.to_thread(write_atomic, output, jpeg)
+    else:
+        png = await svg_el.screenshot()
+        await asyncio.to_thread(write_atomic, output, png)
+
+
+async def _render_on_page(page, data: dict, output: Path, max_width: int, timeout: float, fmt: str = "png") -> None:
+    vp_width, vp_height = compute_viewport(data, max_width)
+    await page.set_viewport_size({"width": vp_width, "height": vp_height})
+
+    files_url = files_url_for(data)
+    if files_url:
+        async def serve_file(route) -> None:
+            await route.fulfill(**file_response(data, files_url, route.request.url))
+
+        await page.route(files_url + "*", serve_file)
+    try:
+        await page.evaluate(RENDER_JS, render_args(data, files_url=files_url))
+        await page.wait_for_function(RENDER_COMPLETE_JS, timeout=timeout * 1000)
+    finally:
+        if files_url:
+            await page.unroute(files_url + "*")
+    result = check_render_result(await page.evaluate("window.__job"))
+
+    svg_el = await page.query_selector("#root svg")
+    if svg_el is None:
+        raise RenderError("No SVG element found after render.")
+    await _write_output(page, svg_el, result, output, fmt)
+
+
+async def render_jobs(
+    jobs: list[BatchJob],
+    concurrency: int = 4,
+    *,
+    scale: int = 2,
+    max_width: int = 1920,
+    timeout: float = DEFAULT_TIMEOUT,
+    contexts: int | None = None,
+    offline: bool = False,
+    cache: RenderCache | None = None,
+    fmt: str = "png",
+    preview: bool = False,
+    recycle: RecyclePolicy | None = None,
+) -> list[BatchResult]:
+    """Render explicit input/output jobs with at most ``concurrency`` in flight.
+
+    Pages are replaced as ``recycle`` directs (see render_recycle.py); contexts
+    are shared by several pages here, so only the page itself is recycled.
+    """
+    try:
+        from playwright.async_api import async_playwright
+    except ImportError as e:
+        raise RenderError(f"playwright not installed.\n{SETUP_HINT}") from e
+
+    concurrency = max(1, concurrency)
+    contexts = contexts or math.ceil(concurrency / PAGES_PER_CONTEXT)
+    try:
+        assets = AssetCache(offline=offline)
+    except AssetIntegrityError as e:
+        raise RenderError(str(e)) from e
+
+    async def prepare(job: BatchJob) -> tuple[dict, str | None]:
+        # JSON parsing and hashing are CPU-bound; keep them off the event loop
+        data = await asyncio.to_thread(load_diagram, job.input)
+        if preview:
+            data = preview_diagram(data)
+        job.output.parent.mkdir(parents=True, exist_ok=True)
+        key = await asyncio.to_thread(canonical_key, data, scale, max_width, fmt) if cache else None
+        return data, key
+
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(headless=True)
+        except Exception as e:
+            if "Executable doesn't exist" in str(e) or "browserType.launch" in str(e):
+                raise RenderError(f"Chromium not installed for Playwright.\n{SETUP_HINT}") from e
+            raise
+
+        try:
+            try:
+                ctxs = [await browser.new_context(device_scale_factor=scale) for _ in range(contexts)]
+                pages = await asyncio.gather(
+                    *(_open_page(ctxs[i % contexts], assets, timeout) for i in range(concurrency))
+                )
+            except RenderError:
+                raise
+            except Exception as e:
+                raise RenderError(f"Cannot open the page pool: {_describe(e)}") from e
+            pool: asyncio.Queue = asyncio.Queue()
+            for page in pages:
+                pool.put_nowait(page)
+
+            recycler = PageRecycler(recycle, pages=concurrency)
+            live = len(pages)
+
+            async def replace(page):
+                """A fresh page for the slot, or None if it can't be reopened; never the closed page."""
+                # A page that failed or timed out may still be busy; swap in a fresh one
+                nonlocal live
+                recycler.forget(page)
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                for _ in range(2):
+                    try:
+                        return await _open_page(page.context, assets, timeout)
+                    except Exception:
+                        continue
+                # Drop the slot; once none are left, wake every waiter so it fails instead of hanging
+                live -= 1
+                recycler.pages = max(1, live)
+                if live == 0:
+                    pool.put_nowait(None)
+                return None
+
+            async def run(job: BatchJob) -> BatchResult:
+                started = time.perf_counter()
+                data = None
+                try:
+                    data, key = await prepare(job)
+                    # Cache hits copy whole files; keep that disk I/O off the event loop too
+                    if key and await asyncio.to_thread(cache.get, key, job.output):
+                        seconds = time.perf_counter() - started
+                        return BatchResult(str(job.input), str(job.output), True, seconds=seconds, cached=True)
+
+                    page = await pool.get()
+                    if page is None:
+                        pool.put_nowait(None)
+                        raise RenderError("No render pages left; every page failed to reopen")
+                    try:
+                        await asyncio.wait_for(_render_on_page(page, data, job.output, max_width, timeout, fmt), timeout)
+                    except Exception:
+                        page = await replace(page)
+                        raise
+                    else:
+                        if await recycler.check_async(page, browser):
+                            page = await replace(page)
+                    finally:
+                        if page is not None:
+                            pool.put_nowait(page)
+
+                    if key:
+                        await asyncio.to_thread(cache.put, key, job.output)
+                    return BatchResult(str(job.input), str(job.output), True, seconds=time.perf_counter() - started)
+                except Exception as e:
+                    return BatchResult(str(job.input), None, False, _describe(e), time.perf_counter() - started)
+                finally:
+                    if data is not None:
+                        close_diagram(data)
+
+            # A fixed set of workers bounds how many diagrams are parsed and held in memory at once,
+            # without a task per job waiting up front
+            todo: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+            results: list[BatchResult | None] = [None] * len(jobs)
+
+            async def feed() -> None:
+                for item in enumerate(jobs):
+                    await todo.put(item)
+                for _ in range(concurrency):
+                    await todo.put(None)
+
+            async def worker() -> None:
+                while (item := await todo.get()) is not None:
+                    index, job = item
+                    results[index] = await run(job)
+
+            await asyncio.gather(feed(), *(worker() for _ in range(concurrency)))
+            return results
+        finally:
+            await browser.close()
+
+
+async def render_many(
+    paths: list[Path | str],
+    concurrency: int = 4,
+    *,
+    out_dir: Path | None = None,
+    roots: list[Path] | None = None,
+    scale: int = 2,
+    max_width: int = 1920,
+    timeout: float = DEFAULT_TIMEOUT,
+    contexts: int | None = None,
+    offline: bool = False,
+    cache: RenderCache | None = None,
+    fmt: str = "png",
+    preview: bool = False,
+    recycle: RecyclePolicy | None = None,
+) -> list[BatchResult]:
+    """Render many .excalidraw files concurrently. Outputs go next to each input or into ``out_dir``.
+
+    Inputs under one of ``roots`` keep their relative path in ``out_dir`` (see
+    plan_jobs); RenderError is raised if two inputs would share an output.
+    """
+    jobs = plan_jobs([Path(p) for p in paths], out_dir, fmt, preview, roots)
+    return await render_jobs(
+        jobs,
+        concurrency,
+        scale=scale,
+        max_width=max_width,
+        timeout=timeout,
+        contexts=contexts,
+        offline=offline,
+        cache=cache,
+        fmt=fmt,
+        preview=preview,
+        recycle=recycle,
+    )
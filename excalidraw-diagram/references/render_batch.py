@@ -0,0 +1,274 @@
+"""Batch rendering for render_excalidraw.py.
+
+Launches Chromium once, opens a bounded pool of template pages and keeps a
+render in flight on each page. Every file gets its own success/error entry,
+so one bad diagram doesn't abort the rest of the run; only failing to open
+the pool itself (no browser, template or module) stops the batch.
+
+Usage:
+    uv run python render_excalidraw.py --batch diagrams/ "docs/**/*.excalidraw" [--pool 4] [--out-dir out/]
+    uv run python render_excalidraw.py --batch --manifest manifest.json [--report report.json]
+
+A manifest is a JSON list of paths or {"input": ..., "output": ...} objects.
+Relative paths are resolved against the manifest's directory.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import glob
+import json
+import sys
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from render_cache import RenderCache
+from render_excalidraw import (
+    DEFAULT_TIMEOUT,
+    RenderError,
+    RenderSession,
+    close_diagram,
+    default_output,
+    load_diagram,
+    preview_diagram,
+)
+from render_recycle import RecyclePolicy
+
+
+@dataclass
+class BatchJob:
+    input: Path
+    output: Path
+
+
+@dataclass
+class BatchResult:
+    input: str
+    output: str | None
+    ok: bool
+    error: str | None = None
+    seconds: float = 0.0
+    cached: bool = False
+
+
+def _describe(e: Exception) -> str:
+    return str(e) if isinstance(e, RenderError) else f"{type(e).__name__}: {e}"
+
+
+def collect_inputs(patterns: list[str]) -> list[Path]:
+    """Expand directories (recursively) and globs into a sorted list of .excalidraw files."""
+    found: dict[Path, None] = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(path.rglob("*.excalidraw"))
+        elif glob.has_magic(pattern):
+            matches = sorted(Path(p) for p in glob.glob(pattern, recursive=True))
+        else:
+            # Plain paths pass through so missing files show up in the report
+            matches = [path]
+        for match in matches:
+            found.setdefault(match, None)
+    return list(found)
+
+
+def input_roots(patterns: list[str]) -> list[Path]:
+    """Directories whose layout ``--out-dir`` mirrors: each directory, and each glob's fixed prefix."""
+    roots = []
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            roots.append(path)
+        elif glob.has_magic(pattern):
+            fixed = []
+            for part in path.parts:
+                if glob.has_magic(part):
+                    break
+                fixed.append(part)
+            roots.append(Path(*fixed))
+    return roots
+
+
+def read_manifest(manifest_path: Path, fmt: str = "png", preview: bool = False) -> list[BatchJob]:
+    """Parse a JSON manifest into jobs. Raises RenderError if it is malformed."""
+    try:
+        entries = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        raise RenderError(f"Cannot read manifest {manifest_path}: {e}") from e
+    if not isinstance(entries, list):
+        raise RenderError(f"Manifest {manifest_path} must be a JSON list")
+
+    base = manifest_path.parent
+    jobs: list[BatchJob] = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"input": entry}
+        if not isinstance(entry, dict) or "input" not in entry:
+            raise RenderError(f"Bad manifest entry: {entry!r}")
+        input_path = base / entry["input"]
+        output = entry.get("output")
+        jobs.append(BatchJob(input_path, base / output if output else default_output(input_path, fmt, preview)))
+    return jobs
+
+
+def _relative_output(output: Path, roots: list[Path]) -> Path:
+    # The shortest enclosing root wins, so nested roots still mirror one tree
+    for root in sorted(roots, key=lambda r: len(r.parts)):
+        if output.is_relative_to(root):
+            return output.relative_to(root)
+    return Path(output.name)
+
+
+def check_outputs(jobs: list[BatchJob]) -> None:
+    """Raise RenderError if two jobs would write the same output file."""
+    seen: dict[Path, Path] = {}
+    clashes = []
+    for job in jobs:
+        first = seen.setdefault(job.output.resolve(), job.input)
+        if first != job.input:
+            clashes.append(f"  - {first} and {job.input} -> {job.output}")
+    if clashes:
+        raise RenderError("Several inputs map to the same output:\n" + "\n".join(clashes))
+
+
+def plan_jobs(
+    inputs: list[Path],
+    out_dir: Path | None = None,
+    fmt: str = "png",
+    preview: bool = False,
+    roots: list[Path] | None = None,
+) -> list[BatchJob]:
+    """Pair inputs with output paths, next to each file or under ``out_dir``.
+
+    In ``out_dir``, an input under one of ``roots`` keeps its path relative to
+    that root (``a/x.excalidraw`` -> ``out/a/x.png``); other inputs go flat.
+    Raises RenderError if two inputs would still share an output.
+    """
+    jobs = []
+    for input_path in inputs:
+        output = default_output(input_path, fmt, preview)
+        if out_dir is not None:
+            output = out_dir / _relative_output(output, roots or [])
+        jobs.append(BatchJob(input_path, output))
+    check_outputs(jobs)
+    return jobs
+
+
+def render_batch(
+    jobs: list[BatchJob],
+    scale: int = 2,
+    max_width: int = 1920,
+    pool_size: int = 4,
+    offline: bool = False,
+    cache: RenderCache | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    fmt: str = "png",
+    preview: bool = False,
+    recycle: RecyclePolicy | None = None,
+) -> list[BatchResult]:
+    """Render every job across a pool of warm pages.
+
+    Never raises for per-file errors; raises RenderError, once, if the page
+    pool can't be opened.
+    """
+    results: dict[int, BatchResult] = {}
+    queue = deque(enumerate(jobs))
+
+    with RenderSession(offline=offline, cache=cache, timeout=timeout, recycle=recycle) as session:
+        # The renderer RSS budget is per page, and the whole pool shares one browser
+        session.recycler.pages = max(1, pool_size)
+        pages = []
+        # page index -> (job index, job, diagram, cache key, start time) for the render in flight
+        in_flight: dict[int, tuple[int, BatchJob, dict, str | None, float]] = {}
+
+        def open_pool() -> None:
+            """Open the pool's pages one at a time, closing those already open if one fails."""
+            try:
+                for _ in range(max(1, pool_size)):
+                    pages.append(session.open_page(scale))
+            except Exception as e:
+                for page in pages:
+                    with contextlib.suppress(Exception):
+                        page.context.close()
+                pages.clear()
+                if isinstance(e, RenderError):
+                    raise
+                raise RenderError(f"Cannot open the page pool: {_describe(e)}") from e
+
+        def fail(index: int, job: BatchJob, e: Exception, started: float, data: dict | None) -> None:
+            results[index] = BatchResult(str(job.input), None, False, _describe(e), time.perf_counter() - started)
+            if data is not None:
+                close_diagram(data)
+
+        def dispatch(slot: int) -> None:
+            """Start the next loadable job on page ``slot``, recording load failures."""
+            while queue:
+                index, job = queue.popleft()
+                started = time.perf_counter()
+                data = None
+                try:
+                    data = load_diagram(job.input)
+                    if preview:
+                        data = preview_diagram(data)
+                    job.output.parent.mkdir(parents=True, exist_ok=True)
+                    key, hit = session.cache_lookup(data, job.output, scale, max_width, fmt)
+                except Exception as e:
+                    fail(index, job, e, started, data)
+                    continue
+                if hit:
+                    seconds = time.perf_counter() - started
+                    results[index] = BatchResult(str(job.input), str(job.output), True, seconds=seconds, cached=True)
+                    close_diagram(data)
+                    continue
+                if not pages:
+                    # Not a per-file error: every queued job would hit it too, so it ends the batch
+                    try:
+                        open_pool()
+                    finally:
+                        if not pages:
+                            close_diagram(data)
+                try:
+                    session.start_render(pages[slot], data, max_width)
+                except Exception as e:
+                    fail(index, job, e, started, data)
+                    continue
+                in_flight[slot] = (index, job, data, key, started)
+                return
+
+        for slot in range(max(1, pool_size)):
+            dispatch(slot)
+
+        while in_flight:
+            for slot in sorted(in_flight):
+                index, job, data, key, started = in_flight.pop(slot)
+                try:
+                    session.finish_render(pages[slot], job.output, fmt=fmt)
+                    session.cache_store(key, job.output)
+                    results[index] = BatchResult(str(job.input), str(job.output), True, seconds=time.perf_counter() - started)
+                except Exception as e:
+                    results[index] = BatchResult(str(job.input), None, False, _describe(e), time.perf_counter() - started)
+                finally:
+                    close_diagram(data)
+                pages[slot] = session.recycle_if_due(pages[slot], scale)
+                dispatch(slot)
+
+    return [results[i] for i in range(len(jobs))]
+
+
+def print_report(results: list[BatchResult], report_path: Path | None = None) -> None:
+    """Print one line per file plus a summary to stderr, and optionally write JSON."""
+    for r in results:
+        if r.ok:
+            note = "cached" if r.cached else f"{r.seconds:.2f}s"
+            print(f"  ok    {r.input} -> {r.output} ({note})", file=sys.stderr)
+        else:
+            first_line = (r.error or "").splitlines()[0] if r.error else "unknown error"
+            print(f"  FAIL  {r.input}: {first_line}", file=sys.stderr)
+
+    failed = sum(1 for r in results if not r.ok)
+    print(f"Rendered {len(results) - failed}/{len(results)} files ({failed} failed)", file=sys.stderr)
+
+    if report_path is not None:
+        report_path.write_text(json.dumps([asdict(r) for r in results], indent=2), encoding="utf-8")
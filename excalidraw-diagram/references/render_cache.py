@@ -0,0 +1,200 @@
+"""Content-addressed output cache for render_excalidraw.py.
+
+Renders are keyed on a canonical hash of only the parts of a diagram that
+change the picture, plus ``scale``, ``width`` and the output format. Re-running the renderer on
+a file whose edits were cosmetic to the output (reordered keys, bumped
+``version``/``updated``/``versionNonce``, ``seed`` on shapes drawn with
+``roughness: 0``) copies the cached file instead of starting a browser.
+
+The cache directory is size-limited; least recently used entries (by mtime,
+refreshed on every hit) are evicted first. Each cache object keeps a running
+total of what it has stored and only rescans the directory once that total
+crosses the limit.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+from pathlib import Path
+
+from asset_cache import pinned_version
+
+# Bump when the render pipeline changes in a way that changes its output
+CACHE_FORMAT = 2
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "excalidraw-render"
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Temp files older than this belong to a writer that died mid-copy
+_STALE_TMP_SECONDS = 3600
+
+# Element keys that never change the exported image
+_VOLATILE_ELEMENT_KEYS = {"version", "versionNonce", "updated", "locked", "isDeleted"}
+
+# The only appState keys exportToSvg reads (the template forces the rest)
+_RENDER_APPSTATE_KEYS = {
+    "viewBackgroundColor",
+    "exportBackground",
+    "exportPadding",
+    "exportScale",
+    "exportEmbedScene",
+    "frameRendering",
+}
+
+
+def _normalize_element(el: dict) -> dict:
+    out = {k: v for k, v in el.items() if k not in _VOLATILE_ELEMENT_KEYS}
+    # rough.js only uses the seed to jitter strokes; with roughness 0 there is no jitter
+    if el.get("roughness", 1) == 0:
+        out.pop("seed", None)
+    return out
+
+
+def canonical_key(data: dict, scale: int, max_width: int, fmt: str = "png") -> str:
+    """Stable sha256 hex digest of everything that affects the rendered output."""
+    elements = [_normalize_element(e) for e in data.get("elements", []) if not e.get("isDeleted")]
+    app_state = {k: v for k, v in (data.get("appState") or {}).items() if k in _RENDER_APPSTATE_KEYS}
+
+    # Only image payloads that some live element points at; their timestamps don't matter
+    used_files = {e.get("fileId") for e in elements if e.get("type") == "image"}
+    files = data.get("files") or {}
+
+    h = hashlib.sha256()
+    header = {
+        "format": CACHE_FORMAT,
+        "excalidraw": pinned_version(),
+        "scale": scale,
+        "width": max_width,
+        "output": fmt,
+        "appState": app_state,
+    }
+    h.update(json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    # Element order is z-order, so it stays; only keys inside each element are sorted
+    h.update(json.dumps(elements, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    # Streamed diagrams (diagram_stream.Diagram) keep payloads on disk; hash them there
+    source = getattr(data, "file_source", None)
+    for file_id in sorted(f for f in used_files if f in files):
+        entry = files[file_id]
+        h.update(file_id.encode("utf-8"))
+        h.update(str(entry.get("mimeType", "")).encode("utf-8"))
+        if source is not None and file_id in source.spans:
+            h.update(source.digest(file_id).encode("ascii"))
+        else:
+            h.update(str(entry.get("dataURL", "")).encode("utf-8"))
+    return h.hexdigest()
+
+
+@functools.cache
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def replace_atomic(tmp: str, path: Path) -> None:
+    """Rename the finished temp file ``tmp`` over ``path``.
+
+    mkstemp creates files 0600; give ``tmp`` the mode ``path`` already has,
+    or the one a plain ``open`` would (0666 minus the umask), first.
+    """
+    try:
+        mode = stat.S_IMODE(path.stat().st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_umask()
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def _copy_atomic(src: Path, dest: Path) -> None:
+    """Copy ``src`` to a temp file beside ``dest`` and rename it into place.
+
+    Raises FileNotFoundError before creating anything if ``src`` is missing.
+    """
+    with open(src, "rb") as f_src:
+        fd, tmp = tempfile.mkstemp(dir=dest.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f_dst:
+                shutil.copyfileobj(f_src, f_dst)
+            replace_atomic(tmp, dest)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp)
+            raise
+
+
+class RenderCache:
+    """On-disk render cache with an LRU size limit. Entries are stored without an extension."""
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        # Bytes on disk as of the last scan plus everything put since; None until the first put
+        self._total: int | None = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str, dest: Path) -> bool:
+        """Copy the cached output for ``key`` to ``dest``. Returns False on a miss."""
+        path = self._path(key)
+        try:
+            # Same temp-and-rename as put, so a reader of ``dest`` never sees a partial file
+            _copy_atomic(path, dest)
+        except FileNotFoundError:
+            return False
+        # Mark as recently used
+        os.utime(path)
+        return True
+
+    def put(self, key: str, src: Path) -> None:
+        """Store a rendered file under ``key`` and evict old entries past the size limit."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if self._total is None:
+            self.evict()
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        # Write to a temp file and rename, so concurrent readers never see a partial file
+        _copy_atomic(src, path)
+        self._total += path.stat().st_size - replaced
+        # Other processes may share the directory; the rescan in evict corrects the total
+        if self._total > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits in ``max_bytes``.
+
+        Also removes temp files left behind by writers that died mid-copy.
+        """
+        entries = []
+        total = 0
+        stale = time.time() - _STALE_TMP_SECONDS
+        # Older formats' *.png entries are swept up too; in-progress *.tmp writes are not
+        for path in self.root.glob("*/*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".tmp":
+                if st.st_mtime < stale:
+                    path.unlink(missing_ok=True)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._total = total
@@ -0,0 +1,172 @@
+"""Warm render daemon for render_excalidraw.py.
+
+Keeps one headless Chromium and a loaded render template alive and serves
+renders over a small HTTP API bound to 127.0.0.1. Every request must carry
+the per-run token the daemon writes to ``daemon_token_path(port)`` (owner
+read/write only) as ``Authorization: Bearer <token>``; requests with an
+``Origin`` header, and POSTs whose body isn't ``application/json``, are
+refused, so web pages open in a browser can't drive the daemon. Re-rendering the same
+file patches only the elements that changed into the page's SVG. Requests are handled one
+at a time on the main thread (the sync Playwright API is single-threaded).
+
+Usage:
+    uv run python render_excalidraw.py --serve [--port 8765]
+
+API (every request: "Authorization: Bearer <token>"; POST bodies: "Content-Type: application/json"):
+    GET  /health    -> {"ok": true, "memory": {"js_heap_bytes": ..., "renderer_rss_bytes": ...}, "recycled": {...}}
+    POST /render    {"input": "/abs/a.excalidraw", "output": null, "scale": 2, "width": 1920, "format": "png",
+                     "preview": false}
+                    -> {"output": "/abs/a.png", "metrics": {...}}  or  HTTP 422 {"error": "..."}
+    POST /shutdown  -> {"ok": true}, then the daemon exits
+"""
+
+from __future__ import annotations
+
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from render_cache import RenderCache
+from render_excalidraw import (
+    DEFAULT_DAEMON_PORT,
+    DEFAULT_TIMEOUT,
+    OUTPUT_FORMATS,
+    RenderError,
+    RenderSession,
+    daemon_token_path,
+)
+from render_recycle import RecyclePolicy
+
+
+class _RenderHandler(BaseHTTPRequestHandler):
+    server: _RenderServer
+
+    def _reply(self, status: int, body: dict) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorized(self, post: bool) -> bool:
+        """Check the token, Origin and Content-Type; replies with an error and returns False if refused."""
+        if self.headers.get("Origin") is not None:
+            # Browsers send Origin on cross-site requests; local clients never do
+            self._reply(403, {"error": "Cross-origin requests are not allowed"})
+            return False
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            self._reply(401, {"error": "Missing or wrong daemon token"})
+            return False
+        content_type = self.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if post and content_type != "application/json":
+            self._reply(415, {"error": "Request body must be application/json"})
+            return False
+        return True
+
+    def do_GET(self) -> None:
+        if not self._authorized(post=False):
+            return
+        if self.path == "/health":
+            recycler = self.server.session.recycler
+            self._reply(200, {"ok": True, "memory": recycler.last_probe, "recycled": recycler.recycled})
+        else:
+            self._reply(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self) -> None:
+        if not self._authorized(post=True):
+            return
+        if self.path == "/shutdown":
+            self._reply(200, {"ok": True})
+            # shutdown() blocks until serve_forever returns, so call it off-thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path != "/render":
+            self._reply(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            req = json.loads(self.rfile.read(length))
+            input_path = Path(req["input"])
+            output_path = Path(req["output"]) if req.get("output") else None
+            scale = int(req.get("scale", 2))
+            width = int(req.get("width", 1920))
+            fmt = req.get("format", "png")
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(f"unknown format {fmt!r}")
+            preview = bool(req.get("preview", False))
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": f"Bad request: {e}"})
+            return
+
+        # Per-request numbers; the session itself lives as long as the daemon
+        self.server.session.metrics.reset()
+        try:
+            out = self.server.session.render(input_path, output_path, scale, width, fmt, preview)
+        except RenderError as e:
+            self._reply(422, {"error": str(e)})
+            return
+        except Exception as e:
+            # A crashed page or browser: drop it so the next request starts clean
+            self.server.session.close()
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._reply(200, {"output": str(out), "metrics": self.server.session.metrics.as_dict()})
+
+    def log_message(self, format: str, *args) -> None:
+        print(f"[render-daemon] {format % args}", file=sys.stderr)
+
+
+class _RenderServer(HTTPServer):
+    def __init__(self, port: int, session: RenderSession) -> None:
+        super().__init__(("127.0.0.1", port), _RenderHandler)
+        self.session = session
+        # Set once the port is bound, so a failed start never replaces a running daemon's token
+        self.token = ""
+
+
+def _write_token(path: Path) -> str:
+    """Create a fresh token file only the current user can read."""
+    token = secrets.token_urlsafe(32)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(token)
+    return token
+
+
+def serve(
+    port: int = DEFAULT_DAEMON_PORT,
+    offline: bool = False,
+    cache: RenderCache | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    recycle: RecyclePolicy | None = None,
+) -> None:
+    """Run the render daemon until /shutdown or Ctrl-C."""
+    with RenderSession(offline=offline, cache=cache, incremental=True, timeout=timeout, recycle=recycle) as session:
+        # Load the template up front so the first request is already warm
+        try:
+            session.warm()
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        token_path = daemon_token_path(port)
+        server = _RenderServer(port, session)
+        server.token = _write_token(token_path)
+        print(f"Render daemon listening on http://127.0.0.1:{port} (token in {token_path})", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            token_path.unlink(missing_ok=True)
@@ -1,9 +1,49 @@
-"""Render Excalidraw JSON to PNG using Playwright + headless Chromium.
+"""Render Excalidraw JSON to PNG (or SVG, PDF, WebP) using Playwright + headless Chromium.
 
 Usage:
     cd .claude/skills/excalidraw-diagram/references
     uv run python render_excalidraw.py <path-to-file.excalidraw> [--output path.png] [--scale 2] [--width 1920]
 
+Quick preview while iterating on layout (scale 1, no sketchiness, JPEG next to the input):
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --preview
+
+Vector or smaller output (SVG is the page's own exportToSvg markup; PDF uses the print pipeline):
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --format svg|pdf|webp
+
+Batch mode (one browser, a pool of pages, a per-file report):
+    uv run python render_excalidraw.py --batch diagrams/ "more/*.excalidraw" [--pool 4] [--out-dir out/]
+
+Offline rendering (record the pinned Excalidraw bundle and fonts once, then no network):
+    uv run python render_excalidraw.py --vendor-assets
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --offline
+
+Async engine (many renders in flight across browser contexts, per-render timeouts):
+    uv run python render_excalidraw.py --batch --async diagrams/ --pool 16 --timeout 20
+
+Layout lint (overlaps, text overflowing its container, arrows crossing shapes; no browser):
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --lint
+
+Tiled render for very large diagrams (bounded browser memory; optional zoom pyramid):
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --tile 1024
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --pyramid tiles/
+
+Per-phase timings, element count, payload size and peak RSS as JSON (file, or stderr without PATH):
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --metrics render-metrics.json
+
+What changed between two renders (changed regions, SSIM, a before|after crop; exit 1 if anything visible changed):
+    uv run python render_excalidraw.py --diff before.png after.png
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --changes    # against the previous render
+
+Browser-free SVG (SVG only; one unsupported element sends the whole diagram to the browser's SVG export):
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --native
+
+Watch mode (re-render files or directories on save, with a warm browser):
+    uv run python render_excalidraw.py --watch <path-to-file.excalidraw> [more files or directories]
+
+Warm render daemon (keeps one browser and template page loaded between renders):
+    uv run python render_excalidraw.py --serve &
+    uv run python render_excalidraw.py <path-to-file.excalidraw> --daemon
+
 First-time setup:
     cd .claude/skills/excalidraw-diagram/references
     uv sync
@@ -13,10 +53,102 @@ First-time setup:
 from __future__ import annotations
 
 import argparse
+import contextlib
+import copy
+import io
 import json
+import math
+import os
 import sys
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections.abc import Iterable
 from pathlib import Path
 
+if __name__ == "__main__":
+    # Sibling modules import this file by name; share one module (and one RenderError) with them
+    sys.modules.setdefault("render_excalidraw", sys.modules[__name__])
+
+from diagram_stream import STREAM_THRESHOLD_BYTES, load_streaming
+from geometry import element_boxes
+from render_cache import DEFAULT_CACHE_BYTES, DEFAULT_CACHE_DIR, RenderCache, canonical_key, replace_atomic
+from render_metrics import RenderMetrics
+from render_recycle import (
+    DEFAULT_MAX_JS_HEAP,
+    DEFAULT_MAX_RENDERER_RSS,
+    DEFAULT_MAX_RENDERS,
+    MB,
+    PageRecycler,
+    RecyclePolicy,
+)
+
+SETUP_HINT = "Run: cd .claude/skills/excalidraw-diagram/references && uv sync && uv run playwright install chromium"
+
+DEFAULT_DAEMON_PORT = 8765
+
+
+def daemon_token_path(port: int) -> Path:
+    """Where a daemon on ``port`` keeps its per-run token (readable by the owner only)."""
+    return DEFAULT_CACHE_DIR / f"daemon-{port}.token"
+
+
+# Per-render budget (seconds) for loading the template module and for renderDiagram
+DEFAULT_TIMEOUT = 30.0
+
+TEMPLATE_PATH = Path(__file__).parent / "render_template.html"
+
+# Tile edge in CSS px for --tile/--pyramid; Chromium never rasterizes more than one tile at a time
+DEFAULT_TILE = 1024
+
+# Playwright expressions shared by the sync session and the async engine
+MODULE_READY_JS = "window.__moduleReady === true"
+RENDER_COMPLETE_JS = "window.__renderComplete === true"
+
+# Starts renderDiagram without awaiting it. The diagram arrives as one JSON string
+# argument rather than as JS source: V8 runs JSON.parse several times faster than it
+# compiles the same data as an object literal, and never has to keep the source around.
+RENDER_JS = "([json, options]) => { window.__job = window.renderDiagram(JSON.parse(json), options); }"
+
+# --format choices; svg and pdf skip rasterization, webp re-encodes the screenshot
+OUTPUT_FORMATS = ("png", "jpeg", "svg", "pdf", "webp")
+JPEG_QUALITY = 80
+
+# --preview tier: a quarter of the pixels of the default scale 2, JPEG, simplified strokes
+PREVIEW_SCALE = 1
+PREVIEW_FORMAT = "jpeg"
+# Fill styles rough.js draws line by line; previews paint them solid instead
+_SKETCH_FILLS = {"hachure", "cross-hatch", "zigzag", "dots", "dashed", "zigzag-line"}
+
+# Route prefix the page fetches streamed image payloads from (never hits the network)
+FILES_URL = "https://excalidraw-render.invalid/files/"
+
+
+class RenderError(Exception):
+    """Raised when a diagram cannot be loaded, validated or rendered."""
+
+
+# Element types that can hold bound text (text.containerId)
+TEXT_CONTAINER_TYPES = {"rectangle", "ellipse", "diamond", "arrow"}
+
+# Cap on errors shown for one file; a broken generator can produce thousands
+MAX_REPORTED_ERRORS = 20
+
+# Numeric fields geometry.element_boxes reads from every element
+_NUMERIC_KEYS = ("x", "y", "width", "height", "angle")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _valid_points(points) -> bool:
+    return isinstance(points, list) and all(
+        isinstance(p, list) and len(p) >= 2 and _is_number(p[0]) and _is_number(p[1]) for p in points
+    )
+
 
 def validate_excalidraw(data: dict) -> list[str]:
     """Validate Excalidraw JSON structure. Returns list of errors (empty = valid)."""
@@ -31,75 +163,145 @@ def validate_excalidraw(data: dict) -> list[str]:
         errors.append("'elements' must be an array")
     elif len(data["elements"]) == 0:
         errors.append("'elements' array is empty — nothing to render")
+    else:
+        errors.extend(validate_references(data["elements"]))
 
     return errors
 
 
-def compute_bounding_box(elements: list[dict]) -> tuple[float, float, float, float]:
-    """Compute bounding box (min_x, min_y, max_x, max_y) across all elements."""
-    min_x = float("inf")
-    min_y = float("inf")
-    max_x = float("-inf")
-    max_y = float("-inf")
+def validate_references(elements: list[dict]) -> list[str]:
+    """Check ids, bindings, containers and frames across elements.
+
+    Builds an id -> element index in one pass, then checks every reference
+    against it in a second, so cost is O(n) in elements. References from
+    deleted elements are ignored; references from live elements to missing
+    or deleted ones are errors, since Excalidraw would drop or misplace them.
+    """
+    errors: list[str] = []
+    index: dict[str, dict] = {}
+
+    for i, el in enumerate(elements):
+        if not isinstance(el, dict):
+            errors.append(f"elements[{i}] is not an object")
+            continue
+        el_id = el.get("id")
+        if not isinstance(el_id, str) or not el_id:
+            errors.append(f"elements[{i}] has no string 'id'")
+            continue
+        if not isinstance(el.get("type"), str):
+            errors.append(f"{el_id}: missing 'type'")
+        if el_id in index:
+            errors.append(f"{el_id}: duplicate id")
+            continue
+        index[el_id] = el
+
+    def live(ref_id) -> dict | None:
+        target = index.get(ref_id) if isinstance(ref_id, str) else None
+        return None if target is None or target.get("isDeleted") else target
 
-    for el in elements:
+    for el_id, el in index.items():
         if el.get("isDeleted"):
             continue
-        x = el.get("x", 0)
-        y = el.get("y", 0)
-        w = el.get("width", 0)
-        h = el.get("height", 0)
-
-        # For arrows/lines, points array defines the shape relative to x,y
-        if el.get("type") in ("arrow", "line") and "points" in el:
-            for px, py in el["points"]:
-                min_x = min(min_x, x + px)
-                min_y = min(min_y, y + py)
-                max_x = max(max_x, x + px)
-                max_y = max(max_y, y + py)
-        else:
-            min_x = min(min_x, x)
-            min_y = min(min_y, y)
-            max_x = max(max_x, x + abs(w))
-            max_y = max(max_y, y + abs(h))
+        el_type = el.get("type")
 
-    if min_x == float("inf"):
-        return (0, 0, 800, 600)
+        container_id = el.get("containerId")
+        if el_type == "text" and container_id is not None:
+            container = live(container_id)
+            if container is None:
+                errors.append(f"{el_id}: containerId '{container_id}' does not exist")
+            elif container.get("type") not in TEXT_CONTAINER_TYPES:
+                errors.append(f"{el_id}: container '{container_id}' is a {container.get('type')}, which can't hold text")
+            elif not any(b.get("id") == el_id for b in container.get("boundElements") or [] if isinstance(b, dict)):
+                errors.append(f"{el_id}: container '{container_id}' doesn't list it in boundElements")
 
-    return (min_x, min_y, max_x, max_y)
+        for ref in el.get("boundElements") or []:
+            if not isinstance(ref, dict):
+                errors.append(f"{el_id}: boundElements entry {ref!r} is not an object")
+                continue
+            bound = live(ref.get("id"))
+            if bound is None:
+                errors.append(f"{el_id}: boundElements references missing '{ref.get('id')}'")
+            elif ref.get("type") == "text" and bound.get("containerId") != el_id:
+                errors.append(f"{el_id}: bound text '{ref.get('id')}' has containerId '{bound.get('containerId')}'")
 
+        for end in ("startBinding", "endBinding"):
+            binding = el.get(end)
+            if binding is None:
+                continue
+            target_id = binding.get("elementId") if isinstance(binding, dict) else None
+            if live(target_id) is None:
+                errors.append(f"{el_id}: {end} points to missing '{target_id}'")
+            elif target_id == el_id:
+                errors.append(f"{el_id}: {end} binds to itself")
 
-def render(
-    excalidraw_path: Path,
-    output_path: Path | None = None,
-    scale: int = 2,
-    max_width: int = 1920,
-) -> Path:
-    """Render an .excalidraw file to PNG. Returns the output PNG path."""
-    # Import playwright here so validation errors show before import errors
-    try:
-        from playwright.sync_api import sync_playwright
-    except ImportError:
-        print("ERROR: playwright not installed.", file=sys.stderr)
-        print("Run: cd .claude/skills/excalidraw-diagram/references && uv sync && uv run playwright install chromium", file=sys.stderr)
-        sys.exit(1)
+        # A null angle means unrotated; any other non-number would crash geometry.element_boxes
+        bad_numbers = [
+            k for k in _NUMERIC_KEYS if k in el and not _is_number(el[k]) and not (k == "angle" and el[k] is None)
+        ]
+        if bad_numbers:
+            errors.append(f"{el_id}: non-numeric {', '.join(bad_numbers)}")
+        if "points" in el and not _valid_points(el["points"]):
+            errors.append(f"{el_id}: points must be a list of [x, y] number pairs")
 
-    # Read and validate
-    raw = excalidraw_path.read_text(encoding="utf-8")
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as e:
-        print(f"ERROR: Invalid JSON in {excalidraw_path}: {e}", file=sys.stderr)
-        sys.exit(1)
+        group_ids = el.get("groupIds")
+        if group_ids is not None and not (
+            isinstance(group_ids, list) and all(isinstance(g, str) for g in group_ids)
+        ):
+            errors.append(f"{el_id}: groupIds must be a list of strings")
+
+        frame_id = el.get("frameId")
+        if frame_id is not None:
+            frame = live(frame_id)
+            if frame is None:
+                errors.append(f"{el_id}: frameId '{frame_id}' does not exist")
+            elif frame.get("type") not in ("frame", "magicframe"):
+                errors.append(f"{el_id}: frameId '{frame_id}' is a {frame.get('type')}, not a frame")
+
+    return errors
+
+
+def compute_bounding_box(elements: Iterable[dict]) -> tuple[float, float, float, float]:
+    """Compute bounding box (min_x, min_y, max_x, max_y) across all elements.
+
+    Rotation-aware; see geometry.element_boxes for the per-element boxes.
+    """
+    bounds = element_boxes(elements).bounds()
+    if bounds is None:
+        return (0, 0, 800, 600)
+    return bounds
+
+
+def load_diagram(excalidraw_path: Path) -> dict:
+    """Read and validate an .excalidraw file. Raises RenderError on bad input."""
+    if not excalidraw_path.exists():
+        raise RenderError(f"File not found: {excalidraw_path}")
+
+    if excalidraw_path.stat().st_size >= STREAM_THRESHOLD_BYTES:
+        # Big files are mostly image payloads; keep those on disk (see diagram_stream.py)
+        try:
+            data = load_streaming(excalidraw_path)
+        except ValueError as e:
+            raise RenderError(f"Invalid JSON in {excalidraw_path}: {e}") from e
+    else:
+        raw = excalidraw_path.read_text(encoding="utf-8")
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise RenderError(f"Invalid JSON in {excalidraw_path}: {e}") from e
 
     errors = validate_excalidraw(data)
     if errors:
-        print(f"ERROR: Invalid Excalidraw file:", file=sys.stderr)
-        for err in errors:
-            print(f"  - {err}", file=sys.stderr)
-        sys.exit(1)
+        close_diagram(data)
+        lines = [f"  - {err}" for err in errors[:MAX_REPORTED_ERRORS]]
+        if len(errors) > MAX_REPORTED_ERRORS:
+            lines.append(f"  ... and {len(errors) - MAX_REPORTED_ERRORS} more")
+        raise RenderError("Invalid Excalidraw file:\n" + "\n".join(lines))
+
+    return data
+
 
-    # Compute viewport size from element bounding box
+def compute_viewport(data: dict, max_width: int = 1920) -> tuple[int, int]:
+    """Viewport (width, height) that fits the diagram plus padding."""
     elements = [e for e in data["elements"] if not e.get("isDeleted")]
     min_x, min_y, max_x, max_y = compute_bounding_box(elements)
     padding = 80
@@ -109,80 +311,888 @@ def render(
     # Cap viewport width, let height be natural
     vp_width = min(int(diagram_w), max_width)
     vp_height = max(int(diagram_h), 600)
+    return vp_width, vp_height
 
-    # Output path
-    if output_path is None:
-        output_path = excalidraw_path.with_suffix(".png")
 
-    # Template path (same directory as this script)
-    template_path = Path(__file__).parent / "render_template.html"
-    if not template_path.exists():
-        print(f"ERROR: Template not found at {template_path}", file=sys.stderr)
-        sys.exit(1)
+def preview_diagram(data: dict) -> dict:
+    """Copy of ``data`` drawn without sketchiness: roughness 0 and solid instead of hatched fills.
+
+    Composition (layout, spacing, overlaps) is unchanged; only rough.js work is skipped.
+    """
+    preview = copy.copy(data)  # keeps a streamed Diagram's file_source
+    preview["elements"] = [
+        {**el, "roughness": 0, **({"fillStyle": "solid"} if el.get("fillStyle") in _SKETCH_FILLS else {})}
+        for el in data["elements"]
+    ]
+    return preview
+
 
-    template_url = template_path.as_uri()
+def default_output(excalidraw_path: Path, fmt: str = "png", preview: bool = False) -> Path:
+    """Output next to the input: ``a.png``, or ``a.preview.jpeg`` for previews."""
+    return excalidraw_path.with_name(f"{excalidraw_path.stem}{'.preview' if preview else ''}.{fmt}")
+
+
+def render_args(data: dict, incremental: bool = False, files_url: str | None = None) -> list:
+    """Argument for ``page.evaluate(RENDER_JS, ...)``: compact diagram JSON plus options."""
+    json_str = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return [json_str, {"incremental": incremental, "filesUrl": files_url}]
+
+
+def files_url_for(data: dict) -> str | None:
+    """A fresh route prefix if ``data`` keeps image payloads on disk, else None."""
+    if getattr(data, "file_source", None) is None:
+        return None
+    return f"{FILES_URL}{uuid.uuid4().hex}/"
+
+
+def close_diagram(data: dict) -> None:
+    """Release a streamed diagram's memory map; a no-op for plain dicts."""
+    if getattr(data, "file_source", None) is not None:
+        data.file_source.close()
+
+
+def file_response(data: dict, files_url: str, url: str) -> dict:
+    """``route.fulfill`` kwargs serving one streamed image payload to the page."""
+    file_id = urllib.parse.unquote(url[len(files_url):])
+    source = data.file_source
+    if file_id not in source.spans:
+        return {"status": 404, "headers": {"Access-Control-Allow-Origin": "*"}, "body": b""}
+    headers = {"Content-Type": "text/plain", "Access-Control-Allow-Origin": "*"}
+    return {"status": 200, "headers": headers, "body": source.read(file_id)}
+
+
+def check_render_result(result: dict | None) -> dict:
+    """Raise RenderError unless ``renderDiagram`` reported success."""
+    if not result or not result.get("success"):
+        error_msg = result.get("error", "Unknown render error") if result else "renderDiagram returned null"
+        raise RenderError(f"Render failed: {error_msg}")
+    return result
+
+
+def pdf_options(result: dict) -> dict:
+    """``page.pdf`` kwargs for one page exactly the size of the rendered SVG."""
+    width = math.ceil(float(result["width"]))
+    height = math.ceil(float(result["height"]))
+    return {
+        "width": f"{width}px",
+        "height": f"{height}px",
+        "print_background": True,
+        "page_ranges": "1",
+        "margin": {"top": "0", "right": "0", "bottom": "0", "left": "0"},
+    }
+
+
+def webp_bytes(png: bytes) -> bytes:
+    """Re-encode a PNG screenshot as lossless WebP (Chromium can't capture WebP itself)."""
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise RenderError(f"WebP output needs Pillow.\n{SETUP_HINT}") from e
+    out = io.BytesIO()
+    with Image.open(io.BytesIO(png)) as im:
+        im.save(out, format="WEBP", lossless=True, method=4)
+    return out.getvalue()
 
-    with sync_playwright() as p:
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write ``data`` beside ``path`` and rename, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        replace_atomic(tmp, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(tmp)
+        raise
+
+
+def _stamp(path: Path) -> tuple[int, int]:
+    """Cheap identity for a file on disk: (mtime_ns, size), or (0, 0) if missing."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return (0, 0)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class RenderSession:
+    """A headless Chromium with the render template loaded and ready.
+
+    One-shot renders open a session, render once and close it. Long-lived
+    callers (the daemon) keep the session open so each render only pays for
+    ``renderDiagram`` plus the screenshot. Pages are kept per device scale
+    factor, since Chromium fixes the scale when a page is created. With a
+    ``RenderCache``, unchanged diagrams are copied from the cache and never
+    reach the browser. With ``incremental=True`` the shared pages keep the
+    last scene and re-export only changed elements; when the previous PNG is
+    still on disk, only the dirty region is screenshotted and pasted into it.
+    Every phase is timed into ``metrics`` (see render_metrics.py). Pages that
+    have served too many renders or grown too much are swapped for fresh ones
+    according to ``recycle`` (see render_recycle.py).
+
+        with RenderSession() as session:
+            session.render(Path("a.excalidraw"))
+            session.render(Path("b.excalidraw"), scale=1)
+    """
+
+    def __init__(
+        self,
+        offline: bool = False,
+        record_assets: bool = False,
+        cache: RenderCache | None = None,
+        incremental: bool = False,
+        timeout: float = DEFAULT_TIMEOUT,
+        metrics: RenderMetrics | None = None,
+        recycle: RecyclePolicy | None = None,
+    ) -> None:
+        self.offline = offline
+        self.timeout = timeout
+        self.metrics = metrics or RenderMetrics()
+        self.cache = cache
+        self.incremental = incremental
+        # scale -> (output path, stat stamp) of the last file written by the shared page
+        self._last_output: dict[int, tuple[Path, tuple[int, int]]] = {}
+        self.record_assets = record_assets
+        self.assets = None
+        self._playwright = None
+        self._browser = None
+        self._timeout_error: type[Exception] = Exception
+        self._pages: dict[int, object] = {}
+        # id(page) -> route pattern serving the in-flight diagram's image payloads
+        self._file_routes: dict[int, str] = {}
+        self.recycler = PageRecycler(recycle)
+
+    def __enter__(self) -> RenderSession:
+        # The browser starts lazily on the first render, so bad input fails fast
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self) -> None:
+        if self._browser is not None:
+            return
+
+        # Import playwright here so validation errors show before import errors
         try:
-            browser = p.chromium.launch(headless=True)
+            from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+            from playwright.sync_api import sync_playwright
+        except ImportError as e:
+            raise RenderError(f"playwright not installed.\n{SETUP_HINT}") from e
+        self._timeout_error = PlaywrightTimeoutError
+
+        from asset_cache import AssetCache, AssetIntegrityError
+
+        try:
+            self.assets = AssetCache(offline=self.offline, record=self.record_assets)
+        except AssetIntegrityError as e:
+            raise RenderError(str(e)) from e
+
+        # Driver startup plus Chromium launch
+        with self.metrics.phase("launch"):
+            self._playwright = sync_playwright().start()
+            try:
+                self._browser = self._playwright.chromium.launch(headless=True)
+            except Exception as e:
+                self._playwright.stop()
+                self._playwright = None
+                if "Executable doesn't exist" in str(e) or "browserType.launch" in str(e):
+                    raise RenderError(f"Chromium not installed for Playwright.\n{SETUP_HINT}") from e
+                raise
+
+    def close(self) -> None:
+        with self.metrics.phase("close"):
+            if self._browser is not None:
+                self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                self._playwright.stop()
+                self._playwright = None
+        self._pages.clear()
+        self._last_output.clear()
+        self.recycler.reset()
+
+    def warm(self, scale: int = 2) -> None:
+        """Launch the browser and load the template for ``scale`` ahead of time."""
+        self._page(scale)
+
+    def _page(self, scale: int):
+        """Return the shared template page for ``scale``, loading it on first use."""
+        page = self._pages.get(scale)
+        if page is None:
+            page = self._pages[scale] = self.open_page(scale)
+        return page
+
+    def open_page(self, scale: int = 2):
+        """Open a new page with the render template loaded and its module ready."""
+        if not TEMPLATE_PATH.exists():
+            raise RenderError(f"Template not found at {TEMPLATE_PATH}")
+
+        self.start()
+        page = self._browser.new_page(device_scale_factor=scale)
+        self.assets.install(page)
+        with self.metrics.phase("goto"):
+            page.goto(TEMPLATE_PATH.as_uri())
+
+        # Wait for the ES module to load (vendored copy, or esm.sh on a cache miss)
+        try:
+            with self.metrics.phase("module_load"):
+                page.wait_for_function(MODULE_READY_JS, timeout=self.timeout * 1000)
         except Exception as e:
-            if "Executable doesn't exist" in str(e) or "browserType.launch" in str(e):
-                print("ERROR: Chromium not installed for Playwright.", file=sys.stderr)
-                print("Run: cd .claude/skills/excalidraw-diagram/references && uv run playwright install chromium", file=sys.stderr)
-                sys.exit(1)
+            problems = self.assets.problems()
+            if problems:
+                raise RenderError("Excalidraw module failed to load:\n" + "\n".join(f"  - {p}" for p in problems)) from e
             raise
+        return page
 
-        page = browser.new_page(
-            viewport={"width": vp_width, "height": vp_height},
-            device_scale_factor=scale,
-        )
+    def recycle_if_due(self, page, scale: int = 2):
+        """Call after each render on ``page``: returns it, or a fresh page if it was due for recycling.
+
+        A page created by ``browser.new_page`` owns its browser context, so
+        closing the context also releases the page's renderer process.
+        """
+        reason = self.recycler.check(page, self._browser)
+        self.metrics.count("memory", dict(self.recycler.last_probe))
+        if reason is None:
+            return page
+        self.metrics.count("recycled", dict(self.recycler.recycled))
+        self.recycler.forget(page)
+        shared = self._pages.get(scale) is page
+        if shared:
+            del self._pages[scale]
+            # The replacement page has no scene to patch
+            self._last_output.pop(scale, None)
+        with self.metrics.phase("recycle"):
+            page.context.close()
+            fresh = self.open_page(scale)
+        if shared:
+            self._pages[scale] = fresh
+        return fresh
+
+    def start_render(
+        self,
+        page,
+        data: dict,
+        max_width: int = 1920,
+        incremental: bool = False,
+        viewport: tuple[int, int] | None = None,
+    ) -> None:
+        """Size the viewport and kick off ``renderDiagram`` without waiting for it.
 
-        # Load the template
-        page.goto(template_url)
+        ``viewport`` overrides the size computed from the diagram (tiled renders).
+        """
+        vp_width, vp_height = viewport or compute_viewport(data, max_width)
+        page.set_viewport_size({"width": vp_width, "height": vp_height})
 
-        # Wait for the ES module to load (imports from esm.sh)
-        page.wait_for_function("window.__moduleReady === true", timeout=30000)
+        files_url = files_url_for(data)
+        if files_url:
+            page.route(files_url + "*", lambda route: route.fulfill(**file_response(data, files_url, route.request.url)))
+            self._file_routes[id(page)] = files_url + "*"
 
         # Inject the diagram data and render
-        json_str = json.dumps(data)
-        result = page.evaluate(f"window.renderDiagram({json_str})")
+        try:
+            args = render_args(data, incremental, files_url)
+            self.metrics.count("payload_bytes", len(args[0]))
+            self.metrics.count("viewport", [vp_width, vp_height])
+            with self.metrics.phase("inject"):
+                page.evaluate(RENDER_JS, args)
+        except BaseException:
+            # wait_render won't run for this page, so it can't unroute
+            self._unroute_files(page)
+            raise
 
-        if not result or not result.get("success"):
-            error_msg = result.get("error", "Unknown render error") if result else "renderDiagram returned null"
-            print(f"ERROR: Render failed: {error_msg}", file=sys.stderr)
-            browser.close()
-            sys.exit(1)
+    def _unroute_files(self, page) -> None:
+        pattern = self._file_routes.pop(id(page), None)
+        if pattern:
+            page.unroute(pattern)
+
+    def wait_render(self, page) -> dict:
+        """Wait for the render started on ``page`` and return its checked result."""
+        # Wait for render completion signal, then collect the (settled) result
+        try:
+            with self.metrics.phase("render"):
+                page.wait_for_function(RENDER_COMPLETE_JS, timeout=self.timeout * 1000)
+        except self._timeout_error as e:
+            raise RenderError(f"Render timed out after {self.timeout:g}s") from e
+        finally:
+            self._unroute_files(page)
+        result = check_render_result(page.evaluate("window.__job"))
+        self.metrics.count("render_mode", result.get("mode", "full"))
+        self.metrics.count("svg_size", [float(result["width"]), float(result["height"])])
+        return result
+
+    def finish_render(self, page, output_path: Path, reuse_previous: bool = False, fmt: str = "png") -> Path:
+        """Wait for the render started on ``page`` and write it to ``output_path`` as ``fmt``.
 
-        # Wait for render completion signal
-        page.wait_for_function("window.__renderComplete === true", timeout=15000)
+        ``reuse_previous`` means ``output_path`` already holds the page's last
+        render, so an unchanged scene skips writing and a patched PNG only
+        re-captures its dirty region.
+        """
+        result = self.wait_render(page)
 
-        # Screenshot the SVG element
         svg_el = page.query_selector("#root svg")
         if svg_el is None:
-            print("ERROR: No SVG element found after render.", file=sys.stderr)
-            browser.close()
-            sys.exit(1)
+            raise RenderError("No SVG element found after render.")
+
+        mode = result.get("mode", "full")
+        if reuse_previous and mode == "unchanged":
+            return output_path
+        with self.metrics.phase("output"):
+            if fmt == "png" and reuse_previous and mode == "patch" and self._composite(page, svg_el, output_path, result):
+                return output_path
+            self.write_output(page, svg_el, result, output_path, fmt)
+        return output_path
+
+    def write_output(self, page, svg_el, result: dict, output_path: Path, fmt: str = "png") -> None:
+        """Write the page's current SVG as ``fmt``; only png and webp are rasterized.
+
+        Output is written atomically, so watchers and viewers never see a partial file.
+        """
+        if fmt == "svg":
+            write_atomic(output_path, svg_el.evaluate("el => el.outerHTML").encode("utf-8"))
+        elif fmt == "pdf":
+            write_atomic(output_path, page.pdf(**pdf_options(result)))
+        elif fmt == "webp":
+            write_atomic(output_path, webp_bytes(svg_el.screenshot()))
+        elif fmt == "jpeg":
+            write_atomic(output_path, svg_el.screenshot(type="jpeg", quality=JPEG_QUALITY))
+        else:
+            write_atomic(output_path, svg_el.screenshot())
+
+    def _composite(self, page, svg_el, output_path: Path, result: dict) -> bool:
+        """Paste a screenshot of the dirty region into the previous PNG. False if not possible."""
+        try:
+            from PIL import Image
+        except ImportError:
+            return False
+
+        dirty = result["dirty"]
+        if dirty["width"] <= 0 or dirty["height"] <= 0:
+            return True
+
+        dpr = page.evaluate("window.devicePixelRatio")
+        with Image.open(output_path) as prev:
+            prev.load()
+        expected = (round(float(result["width"]) * dpr), round(float(result["height"]) * dpr))
+        if prev.size != expected:
+            return False
+
+        box = svg_el.bounding_box()
+        clip = {
+            "x": box["x"] + dirty["x"],
+            "y": box["y"] + dirty["y"],
+            "width": dirty["width"],
+            "height": dirty["height"],
+        }
+        patch = Image.open(io.BytesIO(page.screenshot(clip=clip, full_page=True)))
+        prev.paste(patch.convert(prev.mode), (round(dirty["x"] * dpr), round(dirty["y"] * dpr)))
+
+        out = io.BytesIO()
+        prev.save(out, format="PNG")
+        write_atomic(output_path, out.getvalue())
+        return True
+
+    def render(
+        self,
+        excalidraw_path: Path,
+        output_path: Path | None = None,
+        scale: int = 2,
+        max_width: int = 1920,
+        fmt: str = "png",
+        preview: bool = False,
+    ) -> Path:
+        """Render an .excalidraw file to ``fmt`` (see OUTPUT_FORMATS). Returns the output path.
+
+        ``preview`` renders a simplified copy (see preview_diagram) to ``a.preview.<fmt>``.
+        """
+        data = self._load(excalidraw_path)
+        if preview:
+            data = preview_diagram(data)
+
+        if output_path is None:
+            output_path = default_output(excalidraw_path, fmt, preview)
+
+        try:
+            key, hit = self.cache_lookup(data, output_path, scale, max_width, fmt)
+            if hit:
+                return output_path
+
+            page = self._page(scale)
+            previous = self._last_output.get(scale)
+            reuse_previous = self.incremental and previous == (output_path.resolve(), _stamp(output_path))
+
+            self.start_render(page, data, max_width, self.incremental)
+            self.finish_render(page, output_path, reuse_previous, fmt)
+        finally:
+            close_diagram(data)
+        if self.incremental:
+            self._last_output[scale] = (output_path.resolve(), _stamp(output_path))
+        self.cache_store(key, output_path)
+        self.recycle_if_due(page, scale)
+        return output_path
+
+    def cache_lookup(self, data: dict, output_path: Path, scale: int, max_width: int, fmt: str) -> tuple[str | None, bool]:
+        """Return the cache key for ``data`` (None without a cache) and whether ``output_path`` was filled from it."""
+        with self.metrics.phase("cache_lookup"):
+            key = canonical_key(data, scale, max_width, fmt) if self.cache else None
+            hit = bool(key) and self.cache.get(key, output_path)
+        self.metrics.count("cached", hit)
+        return key, hit
+
+    def cache_store(self, key: str | None, output_path: Path) -> None:
+        """Store a finished render under ``key`` from cache_lookup; no-op without one."""
+        if key:
+            with self.metrics.phase("cache_store"):
+                self.cache.put(key, output_path)
+
+    def _load(self, excalidraw_path: Path) -> dict:
+        with self.metrics.phase("load"):
+            data = load_diagram(excalidraw_path)
+        self.metrics.count("input_bytes", excalidraw_path.stat().st_size)
+        self.metrics.count("elements", sum(1 for e in data["elements"] if not e.get("isDeleted")))
+        return data
+
+    def render_tiled(
+        self,
+        excalidraw_path: Path,
+        output_path: Path | None = None,
+        scale: int = 2,
+        tile: int = DEFAULT_TILE,
+        pyramid_dir: Path | None = None,
+    ) -> Path:
+        """Render in ``tile``-sized screenshots and stitch them and/or build a zoom pyramid.
+
+        Without ``pyramid_dir`` the stitched PNG goes next to the input by
+        default; with it, a PNG is only stitched if ``output_path`` is given.
+        Returns the PNG path, or ``pyramid_dir`` when no PNG was written.
+        """
+        from render_tiles import render_tiles
+
+        data = self._load(excalidraw_path)
+        if output_path is None and pyramid_dir is None:
+            output_path = excalidraw_path.with_suffix(".png")
+
+        page = self._page(scale)
+        # The shared page is about to show a different scene; its last PNG no longer matches
+        self._last_output.pop(scale, None)
+        try:
+            self.start_render(page, data, viewport=(tile, tile))
+            result = self.wait_render(page)
+            with self.metrics.phase("tiles"):
+                render_tiles(page, result, output_path, pyramid_dir, scale, tile)
+        finally:
+            close_diagram(data)
+        self.recycle_if_due(page, scale)
+        return output_path or pyramid_dir
+
+
+def render(
+    excalidraw_path: Path,
+    output_path: Path | None = None,
+    scale: int = 2,
+    max_width: int = 1920,
+    offline: bool = False,
+    cache: RenderCache | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    metrics: RenderMetrics | None = None,
+    fmt: str = "png",
+    preview: bool = False,
+) -> Path:
+    """Render an .excalidraw file to ``fmt``. Returns the output path."""
+    try:
+        with RenderSession(offline=offline, cache=cache, timeout=timeout, metrics=metrics) as session:
+            return session.render(excalidraw_path, output_path, scale, max_width, fmt, preview)
+    except RenderError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def render_tiled(
+    excalidraw_path: Path,
+    output_path: Path | None = None,
+    scale: int = 2,
+    tile: int = DEFAULT_TILE,
+    pyramid_dir: Path | None = None,
+    offline: bool = False,
+    timeout: float = DEFAULT_TIMEOUT,
+    metrics: RenderMetrics | None = None,
+) -> Path:
+    """Tiled render of an .excalidraw file (see render_tiles.py). Returns the PNG or pyramid path."""
+    try:
+        with RenderSession(offline=offline, timeout=timeout, metrics=metrics) as session:
+            return session.render_tiled(excalidraw_path, output_path, scale, tile, pyramid_dir)
+    except RenderError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def render_native(excalidraw_path: Path, output_path: Path | None = None) -> Path | None:
+    """Export to SVG in-process with svg_export. Returns None if the diagram needs the browser."""
+    from svg_export import export_svg, unsupported_reasons
+
+    data = load_diagram(excalidraw_path)
+    try:
+        reasons = unsupported_reasons(data)
+        if reasons:
+            print(f"Native export unsupported ({reasons[0]}); rendering the whole diagram in the browser.", file=sys.stderr)
+            return None
+
+        if output_path is None:
+            output_path = default_output(excalidraw_path, "svg")
+        output_path.write_text(export_svg(data), encoding="utf-8")
+        return output_path
+    finally:
+        close_diagram(data)
+
+
+def vendor_assets() -> Path:
+    """Render a probe diagram with recording on and save the vendored asset manifest."""
+    # One text element per font family so every font file gets requested
+    probe = {
+        "type": "excalidraw",
+        "elements": [
+            {"id": f"t{family}", "type": "text", "x": 0, "y": 40 * family, "width": 200, "height": 25,
+             "text": "Vendored assets", "fontSize": 20, "fontFamily": family}
+            for family in (1, 2, 3)
+        ],
+        "appState": {},
+        "files": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        probe_path = Path(tmp) / "probe.excalidraw"
+        probe_path.write_text(json.dumps(probe), encoding="utf-8")
+        with RenderSession(record_assets=True) as session:
+            session.render(probe_path)
+            return session.assets.save()
+
+
+def render_via_daemon(
+    excalidraw_path: Path,
+    output_path: Path | None = None,
+    scale: int = 2,
+    max_width: int = 1920,
+    port: int = DEFAULT_DAEMON_PORT,
+    fmt: str = "png",
+    preview: bool = False,
+) -> Path | None:
+    """Ask a running render daemon to render. Returns None if no daemon is listening."""
+    try:
+        token = daemon_token_path(port).read_text(encoding="ascii").strip()
+    except OSError:
+        return None
+    payload = {
+        "input": str(excalidraw_path.resolve()),
+        "output": str(output_path.resolve()) if output_path else None,
+        "scale": scale,
+        "width": max_width,
+        "format": fmt,
+        "preview": preview,
+    }
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/render",
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=120) as resp:
+            body = json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        body = json.loads(e.read() or b"{}")
+        raise RenderError(body.get("error", f"Daemon returned HTTP {e.code}")) from e
+    except (urllib.error.URLError, ConnectionError):
+        return None
+    return Path(body["output"])
+
+
+def _report_preview(out_path: Path, scale: int, metrics: RenderMetrics) -> None:
+    size = out_path.stat().st_size
+    svg_size = metrics.counters.get("svg_size")
+    pixels = f"{round(svg_size[0] * scale)}x{round(svg_size[1] * scale)} px, " if svg_size else ""
+    print(
+        f"preview: {pixels}{size / 1024:.0f} KB in {metrics.as_dict()['total']:.2f}s"
+        " (render without --preview once the layout is settled)",
+        file=sys.stderr,
+    )
+
+
+def load_image_diff():
+    """The image_diff module. Raises RenderError if NumPy or Pillow is missing."""
+    try:
+        import image_diff
+    except ImportError as e:
+        raise RenderError(f"Image diff needs NumPy and Pillow.\n{SETUP_HINT}") from e
+    return image_diff
+
+
+def _snapshot(output_path: Path):
+    """The previous render at ``output_path``, decoded before it is overwritten (None if absent)."""
+    try:
+        return load_image_diff().snapshot(output_path)
+    except RenderError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
 
-        svg_el.screenshot(path=str(output_path))
-        browser.close()
 
-    return output_path
+def _report_changes(previous, out_path: Path) -> None:
+    print(f"changes: {load_image_diff().diff_against(previous, out_path)}", file=sys.stderr)
+
+
+def _diff_command(before: Path, after: Path, crop_path: Path | None) -> None:
+    try:
+        image_diff = load_image_diff()
+        for path in (before, after):
+            if not path.exists():
+                raise RenderError(f"File not found: {path}")
+        a, b = image_diff.load_rgb(before), image_diff.load_rgb(after)
+    except (RenderError, OSError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    result = image_diff.diff_arrays(a, b)
+    crop = image_diff.write_changes(a, b, result, crop_path or image_diff.changes_path(after))
+    print(json.dumps({**result.as_dict(), "crop": str(crop) if crop else None}, indent=2))
+    print(image_diff.format_summary(result), file=sys.stderr)
+    # Like diff(1): 1 when something visible changed
+    sys.exit(1 if result.changed else 0)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Render Excalidraw JSON to PNG")
-    parser.add_argument("input", type=Path, help="Path to .excalidraw JSON file")
-    parser.add_argument("--output", "-o", type=Path, default=None, help="Output PNG path (default: same name with .png)")
-    parser.add_argument("--scale", "-s", type=int, default=2, help="Device scale factor (default: 2)")
+    parser.add_argument("input", nargs="*", help="Path to .excalidraw JSON file (with --batch: files, directories or globs)")
+    parser.add_argument("--output", "-o", type=Path, default=None, help="Output path (default: same name with the format's extension)")
+    parser.add_argument("--format", "-f", dest="fmt", choices=OUTPUT_FORMATS, default=None,
+                        help=f"Output format (default: png, or {PREVIEW_FORMAT} with --preview)")
+    parser.add_argument("--scale", "-s", type=int, default=None, help=f"Device scale factor (default: 2, or {PREVIEW_SCALE} with --preview)")
+    parser.add_argument("--preview", "-p", action="store_true",
+                        help="Fast layout check: low scale, no sketchiness, JPEG to <name>.preview.jpeg")
     parser.add_argument("--width", "-w", type=int, default=1920, help="Max viewport width (default: 1920)")
+    parser.add_argument("--validate", action="store_true", help="Only validate the file (ids, bindings, containers); no browser")
+    parser.add_argument("--lint", action="store_true", help="Validate, then report overlaps, overflowing text and arrows crossing shapes; no browser")
+    parser.add_argument("--native", action="store_true", help="Write SVG without a browser (SVG output only). If any element is unsupported, "
+                             "the whole diagram is rendered by the browser instead")
+    parser.add_argument("--tile", type=int, default=None, help=f"Render in TILE x TILE px screenshots and stitch them (default size: {DEFAULT_TILE})")
+    parser.add_argument("--pyramid", type=Path, default=None, help="Tiled: write a zoom pyramid here (a PNG is stitched only with --output)")
+    parser.add_argument("--batch", "-b", action="store_true", help="Render many files with one browser and a page pool")
+    parser.add_argument("--manifest", type=Path, default=None, help="Batch: JSON list of inputs or {input, output} objects")
+    parser.add_argument("--out-dir", type=Path, default=None, help="Batch/watch: write outputs here instead of next to each input, mirroring directory inputs' layout")
+    parser.add_argument("--pool", type=int, default=4, help="Batch: number of pages rendering at once (default: 4)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Batch: use the asyncio engine (render_async.render_many)")
+    parser.add_argument("--report", type=Path, default=None, help="Batch: write a JSON per-file report here")
+    parser.add_argument("--metrics", nargs="?", const="-", default=None, metavar="PATH",
+                        help="Write per-phase timings and counters as JSON to PATH (bare --metrics: stderr)")
+    parser.add_argument("--timeout", "-t", type=float, default=DEFAULT_TIMEOUT, help=f"Per-render timeout in seconds (default: {DEFAULT_TIMEOUT:g})")
+    parser.add_argument("--offline", action="store_true", help="Fail instead of fetching assets that aren't vendored")
+    parser.add_argument("--vendor-assets", action="store_true", help="Record the pinned Excalidraw bundle and fonts into vendor/")
+    parser.add_argument("--no-cache", action="store_true", help="Always render, skipping the content-addressed PNG cache")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help=f"Render cache directory (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024), help="Render cache size limit in MB (default: 256)")
+    parser.add_argument("--diff", nargs=2, type=Path, default=None, metavar=("BEFORE", "AFTER"),
+                        help="Compare two renders: JSON report on stdout, before|after crop to AFTER.changes.png (or --output)")
+    parser.add_argument("--changes", action="store_true",
+                        help="Render/watch: diff each render with the previous one at its output path and report what changed")
+    parser.add_argument("--watch", action="store_true", help="Re-render the given files/directories whenever they change")
+    parser.add_argument("--serve", action="store_true", help="Run a warm render daemon on localhost instead of rendering")
+    parser.add_argument("--daemon", "-d", action="store_true", help="Render through a running daemon (falls back to in-process)")
+    parser.add_argument("--port", type=int, default=DEFAULT_DAEMON_PORT, help=f"Daemon port (default: {DEFAULT_DAEMON_PORT})")
+    parser.add_argument("--recycle-after", type=int, default=DEFAULT_MAX_RENDERS, metavar="N",
+                        help=f"Serve/batch/watch: replace a page after N renders, 0 for never (default: {DEFAULT_MAX_RENDERS})")
+    parser.add_argument("--max-heap", type=int, default=DEFAULT_MAX_JS_HEAP // MB, metavar="MB",
+                        help=f"Serve/batch/watch: replace a page whose JS heap exceeds MB after GC, 0 for no limit "
+                             f"(default: {DEFAULT_MAX_JS_HEAP // MB})")
+    parser.add_argument("--max-rss", type=int, default=DEFAULT_MAX_RENDERER_RSS // MB, metavar="MB",
+                        help=f"Serve/batch/watch: replace pages while Chromium renderers use more than MB resident per page, "
+                             f"0 for no limit (default: {DEFAULT_MAX_RENDERER_RSS // MB})")
     args = parser.parse_args()
+    if args.native:
+        if args.fmt not in (None, "svg") or (args.output is not None and args.output.suffix.lower() != ".svg"):
+            parser.error("--native only writes SVG; drop --native to render png, jpeg, webp or pdf")
+        # The browser fallback then writes the same SVG file
+        args.fmt = "svg"
+    if args.scale is None:
+        args.scale = PREVIEW_SCALE if args.preview else 2
+    if args.fmt is None:
+        args.fmt = PREVIEW_FORMAT if args.preview else "png"
+    if args.changes and args.fmt in ("svg", "pdf"):
+        parser.error("--changes compares raster renders (png, jpeg, webp)")
+    if args.changes and args.batch:
+        parser.error("--changes works on one file or with --watch, not with --batch")
+
+    cache = None if args.no_cache else RenderCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    if args.vendor_assets:
+        try:
+            print(str(vendor_assets()))
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    recycle = RecyclePolicy(
+        max_renders=args.recycle_after or None,
+        max_js_heap_bytes=args.max_heap * MB or None,
+        max_renderer_rss_bytes=args.max_rss * MB or None,
+    )
+
+    if args.serve:
+        from render_daemon import serve
+
+        serve(args.port, args.offline, cache, args.timeout, recycle)
+        return
+
+    if args.watch:
+        from render_watch import watch
+
+        if not args.input:
+            parser.error("--watch needs at least one file or directory")
+        try:
+            watch([Path(p) for p in args.input], args.out_dir, args.scale, args.width, args.fmt,
+                  args.offline, cache, args.timeout, preview=args.preview, recycle=recycle, changes=args.changes)
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        return
+
+    if args.batch:
+        from render_batch import (
+            check_outputs,
+            collect_inputs,
+            input_roots,
+            plan_jobs,
+            print_report,
+            read_manifest,
+            render_batch,
+        )
+
+        try:
+            jobs = plan_jobs(collect_inputs(args.input), args.out_dir, args.fmt, args.preview, input_roots(args.input))
+            if args.manifest is not None:
+                jobs += read_manifest(args.manifest, args.fmt, args.preview)
+                check_outputs(jobs)
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        if not jobs:
+            parser.error("--batch needs at least one input or a --manifest")
+
+        if args.use_async:
+            import asyncio
+
+            from render_async import render_jobs
+
+            try:
+                results = asyncio.run(
+                    render_jobs(jobs, args.pool, scale=args.scale, max_width=args.width, timeout=args.timeout,
+                                offline=args.offline, cache=cache, fmt=args.fmt, preview=args.preview, recycle=recycle)
+                )
+            except RenderError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            try:
+                results = render_batch(jobs, args.scale, args.width, args.pool, args.offline, cache, args.timeout,
+                                       args.fmt, args.preview, recycle)
+            except RenderError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+        print_report(results, args.report)
+        for r in results:
+            if r.ok:
+                print(r.output)
+        sys.exit(0 if all(r.ok for r in results) else 1)
+
+    if args.diff is not None:
+        _diff_command(args.diff[0], args.diff[1], args.output)
+        return
+
+    if len(args.input) != 1:
+        parser.error("expected exactly one input (use --batch for several)")
+    args.input = Path(args.input[0])
 
     if not args.input.exists():
         print(f"ERROR: File not found: {args.input}", file=sys.stderr)
         sys.exit(1)
 
-    png_path = render(args.input, args.output, args.scale, args.width)
-    print(str(png_path))
+    if args.validate:
+        try:
+            close_diagram(load_diagram(args.input))
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"OK: {args.input}")
+        return
+
+    if args.lint:
+        from diagram_lint import lint_diagram
+
+        try:
+            data = load_diagram(args.input)
+        except RenderError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            warnings = lint_diagram(data)
+        finally:
+            close_diagram(data)
+        for warning in warnings:
+            print(f"WARN: {warning}")
+        if warnings:
+            sys.exit(1)
+        print(f"OK: {args.input}")
+        return
+
+    previous = None
+    if args.changes:
+        if args.tile is not None or args.pyramid is not None or args.native:
+            parser.error("--changes compares raster renders (png, jpeg, webp)")
+        previous = _snapshot(args.output or default_output(args.input, args.fmt, args.preview))
+
+    metrics = RenderMetrics()
+    try:
+        if args.tile is not None or args.pyramid is not None:
+            if args.fmt != "png":
+                parser.error("--tile/--pyramid only produce PNG")
+            out_path = render_tiled(args.input, args.output, args.scale, args.tile or DEFAULT_TILE,
+                                    args.pyramid, args.offline, args.timeout, metrics)
+            print(str(out_path))
+            return
+
+        if args.native:
+            try:
+                with metrics.phase("native"):
+                    svg_path = render_native(args.input, args.output)
+            except RenderError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+            if svg_path is not None:
+                print(str(svg_path))
+                return
+
+        if args.daemon:
+            try:
+                with metrics.phase("daemon"):
+                    out_path = render_via_daemon(args.input, args.output, args.scale, args.width, args.port, args.fmt,
+                                                 args.preview)
+            except RenderError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+            if out_path is not None:
+                print(str(out_path))
+                if args.changes:
+                    _report_changes(previous, out_path)
+                return
+            print(f"No render daemon on port {args.port}; rendering in-process.", file=sys.stderr)
+
+        out_path = render(args.input, args.output, args.scale, args.width, args.offline, cache, args.timeout, metrics,
+                          args.fmt, args.preview)
+        print(str(out_path))
+        if args.preview:
+            _report_preview(out_path, args.scale, metrics)
+        if args.changes:
+            _report_changes(previous, out_path)
+    finally:
+        # Also on failure: a timeout is exactly when the phase breakdown matters
+        if args.metrics is not None:
+            metrics.emit(None if args.metrics == "-" else Path(args.metrics))
 
 
 if __name__ == "__main__":
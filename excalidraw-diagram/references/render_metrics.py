@@ -0,0 +1,80 @@
+"""Per-phase timings and counters for render_excalidraw.py (``--metrics``).
+
+``RenderSession`` times each phase it goes through (browser launch, template
+``goto``, module load, diagram load, data injection, ``renderDiagram``,
+output (screenshot or SVG/PDF export), cache work) into a ``RenderMetrics``
+and records counters such as element count and payload size. With ``--metrics out.json`` (or bare
+``--metrics`` for stderr) they are written as one JSON object:
+
+    {"total": 2.91, "phases": {"launch": 0.42, "goto": 0.05, ...},
+     "counters": {"elements": 148, "input_bytes": 81234, ...},
+     "peak_rss_bytes": ..., "peak_child_rss_bytes": ...}
+
+Phases that run more than once (tiles) accumulate. Long-lived sessions (the
+daemon, watch mode) call ``reset`` before each render, so the numbers always
+describe one render rather than growing for the life of the process.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows has no resource module
+    resource = None
+
+
+def _peak_rss(who: int) -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RenderMetrics:
+    """Wall-clock seconds per phase plus free-form counters."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop everything recorded so far and restart the ``total`` clock."""
+        self.phases: dict[str, float] = {}
+        self.counters: dict[str, object] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name: str, value: object) -> None:
+        self.counters[name] = value
+
+    def as_dict(self) -> dict:
+        return {
+            "total": round(time.perf_counter() - self._started, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "counters": dict(self.counters),
+            "peak_rss_bytes": _peak_rss(resource.RUSAGE_SELF) if resource else None,
+            # Largest single finished child (Playwright driver or Chromium, once the session is closed)
+            "peak_child_rss_bytes": _peak_rss(resource.RUSAGE_CHILDREN) if resource else None,
+        }
+
+    def emit(self, path: Path | None = None) -> None:
+        """Write the metrics as JSON to ``path``, or to stderr when None."""
+        text = json.dumps(self.as_dict(), indent=2)
+        if path is None:
+            print(text, file=sys.stderr)
+        else:
+            path.write_text(text + "\n", encoding="utf-8")
@@ -0,0 +1,185 @@
+"""Page and context recycling for long-lived render sessions.
+
+``renderDiagram`` only clears ``#root`` between renders, and Excalidraw keeps
+module-level caches (fonts, shapes, images), so a page that serves thousands
+of renders (the daemon, a big batch, ``--watch``) slowly grows. A
+``PageRecycler`` watches every page a session renders on and says when to
+throw it away:
+
+- after ``max_renders`` renders, unconditionally;
+- when the page's JS heap (CDP ``Performance.getMetrics``, ``JSHeapUsedSize``)
+  is still above ``max_js_heap_bytes`` after a forced garbage collection;
+- when the resident memory of all renderer processes (CDP
+  ``SystemInfo.getProcessInfo`` plus ``/proc``, so Linux only) is above
+  ``max_renderer_rss_bytes`` per live page. CDP doesn't say which renderer
+  process a page lives in, so the browser-wide total is compared against
+  the limit times the number of open pages (the larger of the pool size the
+  caller declares and the pages seen rendering); a pool of 16 pages gets
+  16 times the budget of a single page.
+
+Memory is probed every ``check_every`` renders, since each probe is a few
+CDP round trips. ``RenderSession`` replaces a recycled page (and its browser
+context, which owns the renderer process) with a freshly loaded template
+page, so throughput stays flat instead of degrading with heap size.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+MB = 1024 * 1024
+
+DEFAULT_MAX_RENDERS = 500
+DEFAULT_MAX_JS_HEAP = 512 * MB
+DEFAULT_MAX_RENDERER_RSS = 2048 * MB
+DEFAULT_CHECK_EVERY = 10
+
+
+@dataclass
+class RecyclePolicy:
+    """Limits after which a render page is replaced; None disables a limit.
+
+    ``max_renderer_rss_bytes`` is a per-page budget (see the module docstring).
+    """
+
+    max_renders: int | None = DEFAULT_MAX_RENDERS
+    max_js_heap_bytes: int | None = DEFAULT_MAX_JS_HEAP
+    max_renderer_rss_bytes: int | None = DEFAULT_MAX_RENDERER_RSS
+    check_every: int = DEFAULT_CHECK_EVERY
+
+    def over_heap(self, js_heap: int | None) -> bool:
+        return self.max_js_heap_bytes is not None and js_heap is not None and js_heap > self.max_js_heap_bytes
+
+    def over_rss(self, rss: int | None, pages: int = 1) -> bool:
+        """Whether ``rss``, the renderer total for ``pages`` live pages, is over their combined budget."""
+        return (
+            self.max_renderer_rss_bytes is not None
+            and rss is not None
+            and rss > self.max_renderer_rss_bytes * max(1, pages)
+        )
+
+
+def _metric(response: dict, name: str) -> int | None:
+    for m in response.get("metrics", []):
+        if m.get("name") == name:
+            return int(m["value"])
+    return None
+
+
+def process_rss(pid: int) -> int | None:
+    """Resident bytes of ``pid`` from /proc, or None where unavailable."""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def renderer_rss(process_info: dict) -> int | None:
+    """Total resident bytes of the renderer processes in a ``SystemInfo.getProcessInfo`` reply."""
+    sizes = [process_rss(int(p["id"])) for p in process_info.get("processInfo", []) if p.get("type") == "renderer"]
+    sizes = [s for s in sizes if s is not None]
+    return sum(sizes) if sizes else None
+
+
+class PageRecycler:
+    """Per-page render counts and memory probes for one browser.
+
+    ``check`` (sync API) or ``check_async`` (async API) is called once after
+    each render and returns why the page should be recycled, or None.
+    Callers then close the page and call ``forget``.
+    """
+
+    def __init__(self, policy: RecyclePolicy | None = None, pages: int = 1) -> None:
+        self.policy = policy or RecyclePolicy()
+        # Pages the caller keeps open at once (its pool size); scales the RSS budget
+        self.pages = pages
+        # reason -> pages recycled for it
+        self.recycled: dict[str, int] = {}
+        # Latest probe: {"js_heap_bytes": ..., "renderer_rss_bytes": ..., "pages": ...}
+        self.last_probe: dict[str, int | None] = {}
+        self._renders: dict[object, int] = {}
+        self._cdp: dict[object, object] = {}
+        self._browser_cdp = None
+
+    def _count(self, page) -> tuple[int, bool]:
+        """Bump the page's render count; (count, whether memory is due for a probe)."""
+        renders = self._renders[page] = self._renders.get(page, 0) + 1
+        return renders, self.policy.check_every > 0 and renders % self.policy.check_every == 0
+
+    def _verdict(self, renders: int, js_heap: int | None = None, rss: int | None = None) -> str | None:
+        if self.policy.max_renders and renders >= self.policy.max_renders:
+            reason = "renders"
+        elif self.policy.over_heap(js_heap):
+            reason = "js_heap"
+        elif self.policy.over_rss(rss, self._open_pages()):
+            reason = "renderer_rss"
+        else:
+            return None
+        self.recycled[reason] = self.recycled.get(reason, 0) + 1
+        return reason
+
+    def _open_pages(self) -> int:
+        return max(self.pages, len(self._renders))
+
+    def _wants_memory(self) -> bool:
+        return self.policy.max_js_heap_bytes is not None or self.policy.max_renderer_rss_bytes is not None
+
+    def check(self, page, browser) -> str | None:
+        renders, probe = self._count(page)
+        if not probe or not self._wants_memory():
+            return self._verdict(renders)
+
+        cdp = self._cdp.get(page)
+        if cdp is None:
+            cdp = self._cdp[page] = page.context.new_cdp_session(page)
+            cdp.send("Performance.enable")
+        js_heap = _metric(cdp.send("Performance.getMetrics"), "JSHeapUsedSize")
+        if self.policy.over_heap(js_heap):
+            # Only live objects count; garbage that a collection frees is not a leak
+            cdp.send("HeapProfiler.collectGarbage")
+            js_heap = _metric(cdp.send("Performance.getMetrics"), "JSHeapUsedSize")
+
+        rss = None
+        if self.policy.max_renderer_rss_bytes is not None:
+            if self._browser_cdp is None:
+                self._browser_cdp = browser.new_browser_cdp_session()
+            rss = renderer_rss(self._browser_cdp.send("SystemInfo.getProcessInfo"))
+
+        self.last_probe = {"js_heap_bytes": js_heap, "renderer_rss_bytes": rss, "pages": self._open_pages()}
+        return self._verdict(renders, js_heap, rss)
+
+    async def check_async(self, page, browser) -> str | None:
+        renders, probe = self._count(page)
+        if not probe or not self._wants_memory():
+            return self._verdict(renders)
+
+        cdp = self._cdp.get(page)
+        if cdp is None:
+            cdp = self._cdp[page] = await page.context.new_cdp_session(page)
+            await cdp.send("Performance.enable")
+        js_heap = _metric(await cdp.send("Performance.getMetrics"), "JSHeapUsedSize")
+        if self.policy.over_heap(js_heap):
+            await cdp.send("HeapProfiler.collectGarbage")
+            js_heap = _metric(await cdp.send("Performance.getMetrics"), "JSHeapUsedSize")
+
+        rss = None
+        if self.policy.max_renderer_rss_bytes is not None:
+            if self._browser_cdp is None:
+                self._browser_cdp = await browser.new_browser_cdp_session()
+            rss = renderer_rss(await self._browser_cdp.send("SystemInfo.getProcessInfo"))
+
+        self.last_probe = {"js_heap_bytes": js_heap, "renderer_rss_bytes": rss, "pages": self._open_pages()}
+        return self._verdict(renders, js_heap, rss)
+
+    def forget(self, page) -> None:
+        """Drop state for a closed page."""
+        self._renders.pop(page, None)
+        self._cdp.pop(page, None)
+
+    def reset(self) -> None:
+        """Drop all per-page and per-browser state (the browser was closed)."""
+        self._renders.clear()
+        self._cdp.clear()
+        self._browser_cdp = None
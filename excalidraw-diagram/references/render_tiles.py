@@ -0,0 +1,246 @@
+"""Tiled rendering for diagrams too large for one screenshot.
+
+A plain render sizes the viewport to the whole diagram and takes a single
+element screenshot, so Chromium has to rasterize the full image at once.
+In tiled mode the viewport stays one tile big: the SVG is shifted under it
+(``window.panTo`` in render_template.html) and each tile is captured with a
+clipped screenshot. The tiles are then
+
+- stitched into one PNG by ``stitch_tiles``, which streams scanlines through
+  ``PngStreamWriter`` so only one row of tiles is in memory, and/or
+- reduced into a zoom pyramid by ``build_pyramid``: ``<dir>/<level>/<col>_<row>.png``
+  where the highest level is full resolution and level 0 is a single tile,
+  described by ``<dir>/pyramid.json``.
+
+    uv run python render_excalidraw.py huge.excalidraw --tile 1024
+    uv run python render_excalidraw.py huge.excalidraw --pyramid huge_tiles/
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+from render_excalidraw import DEFAULT_TILE, RenderError, replace_atomic
+
+PAN_JS = "([x, y]) => window.panTo(x, y)"
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@dataclass
+class TileGrid:
+    """Tile layout of an SVG of ``width`` x ``height`` CSS px."""
+
+    width: int
+    height: int
+    tile: int
+
+    @property
+    def cols(self) -> int:
+        return math.ceil(self.width / self.tile)
+
+    @property
+    def rows(self) -> int:
+        return math.ceil(self.height / self.tile)
+
+    def clip(self, col: int, row: int) -> dict:
+        x, y = col * self.tile, row * self.tile
+        return {"x": x, "y": y, "width": min(self.tile, self.width - x), "height": min(self.tile, self.height - y)}
+
+
+def _tile_path(tile_dir: Path, col: int, row: int) -> Path:
+    return tile_dir / f"{col}_{row}.png"
+
+
+class PngStreamWriter:
+    """Write an 8-bit RGB PNG a few rows at a time, without holding the image.
+
+    The file is written beside ``path`` and renamed into place on ``close``,
+    so readers never see a partial PNG.
+    """
+
+    def __init__(self, path: Path, width: int, height: int) -> None:
+        self.path = path
+        self.width = width
+        self.height = height
+        self._rows = 0
+        self._z = zlib.compressobj(6)
+        fd, self._tmp = tempfile.mkstemp(dir=path.parent, suffix=".png")
+        self._f = os.fdopen(fd, "wb")
+        self._f.write(_PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def __enter__(self) -> PngStreamWriter:
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def _discard(self) -> None:
+        self._f.close()
+        if os.path.exists(self._tmp):
+            os.unlink(self._tmp)
+
+    def _chunk(self, tag: bytes, data: bytes) -> None:
+        self._f.write(struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data)))
+
+    def write_rows(self, raw: bytes) -> None:
+        """Append whole RGB scanlines (``width * 3`` bytes each)."""
+        stride = self.width * 3
+        if len(raw) % stride:
+            raise ValueError("raw data is not a whole number of rows")
+        # Filter type 0 per scanline; deflate handles the flat backgrounds well enough
+        filtered = b"".join(b"\x00" + raw[i : i + stride] for i in range(0, len(raw), stride))
+        self._rows += len(raw) // stride
+        out = self._z.compress(filtered)
+        if out:
+            self._chunk(b"IDAT", out)
+
+    def close(self) -> None:
+        try:
+            if self._rows != self.height:
+                raise ValueError(f"wrote {self._rows} rows, expected {self.height}")
+            self._chunk(b"IDAT", self._z.flush())
+            self._chunk(b"IEND", b"")
+            self._f.close()
+            replace_atomic(self._tmp, self.path)
+        except BaseException:
+            self._discard()
+            raise
+
+
+def capture_tiles(page, width: float, height: float, tile_dir: Path, tile: int = DEFAULT_TILE) -> TileGrid:
+    """Screenshot the rendered SVG tile by tile into ``tile_dir/<col>_<row>.png``.
+
+    The page's viewport must already be ``tile`` x ``tile`` CSS px.
+    """
+    grid = TileGrid(math.ceil(width), math.ceil(height), tile)
+    tile_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        for row in range(grid.rows):
+            for col in range(grid.cols):
+                clip = grid.clip(col, row)
+                page.evaluate(PAN_JS, [clip["x"], clip["y"]])
+                page.screenshot(
+                    path=str(_tile_path(tile_dir, col, row)),
+                    clip={"x": 0, "y": 0, "width": clip["width"], "height": clip["height"]},
+                )
+    finally:
+        page.evaluate(PAN_JS, [0, 0])
+    return grid
+
+
+def stitch_tiles(grid: TileGrid, tile_dir: Path, output_path: Path) -> Path:
+    """Join captured tiles into one PNG, one row of tiles in memory at a time."""
+    from PIL import Image
+
+    def size(col: int, row: int) -> tuple[int, int]:
+        # Image.open only reads the header
+        with Image.open(_tile_path(tile_dir, col, row)) as im:
+            return im.size
+
+    width = sum(size(col, 0)[0] for col in range(grid.cols))
+    height = sum(size(0, row)[1] for row in range(grid.rows))
+
+    with PngStreamWriter(output_path, width, height) as writer:
+        for row in range(grid.rows):
+            strip = None
+            x = 0
+            for col in range(grid.cols):
+                with Image.open(_tile_path(tile_dir, col, row)) as im:
+                    if strip is None:
+                        strip = Image.new("RGB", (width, im.height), "white")
+                    strip.paste(im.convert("RGB"), (x, 0))
+                    x += im.width
+            writer.write_rows(strip.tobytes())
+    return output_path
+
+
+def pyramid_levels(grid: TileGrid) -> int:
+    """Number of zoom levels until the whole diagram fits in one tile."""
+    return math.ceil(math.log2(max(grid.cols, grid.rows, 1))) + 1
+
+
+def build_pyramid(grid: TileGrid, pyramid_dir: Path, scale: int) -> Path:
+    """Halve the full-resolution tiles in ``pyramid_dir/<top>`` down to a single tile.
+
+    Each lower tile is built from (up to) four tiles of the level above, so
+    memory stays at a handful of tiles regardless of diagram size.
+    """
+    from PIL import Image
+
+    top = pyramid_levels(grid) - 1
+    cols, rows = grid.cols, grid.rows
+    for level in range(top - 1, -1, -1):
+        src, dst = pyramid_dir / str(level + 1), pyramid_dir / str(level)
+        dst.mkdir(parents=True, exist_ok=True)
+        next_cols, next_rows = math.ceil(cols / 2), math.ceil(rows / 2)
+        for row in range(next_rows):
+            for col in range(next_cols):
+                parts = {}
+                for dy in (0, 1):
+                    for dx in (0, 1):
+                        c, r = 2 * col + dx, 2 * row + dy
+                        if c < cols and r < rows:
+                            with Image.open(_tile_path(src, c, r)) as im:
+                                parts[dx, dy] = im.convert("RGB")
+                w = parts[0, 0].width + (parts[1, 0].width if (1, 0) in parts else 0)
+                h = parts[0, 0].height + (parts[0, 1].height if (0, 1) in parts else 0)
+                mosaic = Image.new("RGB", (w, h), "white")
+                for (dx, dy), im in parts.items():
+                    mosaic.paste(im, (dx * parts[0, 0].width, dy * parts[0, 0].height))
+                mosaic.reduce(2).save(_tile_path(dst, col, row))
+        cols, rows = next_cols, next_rows
+
+    with Image.open(_tile_path(pyramid_dir / str(top), 0, 0)) as first:
+        tile_px = max(first.size)
+    manifest = {
+        "tileSize": tile_px,
+        "width": math.ceil(grid.width * scale),
+        "height": math.ceil(grid.height * scale),
+        "scale": scale,
+        "levels": top + 1,
+        "columns": grid.cols,
+        "rows": grid.rows,
+    }
+    (pyramid_dir / "pyramid.json").write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    return pyramid_dir
+
+
+def render_tiles(
+    page,
+    result: dict,
+    output_path: Path | None,
+    pyramid_dir: Path | None,
+    scale: int,
+    tile: int = DEFAULT_TILE,
+) -> None:
+    """Capture a finished render on ``page`` as tiles and stitch and/or pyramid them."""
+    try:
+        width, height = float(result["width"]), float(result["height"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise RenderError("Render did not report the SVG size") from e
+
+    if pyramid_dir is not None:
+        # Full-resolution tiles go straight into the pyramid's top level
+        grid = TileGrid(math.ceil(width), math.ceil(height), tile)
+        top_dir = pyramid_dir / str(pyramid_levels(grid) - 1)
+        grid = capture_tiles(page, width, height, top_dir, tile)
+        if output_path is not None:
+            stitch_tiles(grid, top_dir, output_path)
+        build_pyramid(grid, pyramid_dir, scale)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="excalidraw-tiles-") as tmp:
+        grid = capture_tiles(page, width, height, Path(tmp), tile)
+        stitch_tiles(grid, Path(tmp), output_path)
@@ -0,0 +1,247 @@
+"""Watch mode for render_excalidraw.py: re-render diagrams as they are saved.
+
+Watches files and directories (recursively, for ``*.excalidraw``) and
+re-renders whatever changed through one long-lived incremental
+``RenderSession``, so the browser and template page stay warm and an edit
+usually reaches the image in well under a second. Bursts of writes (editors
+that save in several steps, ``git checkout``) are debounced into one render
+per file. Outputs are written atomically, so an image viewer never sees a
+half-written file.
+
+On Linux, changes come from inotify (through ctypes, no extra dependency);
+elsewhere, or if inotify is unavailable, the targets are polled.
+
+    uv run python render_excalidraw.py --watch diagram.excalidraw docs/
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from render_batch import plan_jobs
+from render_cache import RenderCache
+from render_excalidraw import DEFAULT_TIMEOUT, RenderError, RenderSession, load_image_diff
+from render_recycle import RecyclePolicy
+
+# Quiet period (seconds) after the last write before a file is rendered
+DEFAULT_DEBOUNCE = 0.15
+
+# Polling fallback interval (seconds)
+POLL_INTERVAL = 0.5
+
+SUFFIX = ".excalidraw"
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_ISDIR = 0x40000000
+_IN_Q_OVERFLOW = 0x00004000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def _expand(targets: list[Path]) -> tuple[set[Path], set[Path]]:
+    """(explicit files, directories) to watch."""
+    files = {t.resolve() for t in targets if not t.is_dir()}
+    dirs = {t.resolve() for t in targets if t.is_dir()}
+    return files, dirs
+
+
+def _scan(files: set[Path], dirs: set[Path]) -> set[Path]:
+    found = {f for f in files if f.exists()}
+    for d in dirs:
+        found.update(p.resolve() for p in d.rglob(f"*{SUFFIX}"))
+    return found
+
+
+class _InotifyWatcher:
+    """Directory watches via inotify; explicit files are watched through their parent."""
+
+    def __init__(self, files: set[Path], dirs: set[Path]) -> None:
+        name = ctypes.util.find_library("c")
+        libc = ctypes.CDLL(name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not available")
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._files = files
+        self._dirs = dirs
+        self._watches: dict[int, tuple[Path, bool]] = {}
+        for f in files:
+            self._add(f.parent, recursive=False)
+        for d in dirs:
+            self._add(d, recursive=True)
+
+    def _add(self, directory: Path, recursive: bool) -> None:
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {directory}")
+        # A directory may be both an explicit file's parent and a recursive target
+        previous = self._watches.get(wd)
+        self._watches[wd] = (directory, recursive or (previous is not None and previous[1]))
+        if recursive:
+            for sub in directory.iterdir():
+                if sub.is_dir():
+                    self._add(sub, recursive=True)
+
+    def _wanted(self, path: Path, recursive: bool) -> bool:
+        return path.suffix == SUFFIX and (recursive or path in self._files)
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        """Changed diagram files seen within ``timeout`` seconds (None: block until one)."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed: set[Path] = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(buf):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(buf, pos)
+                raw = buf[pos + _EVENT_HEADER.size : pos + _EVENT_HEADER.size + length]
+                pos += _EVENT_HEADER.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    # Events were dropped; treat everything as changed
+                    return _scan(self._files, self._dirs)
+                if wd not in self._watches:
+                    continue
+                directory, recursive = self._watches[wd]
+                path = directory / os.fsdecode(raw.rstrip(b"\0"))
+                if mask & _IN_ISDIR:
+                    if recursive and mask & (_IN_CREATE | _IN_MOVED_TO):
+                        self._add(path, recursive=True)
+                        changed.update(p.resolve() for p in path.rglob(f"*{SUFFIX}"))
+                    continue
+                if self._wanted(path, recursive):
+                    changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class _PollingWatcher:
+    """Portable fallback: compare (mtime, size) of every diagram every POLL_INTERVAL."""
+
+    def __init__(self, files: set[Path], dirs: set[Path]) -> None:
+        self._files = files
+        self._dirs = dirs
+        self._stamps = self._stat()
+
+    def _stat(self) -> dict[Path, tuple[int, int]]:
+        stamps = {}
+        for path in _scan(self._files, self._dirs):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            stamps[path] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def wait(self, timeout: float | None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = POLL_INTERVAL if deadline is None else min(POLL_INTERVAL, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            stamps = self._stat()
+            changed = {p for p, stamp in stamps.items() if self._stamps.get(p) != stamp}
+            self._stamps = stamps
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+def _open_watcher(files: set[Path], dirs: set[Path]):
+    if sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(files, dirs)
+        except OSError as e:
+            print(f"inotify unavailable ({e}); polling every {POLL_INTERVAL:g}s", file=sys.stderr)
+    return _PollingWatcher(files, dirs)
+
+
+def watch(
+    targets: list[Path],
+    out_dir: Path | None = None,
+    scale: int = 2,
+    max_width: int = 1920,
+    fmt: str = "png",
+    offline: bool = False,
+    cache: RenderCache | None = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    debounce: float = DEFAULT_DEBOUNCE,
+    preview: bool = False,
+    recycle: RecyclePolicy | None = None,
+    changes: bool = False,
+) -> None:
+    """Render every diagram under ``targets``, then re-render each one as it changes, until Ctrl-C.
+
+    With ``changes``, each re-render is diffed with the image it replaces (see image_diff.py);
+    raises RenderError up front if NumPy or Pillow is missing.
+    """
+    if changes:
+        image_diff = load_image_diff()
+    files, dirs = _expand(targets)
+    watcher = _open_watcher(files, dirs)
+
+    with RenderSession(offline=offline, cache=cache, incremental=True, timeout=timeout, recycle=recycle) as session:
+
+        def render_all(paths: set[Path]) -> None:
+            try:
+                jobs = plan_jobs(sorted(p for p in paths if p.exists()), out_dir, fmt, preview, sorted(dirs))
+            except RenderError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                return
+            for job in jobs:
+                started = time.perf_counter()
+                try:
+                    job.output.parent.mkdir(parents=True, exist_ok=True)
+                    previous = image_diff.snapshot(job.output) if changes else None
+                    session.metrics.reset()
+                    out = session.render(job.input, job.output, scale, max_width, fmt, preview)
+                except RenderError as e:
+                    # Keep watching: the next save will likely fix it
+                    print(f"ERROR: {job.input}: {e}", file=sys.stderr)
+                    continue
+                except Exception as e:
+                    # A crashed page or browser: drop it so the next render starts clean
+                    session.close()
+                    print(f"ERROR: {job.input}: {type(e).__name__}: {e}", file=sys.stderr)
+                    continue
+                print(f"rendered {job.input} -> {out} ({time.perf_counter() - started:.2f}s)", file=sys.stderr)
+                if changes:
+                    print(f"  changes: {image_diff.diff_against(previous, out)}", file=sys.stderr)
+
+        try:
+            render_all(_scan(files, dirs))
+            print(f"Watching {len(targets)} target(s); Ctrl-C to stop", file=sys.stderr)
+            pending: set[Path] = set()
+            while True:
+                changed = watcher.wait(debounce if pending else None)
+                if changed:
+                    pending |= changed
+                    continue
+                if pending:
+                    render_all(pending)
+                    pending.clear()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
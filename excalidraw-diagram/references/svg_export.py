@@ -0,0 +1,261 @@
+"""Browser-free SVG export for the common Excalidraw element types.
+
+Rectangles, ellipses, diamonds, lines, arrows and text in the three classic
+font families are drawn directly as SVG in-process, which takes milliseconds
+instead of a Chromium start. Anything else (freedraw, images, frames,
+embeds, other fonts) makes ``unsupported_reasons`` non-empty and callers
+fall back to the Playwright renderer.
+
+Shapes are drawn with clean geometry: ``roughness`` jitter is not
+reproduced, so hand-drawn diagrams look smoother here than in Excalidraw.
+Good for previews; use the browser path for final output.
+"""
+
+from __future__ import annotations
+
+import math
+from xml.sax.saxutils import escape
+
+from geometry import element_boxes
+
+NATIVE_TYPES = {"rectangle", "ellipse", "diamond", "line", "arrow", "text"}
+
+# fontFamily ids shipped with the pinned Excalidraw version
+FONT_FAMILIES = {
+    1: "Virgil, Segoe UI Emoji",
+    2: "Helvetica, Segoe UI Emoji",
+    3: "Cascadia, Segoe UI Emoji",
+}
+
+FONT_FACES = (
+    '@font-face { font-family: "Virgil"; src: url("https://excalidraw.com/Virgil.woff2"); }'
+    '@font-face { font-family: "Cascadia"; src: url("https://excalidraw.com/Cascadia.woff2"); }'
+)
+
+DEFAULT_EXPORT_PADDING = 10
+
+# Excalidraw's adaptive corner radius (roundness type 3)
+_ADAPTIVE_RADIUS = 32
+_PROPORTIONAL_RADIUS = 0.25
+
+
+def unsupported_reasons(data: dict) -> list[str]:
+    """Why ``data`` can't be exported natively (empty list = supported)."""
+    reasons: list[str] = []
+    for el in data.get("elements", []):
+        if el.get("isDeleted"):
+            continue
+        el_type = el.get("type")
+        if el_type not in NATIVE_TYPES:
+            reasons.append(f"{el.get('id')}: element type '{el_type}'")
+        elif el_type == "text" and el.get("fontFamily", 1) not in FONT_FAMILIES:
+            reasons.append(f"{el.get('id')}: fontFamily {el.get('fontFamily')}")
+        elif el.get("frameId"):
+            reasons.append(f"{el.get('id')}: inside a frame")
+    return reasons
+
+
+def _num(v: float) -> str:
+    """Compact number formatting: at most 2 decimals, no trailing zeros."""
+    s = f"{v:.2f}".rstrip("0").rstrip(".")
+    return "0" if s in ("-0", "") else s
+
+
+def _attr(value) -> str:
+    """Escape ``value`` for a double-quoted attribute (``escape`` leaves quotes alone)."""
+    return escape(str(value), {'"': "&quot;"})
+
+
+def _stroke_attrs(el: dict) -> str:
+    stroke = el.get("strokeColor", "#1e1e1e")
+    width = el.get("strokeWidth", 1)
+    attrs = f' stroke="{_attr(stroke)}" stroke-width="{_num(width)}"'
+    style = el.get("strokeStyle", "solid")
+    if style == "dashed":
+        attrs += f' stroke-dasharray="8 {_num(8 + width)}"'
+    elif style == "dotted":
+        attrs += f' stroke-dasharray="1.5 {_num(6 + width)}" stroke-linecap="round"'
+    return attrs
+
+
+def _fill_attr(el: dict, patterns: dict[str, tuple[str, str]]) -> str:
+    color = el.get("backgroundColor", "transparent")
+    if not color or color == "transparent":
+        return ' fill="none"'
+    fill_style = el.get("fillStyle", "solid")
+    if fill_style == "solid":
+        return f' fill="{_attr(color)}"'
+
+    # hachure / cross-hatch / zigzag: a shared diagonal line pattern per color+style
+    key = f"{fill_style}:{color}"
+    if key not in patterns:
+        pid = f"fill{len(patterns)}"
+        lines = f'<path d="M0 8L8 0" stroke="{_attr(color)}" stroke-width="1"/>'
+        if fill_style == "cross-hatch":
+            lines += f'<path d="M0 0L8 8" stroke="{_attr(color)}" stroke-width="1"/>'
+        patterns[key] = (pid, f'<pattern id="{pid}" patternUnits="userSpaceOnUse" width="8" height="8">{lines}</pattern>')
+    return f' fill="url(#{patterns[key][0]})"'
+
+
+def _corner_radius(el: dict) -> float:
+    roundness = el.get("roundness")
+    if not roundness:
+        return 0.0
+    size = min(abs(el.get("width", 0)), abs(el.get("height", 0)))
+    if roundness.get("type") == 3:
+        fixed = roundness.get("value") or _ADAPTIVE_RADIUS
+        cutoff = fixed / _PROPORTIONAL_RADIUS
+        return size * _PROPORTIONAL_RADIUS if size <= cutoff else fixed
+    return size * _PROPORTIONAL_RADIUS
+
+
+def _smooth_path(points: list[tuple[float, float]]) -> str:
+    """Catmull-Rom spline through ``points`` as cubic Beziers."""
+    d = f"M{_num(points[0][0])} {_num(points[0][1])}"
+    for i in range(len(points) - 1):
+        p0 = points[i - 1] if i > 0 else points[i]
+        p1, p2 = points[i], points[i + 1]
+        p3 = points[i + 2] if i + 2 < len(points) else p2
+        c1 = (p1[0] + (p2[0] - p0[0]) / 6, p1[1] + (p2[1] - p0[1]) / 6)
+        c2 = (p2[0] - (p3[0] - p1[0]) / 6, p2[1] - (p3[1] - p1[1]) / 6)
+        d += f"C{_num(c1[0])} {_num(c1[1])} {_num(c2[0])} {_num(c2[1])} {_num(p2[0])} {_num(p2[1])}"
+    return d
+
+
+def _arrowhead(kind: str, tip: tuple[float, float], prev: tuple[float, float], el: dict) -> str:
+    dx, dy = tip[0] - prev[0], tip[1] - prev[1]
+    dist = math.hypot(dx, dy)
+    if dist == 0:
+        return ""
+    size = min(25 if kind == "arrow" else 15, dist * 0.5)
+    theta = math.atan2(dy, dx)
+    stroke = _stroke_attrs({**el, "strokeStyle": "solid"})
+    color = _attr(el.get("strokeColor", "#1e1e1e"))
+
+    if kind in ("dot", "circle", "circle_outline"):
+        r = size / 2
+        cx, cy = tip[0] - math.cos(theta) * r, tip[1] - math.sin(theta) * r
+        fill = "none" if kind == "circle_outline" else color
+        return f'<circle cx="{_num(cx)}" cy="{_num(cy)}" r="{_num(r)}" fill="{fill}"{stroke}/>'
+
+    spread = {"arrow": 20, "triangle": 25, "triangle_outline": 25, "bar": 90}.get(kind, 20)
+    wing = []
+    for sign in (1, -1):
+        a = theta + math.pi + sign * math.radians(spread)
+        length = size / 2 if kind == "bar" else size
+        wing.append((tip[0] + math.cos(a) * length, tip[1] + math.sin(a) * length))
+
+    if kind == "bar":
+        (x1, y1), (x2, y2) = wing
+        return f'<path d="M{_num(x1)} {_num(y1)}L{_num(x2)} {_num(y2)}" fill="none"{stroke}/>'
+    if kind in ("triangle", "triangle_outline"):
+        fill = "none" if kind == "triangle_outline" else color
+        pts = " ".join(f"{_num(px)},{_num(py)}" for px, py in (tip, *wing))
+        return f'<polygon points="{pts}" fill="{fill}"{stroke} stroke-linejoin="round"/>'
+    (x1, y1), (x2, y2) = wing
+    return (
+        f'<path d="M{_num(x1)} {_num(y1)}L{_num(tip[0])} {_num(tip[1])}L{_num(x2)} {_num(y2)}" '
+        f'fill="none"{stroke} stroke-linecap="round" stroke-linejoin="round"/>'
+    )
+
+
+def _text_lines(el: dict) -> str:
+    font_size = el.get("fontSize", 20)
+    line_height = font_size * el.get("lineHeight", 1.25)
+    family = FONT_FAMILIES[el.get("fontFamily", 1)]
+    align = el.get("textAlign", "left")
+    anchor = {"left": "start", "center": "middle", "right": "end"}.get(align, "start")
+    x = {"left": 0, "center": el.get("width", 0) / 2, "right": el.get("width", 0)}.get(align, 0)
+    # Baseline sits roughly at the bottom of the em box, centered in each line box
+    baseline = (line_height - font_size) / 2 + font_size * 0.8
+
+    parts = []
+    for i, line in enumerate(str(el.get("text", "")).split("\n")):
+        parts.append(
+            f'<text x="{_num(x)}" y="{_num(i * line_height + baseline)}" font-family="{family}" '
+            f'font-size="{_num(font_size)}px" fill="{_attr(el.get("strokeColor", "#1e1e1e"))}" '
+            f'text-anchor="{anchor}" style="white-space: pre;" direction="ltr">{escape(line)}</text>'
+        )
+    return "".join(parts)
+
+
+def _element_svg(el: dict, patterns: dict[str, tuple[str, str]]) -> str:
+    el_type = el["type"]
+    w, h = el.get("width", 0), el.get("height", 0)
+
+    if el_type == "rectangle":
+        r = _corner_radius(el)
+        rx = f' rx="{_num(r)}" ry="{_num(r)}"' if r else ""
+        # Negative width/height extend left/up from the element's x/y
+        body = f'<rect x="{_num(min(w, 0))}" y="{_num(min(h, 0))}" width="{_num(abs(w))}" height="{_num(abs(h))}"{rx}{_fill_attr(el, patterns)}{_stroke_attrs(el)}/>'
+    elif el_type == "ellipse":
+        body = (
+            f'<ellipse cx="{_num(w / 2)}" cy="{_num(h / 2)}" rx="{_num(abs(w) / 2)}" ry="{_num(abs(h) / 2)}"'
+            f"{_fill_attr(el, patterns)}{_stroke_attrs(el)}/>"
+        )
+    elif el_type == "diamond":
+        pts = f"{_num(w / 2)},0 {_num(w)},{_num(h / 2)} {_num(w / 2)},{_num(h)} 0,{_num(h / 2)}"
+        body = f'<polygon points="{pts}"{_fill_attr(el, patterns)}{_stroke_attrs(el)} stroke-linejoin="round"/>'
+    elif el_type in ("line", "arrow"):
+        points = [(float(px), float(py)) for px, py in el.get("points") or [(0, 0), (w, h)]]
+        if el.get("roundness") and len(points) > 2:
+            d = _smooth_path(points)
+        else:
+            d = f"M{_num(points[0][0])} {_num(points[0][1])}" + "".join(
+                f"L{_num(px)} {_num(py)}" for px, py in points[1:]
+            )
+        closed = el_type == "line" and len(points) > 2 and points[0] == points[-1]
+        fill = _fill_attr(el, patterns) if closed else ' fill="none"'
+        body = f'<path d="{d}"{fill}{_stroke_attrs(el)} stroke-linecap="round" stroke-linejoin="round"/>'
+        if el_type == "arrow" and len(points) >= 2:
+            if el.get("endArrowhead"):
+                body += _arrowhead(el["endArrowhead"], points[-1], points[-2], el)
+            if el.get("startArrowhead"):
+                body += _arrowhead(el["startArrowhead"], points[0], points[1], el)
+    else:  # text
+        body = _text_lines(el)
+
+    return body
+
+
+def export_svg(data: dict) -> str:
+    """Export an Excalidraw scene of natively supported elements to an SVG string.
+
+    Raises ValueError if ``unsupported_reasons(data)`` is non-empty.
+    """
+    reasons = unsupported_reasons(data)
+    if reasons:
+        raise ValueError("Cannot export natively: " + "; ".join(reasons))
+
+    app_state = data.get("appState") or {}
+    padding = app_state.get("exportPadding", DEFAULT_EXPORT_PADDING)
+    background = app_state.get("viewBackgroundColor") or "#ffffff"
+    elements = [e for e in data.get("elements", []) if not e.get("isDeleted")]
+
+    # Rotation-aware, so rotated elements aren't clipped by the viewBox
+    min_x, min_y, max_x, max_y = element_boxes(elements).bounds() or (0.0, 0.0, 0.0, 0.0)
+    width = max_x - min_x + padding * 2
+    height = max_y - min_y + padding * 2
+
+    patterns: dict[str, tuple[str, str]] = {}
+    body = []
+    for el in elements:
+        ox = el.get("x", 0) - min_x + padding
+        oy = el.get("y", 0) - min_y + padding
+        transform = f"translate({_num(ox)} {_num(oy)})"
+        angle = el.get("angle", 0)
+        if angle:
+            cx, cy = el.get("width", 0) / 2, el.get("height", 0) / 2
+            transform += f" rotate({_num(math.degrees(angle))} {_num(cx)} {_num(cy)})"
+        opacity = el.get("opacity", 100)
+        op_attr = f' opacity="{_num(opacity / 100)}"' if opacity != 100 else ""
+        body.append(f'<g transform="{transform}"{op_attr}>{_element_svg(el, patterns)}</g>')
+
+    defs = f"<defs><style>{FONT_FACES}</style>{''.join(markup for _, markup in patterns.values())}</defs>"
+    return (
+        f'<svg version="1.1" xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {_num(width)} {_num(height)}" '
+        f'width="{_num(width)}" height="{_num(height)}">'
+        f"{defs}"
+        f'<rect x="0" y="0" width="{_num(width)}" height="{_num(height)}" fill="{_attr(background)}"/>'
+        f"{''.join(body)}</svg>\n"
+    )
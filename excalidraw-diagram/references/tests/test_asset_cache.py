@@ -0,0 +1,35 @@
+"""Tests for AssetCache routing and manifest handling (no browser)."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from asset_cache import ASSET_ORIGINS, AssetCache, AssetIntegrityError  # noqa: E402
+
+
+class FakePage:
+    def __init__(self) -> None:
+        self.routes: list[str] = []
+
+    def route(self, pattern: str, handler) -> None:
+        self.routes.append(pattern)
+
+
+def test_routes_only_asset_origins(tmp_path):
+    page = FakePage()
+    AssetCache(tmp_path).install(page)
+    assert page.routes == [origin + "**" for origin in ASSET_ORIGINS]
+    assert "**/*" not in page.routes
+
+
+def test_corrupt_manifest_asks_to_revendor(tmp_path):
+    (tmp_path / "manifest.json").write_text("{not json", encoding="utf-8")
+    with pytest.raises(AssetIntegrityError, match="Re-run with --vendor-assets"):
+        AssetCache(tmp_path, offline=True)
+    # Re-recording replaces the manifest, so it must not trip over the old one
+    assert AssetCache(tmp_path, record=True)._entries == {}
@@ -0,0 +1,43 @@
+"""Tests for diagram_lint (no browser)."""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from diagram_lint import GridIndex, lint_diagram  # noqa: E402
+
+
+def rect(el_id: str, x: float, y: float, w: float = 100, h: float = 60) -> dict:
+    return {"id": el_id, "type": "rectangle", "x": x, "y": y, "width": w, "height": h}
+
+
+def test_reports_partial_overlap_only():
+    elements = [rect("a", 0, 0), rect("b", 50, 30), rect("zone", -20, -20, 400, 300), rect("c", 600, 0)]
+    warnings = lint_diagram({"elements": elements})
+    assert warnings == ["rectangle 'a' overlaps rectangle 'b' by 50x30px"]
+
+
+def test_huge_element_stays_out_of_the_grid():
+    grid = GridIndex(cell=10, max_cells=4)
+    grid.insert(0, (0, 0, 5, 5))
+    grid.insert(1, (0, 0, 1e9, 1e9))
+    grid.insert(2, (500, 500, 505, 505))
+    assert grid.oversized == [1]
+    assert sum(len(rows) for rows in grid.cells.values()) == 2
+    assert sorted(grid.pairs()) == [(0, 1), (1, 2)]
+    assert grid.query((0, 0, 1, 1)) == {0, 1}
+    assert grid.query((-1e9, -1e9, 1e9, 1e9)) == {0, 1, 2}
+
+
+def test_huge_element_lints_quickly():
+    # Many small cards under one enormous partially-overlapping panel
+    elements = [rect(f"card{i}", (i % 50) * 150, (i // 50) * 100) for i in range(500)]
+    elements.append(rect("panel", -5e6, 50, 1e7, 1e7))
+    started = time.perf_counter()
+    warnings = lint_diagram({"elements": elements})
+    assert time.perf_counter() - started < 5
+    assert sum("overlaps rectangle 'panel'" in w for w in warnings) == 50
@@ -0,0 +1,62 @@
+"""Smoke test for incremental renders (patchScene in render_template.html).
+
+Needs Playwright with Chromium and the Excalidraw bundle (network or
+vendored); skipped otherwise.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render_excalidraw import RenderSession  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def session():
+    pytest.importorskip("playwright.sync_api")
+    session = RenderSession(incremental=True)
+    try:
+        session.warm(1)
+    except Exception as e:
+        session.close()
+        pytest.skip(f"browser unavailable: {e}")
+    yield session
+    session.close()
+
+
+def write_scene(path: Path, elements: list[dict]) -> None:
+    path.write_text(json.dumps({"type": "excalidraw", "elements": elements, "appState": {}}), encoding="utf-8")
+
+
+def box(el_id: str, x: float, color: str = "#1e1e1e") -> dict:
+    return {"id": el_id, "type": "rectangle", "x": x, "y": 0, "width": 100, "height": 60,
+            "strokeColor": color, "backgroundColor": "transparent", "roughness": 0, "seed": 1}
+
+
+def test_patch_unchanged_and_full(session, tmp_path):
+    source = tmp_path / "scene.excalidraw"
+    output = tmp_path / "scene.png"
+
+    write_scene(source, [box("a", 0), box("b", 200)])
+    session.render(source, output, scale=1)
+    assert session.metrics.counters["render_mode"] == "full"
+    assert output.stat().st_size > 0
+
+    # Same bounds, one element restyled: only that element is re-exported
+    write_scene(source, [box("a", 0, "#e03131"), box("b", 200)])
+    session.render(source, output, scale=1)
+    assert session.metrics.counters["render_mode"] == "patch"
+
+    session.render(source, output, scale=1)
+    assert session.metrics.counters["render_mode"] == "unchanged"
+
+    # A new element changes the element list, so the page falls back to a full export
+    write_scene(source, [box("a", 0, "#e03131"), box("b", 200), box("c", 100)])
+    session.render(source, output, scale=1)
+    assert session.metrics.counters["render_mode"] == "full"
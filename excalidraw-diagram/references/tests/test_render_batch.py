@@ -0,0 +1,85 @@
+"""Tests for render_batch's page pool, with a stand-in for the browser session."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import render_batch  # noqa: E402
+from render_batch import BatchJob  # noqa: E402
+from render_excalidraw import RenderError, RenderSession  # noqa: E402
+
+
+class FakeContext:
+    def __init__(self, page: FakePage) -> None:
+        self.page = page
+
+    def close(self) -> None:
+        self.page.closed = True
+
+
+class FakePage:
+    def __init__(self) -> None:
+        self.closed = False
+        self.context = FakeContext(self)
+
+
+class FakeSession(RenderSession):
+    """Opens ``working`` pages, then fails; renders write the scene's element count."""
+
+    working = 4
+    opened: list[FakePage] = []
+
+    def open_page(self, scale: int = 2):
+        if len(self.opened) >= self.working:
+            raise RuntimeError("renderer crashed")
+        page = FakePage()
+        self.opened.append(page)
+        return page
+
+    def start_render(self, page, data, max_width=1920, incremental=False, viewport=None) -> None:
+        page.scene = data
+
+    def finish_render(self, page, output_path, reuse_previous=False, fmt="png") -> Path:
+        output_path.write_text(str(len(page.scene["elements"])))
+        return output_path
+
+    def recycle_if_due(self, page, scale=2):
+        return page
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(render_batch, "RenderSession", FakeSession)
+    monkeypatch.setattr(FakeSession, "opened", [])
+    out = []
+    for i in range(5):
+        source = tmp_path / f"d{i}.excalidraw"
+        scene = {"type": "excalidraw", "elements": [{"id": "a", "type": "rectangle", "x": 0, "y": 0, "width": 10, "height": 10}]}
+        source.write_text(json.dumps(scene), encoding="utf-8")
+        out.append(BatchJob(source, tmp_path / f"d{i}.png"))
+    return out
+
+
+def test_renders_every_job(jobs):
+    (jobs[2].input).write_text("not json", encoding="utf-8")
+    results = render_batch.render_batch(jobs, pool_size=2)
+    assert [r.ok for r in results] == [True, True, False, True, True]
+    assert len(FakeSession.opened) == 2
+
+
+def test_pool_failure_closes_pages_and_fails_once(jobs, monkeypatch):
+    monkeypatch.setattr(FakeSession, "working", 1)
+    with pytest.raises(RenderError, match="Cannot open the page pool: RuntimeError: renderer crashed"):
+        render_batch.render_batch(jobs, pool_size=3)
+    # One page opened before the failure; it was closed, and nobody retried
+    assert len(FakeSession.opened) == 1
+    assert FakeSession.opened[0].closed
@@ -0,0 +1,61 @@
+"""Tests for RenderCache (no browser)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render_cache import _STALE_TMP_SECONDS, RenderCache  # noqa: E402
+
+
+def write(path: Path, size: int) -> Path:
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def _umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+def test_get_copies_with_normal_permissions(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    cache.put("ab12", write(tmp_path / "src.png", 10))
+
+    dest = tmp_path / "out.png"
+    assert cache.get("ab12", dest)
+    assert dest.read_bytes() == b"x" * 10
+    assert dest.stat().st_mode & 0o777 == 0o666 & ~_umask()
+    assert not cache.get("cd34", tmp_path / "missing.png")
+    assert not (tmp_path / "missing.png").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache", "out.png", "src.png"]
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(tmp_path / "cache", max_bytes=25)
+    src = write(tmp_path / "src.png", 10)
+    for i, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.put(key, src)
+        os.utime(cache._path(key), (i, i))
+    assert not cache._path("aa01").exists()
+    assert cache._path("bb02").exists() and cache._path("cc03").exists()
+
+    # Re-storing an entry replaces its size instead of adding to the total
+    cache.put("cc03", src)
+    assert cache._path("bb02").exists()
+
+
+def test_evict_sweeps_stale_temp_files(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    (tmp_path / "cache" / "ab").mkdir(parents=True)
+    old = write(tmp_path / "cache" / "ab" / "old.tmp", 1)
+    fresh = write(tmp_path / "cache" / "ab" / "fresh.tmp", 1)
+    then = time.time() - _STALE_TMP_SECONDS - 60
+    os.utime(old, (then, then))
+    cache.evict()
+    assert not old.exists() and fresh.exists()
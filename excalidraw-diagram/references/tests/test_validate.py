@@ -0,0 +1,84 @@
+"""Smoke tests for validate_references and load_diagram (no browser)."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from render_excalidraw import RenderError, load_diagram, validate_references  # noqa: E402
+
+
+def rect(el_id: str, **extra) -> dict:
+    return {"id": el_id, "type": "rectangle", "x": 0, "y": 0, "width": 100, "height": 50, **extra}
+
+
+def test_valid_scene_has_no_errors():
+    elements = [
+        rect("box", boundElements=[{"id": "label", "type": "text"}, {"id": "link", "type": "arrow"}]),
+        {"id": "label", "type": "text", "x": 10, "y": 10, "text": "hi", "containerId": "box"},
+        rect("other"),
+        {"id": "link", "type": "arrow", "x": 0, "y": 0, "points": [[0, 0], [50, 0]],
+         "startBinding": {"elementId": "box"}, "endBinding": {"elementId": "other"}},
+        {"id": "frame", "type": "frame", "x": 0, "y": 0, "width": 300, "height": 300},
+        rect("framed", frameId="frame", groupIds=["g1"]),
+    ]
+    assert validate_references(elements) == []
+
+
+def test_reports_broken_references():
+    elements = [
+        rect("a"),
+        rect("a"),
+        {"type": "rectangle"},
+        {"id": "t", "type": "text", "text": "x", "containerId": "a"},
+        {"id": "arrow", "type": "arrow", "points": [[0, 0], [1, 1]], "endBinding": {"elementId": "gone"}},
+        rect("b", boundElements=[{"id": "missing", "type": "arrow"}], frameId="a", groupIds="g"),
+    ]
+    errors = validate_references(elements)
+    assert "a: duplicate id" in errors
+    assert "elements[2] has no string 'id'" in errors
+    assert "t: container 'a' doesn't list it in boundElements" in errors
+    assert "arrow: endBinding points to missing 'gone'" in errors
+    assert "b: boundElements references missing 'missing'" in errors
+    assert "b: frameId 'a' is a rectangle, not a frame" in errors
+    assert "b: groupIds must be a list of strings" in errors
+
+
+def test_deleted_targets_count_as_missing():
+    elements = [rect("a", isDeleted=True), {"id": "t", "type": "text", "text": "x", "containerId": "a"}]
+    assert validate_references(elements) == ["t: containerId 'a' does not exist"]
+
+
+def test_load_diagram_raises_render_error(tmp_path):
+    path = tmp_path / "bad.excalidraw"
+    path.write_text(json.dumps({"type": "excalidraw", "elements": [rect("a"), rect("a")]}), encoding="utf-8")
+    with pytest.raises(RenderError, match="duplicate id"):
+        load_diagram(path)
+
+
+def test_reports_malformed_geometry():
+    elements = [
+        rect("a", x="10"),
+        {"id": "line", "type": "line", "x": 0, "y": 0, "points": [[0, 0], [5]]},
+        {"id": "arrow", "type": "arrow", "x": 0, "y": 0, "points": [[0, 0], ["1", 2]]},
+        {"id": "draw", "type": "freedraw", "x": 0, "y": 0, "points": "0,0 1,1"},
+        rect("b", angle=None),
+    ]
+    assert validate_references(elements) == [
+        "a: non-numeric x",
+        "line: points must be a list of [x, y] number pairs",
+        "arrow: points must be a list of [x, y] number pairs",
+        "draw: points must be a list of [x, y] number pairs",
+    ]
+
+
+def test_element_boxes_names_the_malformed_element():
+    from geometry import element_boxes
+
+    with pytest.raises(ValueError, match="^line: malformed geometry"):
+        element_boxes([rect("a"), {"id": "line", "type": "line", "x": 0, "y": 0, "points": [[0, 0], [5]]}])
@@ -13,175 +13,782 @@ Examples:
 
     # Process from stdin
     cat input.svg | python optimize_svg.py
+
+    # Very large files: stream, holding a few chunks plus the largest element
+    python optimize_svg.py huge-map.svg --stream -o huge-map.min.svg
+
+    # Whole trees, in parallel: mirrored into another directory, or in place
+    python optimize_svg.py assets/ 'icons/**/*.svg' -o dist/
+    python optimize_svg.py assets/ --in-place --aggressive
 """
 
 import argparse
+import glob
+import hashlib
+import io
+import json
+import os
 import re
+import shutil
 import sys
-from typing import Tuple
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, TextIO, Tuple
 
 
-def remove_comments(svg: str) -> str:
-    """Remove XML comments."""
-    return re.sub(r'<!--[\s\S]*?-->', '', svg)
+FLOAT_RE = re.compile(r'-?\d+\.\d+')
+HEX_COLOR_RE = re.compile(r'#([0-9A-Fa-f]{6})\b')
+RGB_COLOR_RE = re.compile(r'rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)')
 
 
-def remove_metadata(svg: str) -> str:
-    """Remove metadata and editor-specific elements."""
-    # Remove metadata tags
-    svg = re.sub(r'<metadata[\s\S]*?</metadata>', '', svg, flags=re.IGNORECASE)
-    # Remove sodipodi, inkscape namespaces
-    svg = re.sub(r'<sodipodi:[^>]*/?>''', '', svg)
-    svg = re.sub(r'<inkscape:[^>]*/?>''', '', svg)
-    # Remove namespace declarations
-    svg = re.sub(r'\s+xmlns:(sodipodi|inkscape|dc|cc|rdf)="[^"]*"', '', svg)
-    return svg
+def round_number(text: str, precision: int = 2) -> str:
+    """Round one decimal number, dropping trailing zeros."""
+    num = float(text)
+    if precision == 0:
+        return str(int(round(num)))
+    rounded = round(num, precision)
+    # Remove trailing zeros
+    return f"{rounded:.{precision}f}".rstrip('0').rstrip('.')
 
 
-def remove_empty_groups(svg: str) -> str:
-    """Remove empty <g> elements."""
-    # Iteratively remove empty groups
-    prev = ""
-    while prev != svg:
-        prev = svg
-        svg = re.sub(r'<g[^>]*>\s*</g>', '', svg)
-    return svg
+def round_numbers(svg: str, precision: int = 2) -> str:
+    """Round floating point numbers to reduce precision."""
+    # Match floating point numbers (including negative)
+    return FLOAT_RE.sub(lambda m: round_number(m.group(), precision), svg)
 
 
-def collapse_whitespace(svg: str) -> str:
-    """Collapse excessive whitespace."""
-    # Collapse multiple spaces/newlines
-    svg = re.sub(r'\s+', ' ', svg)
-    # Remove space before closing tags
-    svg = re.sub(r'\s+/>', '/>', svg)
-    svg = re.sub(r'\s+>', '>', svg)
-    # Remove space after opening bracket
-    svg = re.sub(r'<\s+', '<', svg)
-    return svg
+def _shorten_hex(match) -> str:
+    color = match.group(1)
+    if color[0] == color[1] and color[2] == color[3] and color[4] == color[5]:
+        return f"#{color[0]}{color[2]}{color[4]}"
+    return f"#{color}"
 
 
-def minify_whitespace(svg: str) -> str:
-    """More aggressive whitespace removal."""
-    # Remove newlines and excess spaces
-    svg = re.sub(r'>\s+<', '><', svg)
-    svg = re.sub(r'\s+', ' ', svg)
-    return svg.strip()
+def _rgb_to_hex(match) -> str:
+    # CSS clamps channels to 0-255
+    r, g, b = (min(255, int(match.group(i))) for i in (1, 2, 3))
+    return f"#{r:02x}{g:02x}{b:02x}"
 
 
-def round_numbers(svg: str, precision: int = 2) -> str:
-    """Round floating point numbers to reduce precision."""
-    def round_match(match):
-        num = float(match.group())
-        if precision == 0:
-            return str(int(round(num)))
-        rounded = round(num, precision)
-        # Remove trailing zeros
-        result = f"{rounded:.{precision}f}".rstrip('0').rstrip('.')
-        return result
+def simplify_path_data(d: str) -> str:
+    """Tighten the separators in one path's data."""
+    # Remove unnecessary spaces in path commands
+    d = re.sub(r'([MLHVCSQTAZmlhvcsqtaz])\s+', r'\1', d)
+    d = re.sub(r'\s+([MLHVCSQTAZmlhvcsqtaz])', r'\1', d)
 
-    # Match floating point numbers (including negative)
-    svg = re.sub(r'-?\d+\.\d+', round_match, svg)
-    return svg
+    # Use space instead of comma between numbers
+    d = d.replace(',', ' ')
+
+    # Remove space before negative numbers (they have implicit separator)
+    d = re.sub(r'\s+(-)', r'\1', d)
+
+    # Collapse multiple spaces
+    d = re.sub(r'\s+', ' ', d)
+    return d.strip()
+
+
+# --- Path data --------------------------------------------------------------
+#
+# optimize_path_data() parses a d attribute into absolute segments on an
+# integer grid of 10**-precision, then writes each segment in whichever form
+# is shortest: absolute or relative, H/V for axis-aligned lines, S/T when the
+# first control point is the reflected one, no repeated command letters and
+# only the separators the grammar needs. Working on the grid keeps relative
+# coordinates exact, so rounding error doesn't accumulate along the path.
+
+_PATH_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+_PATH_ARGS.update({k.lower(): v for k, v in _PATH_ARGS.items()})
+_PATH_NUMBER_RE = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_PATH_SEPARATORS = ' \t\r\n,'
+
+
+def _parse_path(d: str) -> Iterator[Tuple[str, list]]:
+    """Yield (command, [numbers]) with implicit repeats made explicit. Raises ValueError if ``d`` is malformed."""
+    pos = 0
+    n = len(d)
+    cmd = None
+    while True:
+        while pos < n and d[pos] in _PATH_SEPARATORS:
+            pos += 1
+        if pos == n:
+            return
+        if d[pos] in _PATH_ARGS:
+            cmd = d[pos]
+            pos += 1
+            if cmd in 'Zz':
+                yield cmd, []
+                continue
+        elif cmd is None or cmd in 'Zz':
+            raise ValueError(f'unexpected {d[pos]!r} at {pos}')
+        args = []
+        for i in range(_PATH_ARGS[cmd]):
+            while pos < n and d[pos] in _PATH_SEPARATORS:
+                pos += 1
+            if cmd in 'Aa' and i in (3, 4):
+                # Arc flags are single digits and may be written without separators
+                if pos == n or d[pos] not in '01':
+                    raise ValueError(f'bad arc flag at {pos}')
+                args.append(float(d[pos]))
+                pos += 1
+                continue
+            m = _PATH_NUMBER_RE.match(d, pos)
+            if not m:
+                raise ValueError(f'expected a number at {pos}')
+            args.append(float(m.group()))
+            pos = m.end()
+        yield cmd, args
+        # Extra coordinate pairs after a moveto are linetos
+        if cmd == 'M':
+            cmd = 'L'
+        elif cmd == 'm':
+            cmd = 'l'
 
 
-def shorten_hex_colors(svg: str) -> str:
-    """Convert 6-digit hex to 3-digit where possible."""
-    def shorten(match):
-        color = match.group(1)
-        if len(color) == 6:
-            if color[0] == color[1] and color[2] == color[3] and color[4] == color[5]:
-                return f"#{color[0]}{color[2]}{color[4]}"
-        return f"#{color}"
+def _snap(cmd: str, a: tuple, scale: float) -> tuple:
+    # Everything but arc radii, rotation and flags goes on the grid
+    if cmd == 'A':
+        return (round(a[0] * scale), round(a[1] * scale), round(a[2] * scale), int(a[3] != 0), int(a[4] != 0),
+                round(a[5] * scale), round(a[6] * scale))
+    return tuple(round(v * scale) for v in a)
 
-    return re.sub(r'#([0-9A-Fa-f]{6})\b', shorten, svg)
 
+def _absolute_segments(parsed: Iterable[Tuple[str, list]], scale: float) -> Iterator[Tuple[str, tuple]]:
+    """Yield parsed commands as absolute M, L, C, Q, A and Z segments, with coordinates in grid units."""
+    x = y = sx = sy = 0.0
+    # Last control points, for S and T
+    cubic = quad = None
+    for cmd, a in parsed:
+        upper = cmd.upper()
+        dx, dy = (x, y) if cmd != upper else (0.0, 0.0)
+        if upper == 'Z':
+            yield 'Z', ()
+            x, y = sx, sy
+            cubic = quad = None
+            continue
+        if upper == 'M':
+            x, y = sx, sy = a[0] + dx, a[1] + dy
+            yield 'M', _snap('M', (x, y), scale)
+        elif upper in 'LHV':
+            if upper == 'H':
+                x = a[0] + dx
+            elif upper == 'V':
+                y = a[0] + dy
+            else:
+                x, y = a[0] + dx, a[1] + dy
+            yield 'L', _snap('L', (x, y), scale)
+        elif upper in 'CS':
+            if upper == 'C':
+                x1, y1 = a[0] + dx, a[1] + dy
+                a = a[2:]
+            else:
+                x1, y1 = (2 * x - cubic[0], 2 * y - cubic[1]) if cubic else (x, y)
+            x2, y2 = a[0] + dx, a[1] + dy
+            x, y = a[2] + dx, a[3] + dy
+            yield 'C', _snap('C', (x1, y1, x2, y2, x, y), scale)
+            cubic = (x2, y2)
+            quad = None
+            continue
+        elif upper in 'QT':
+            if upper == 'Q':
+                x1, y1 = a[0] + dx, a[1] + dy
+                a = a[2:]
+            else:
+                x1, y1 = (2 * x - quad[0], 2 * y - quad[1]) if quad else (x, y)
+            x, y = a[0] + dx, a[1] + dy
+            yield 'Q', _snap('Q', (x1, y1, x, y), scale)
+            quad = (x1, y1)
+            cubic = None
+            continue
+        else:
+            x, y = a[5] + dx, a[6] + dy
+            yield 'A', _snap('A', tuple(a[:5]) + (x, y), scale)
+        cubic = quad = None
 
-def remove_default_attributes(svg: str) -> str:
-    """Remove attributes that are set to their default values."""
-    defaults = [
-        (r'\s+fill-opacity="1"', ''),
-        (r'\s+stroke-opacity="1"', ''),
-        (r'\s+opacity="1"', ''),
-        (r'\s+stroke="none"', ''),
-        (r'\s+stroke-width="1"', ''),
-        (r'\s+fill-rule="nonzero"', ''),
-        (r'\s+clip-rule="nonzero"', ''),
-        (r'\s+font-style="normal"', ''),
-        (r'\s+font-weight="normal"', ''),
-        (r'\s+x="0"(?=[\s/>])', ''),
-        (r'\s+y="0"(?=[\s/>])', ''),
-        (r'\s+cx="0"(?=[\s/>])', ''),
-        (r'\s+cy="0"(?=[\s/>])', ''),
-        (r'\s+rx="0"(?=[\s/>])', ''),
-        (r'\s+ry="0"(?=[\s/>])', ''),
-        (r'\s+transform="translate\(0[,\s]+0\)"', ''),
-        (r'\s+transform="translate\(0\)"', ''),
-        (r'\s+transform="rotate\(0\)"', ''),
-        (r'\s+transform="scale\(1\)"', ''),
-        (r'\s+transform="scale\(1[,\s]+1\)"', ''),
-    ]
 
-    for pattern, replacement in defaults:
-        svg = re.sub(pattern, replacement, svg)
+def _drop_empty(segments: Iterable[Tuple[str, tuple]], keep_zero_length: bool) -> Iterator[Tuple[str, tuple]]:
+    """Drop movetos that start nothing and, unless kept, zero-length segments.
 
-    return svg
+    A zero-length segment stays when it is all its subpath draws: with round
+    or square caps it renders as a dot. Only the zero-length run at the start
+    of a subpath is held back, so memory doesn't grow with the path.
+    """
+    moveto = None
+    # Segments after the moveto, held until the subpath draws something
+    held = []
+    drawn = False
+    x = y = sx = sy = 0
+    for seg in segments:
+        cmd, a = seg
+        if cmd == 'M':
+            if not drawn and held:
+                yield moveto
+                yield from (s for s, _ in held)
+            moveto, held, drawn = seg, [], False
+            x, y = sx, sy = a
+            continue
+        if cmd == 'Z':
+            x, y = sx, sy
+            zero = False
+        else:
+            points = a[5:] if cmd == 'A' else a
+            zero = all(points[i : i + 2] == (x, y) for i in range(0, len(points), 2))
+            x, y = a[-2:]
+        if moveto is None:
+            # Drawing without a moveto; optimize_path_data() never passes this
+            yield seg
+        elif drawn:
+            if keep_zero_length or not zero:
+                yield seg
+        elif zero or cmd == 'Z':
+            held.append((seg, zero))
+        else:
+            drawn = True
+            yield moveto
+            yield from (s for s, z in held if keep_zero_length or not z)
+            held = []
+            yield seg
+    if not drawn and held:
+        yield moveto
+        yield from (s for s, _ in held)
 
 
-def convert_colors_to_hex(svg: str) -> str:
-    """Convert rgb() colors to hex."""
-    def rgb_to_hex(match):
-        r, g, b = int(match.group(1)), int(match.group(2)), int(match.group(3))
-        return f"#{r:02x}{g:02x}{b:02x}"
+def _format_units(units: int, precision: int) -> str:
+    """Shortest decimal for units * 10**-precision: 50 -> ".5", -100 -> "-1"."""
+    if precision <= 0:
+        return str(units)
+    digits = str(abs(units)).rjust(precision + 1, '0')
+    whole = digits[:-precision].lstrip('0')
+    frac = digits[-precision:].rstrip('0')
+    sign = '-' if units < 0 else ''
+    if frac:
+        return f'{sign}{whole}.{frac}'
+    return f'{sign}{whole or "0"}'
+
+
+def _encode(letter: str, params: list, last: str, prev_letter: str) -> Tuple[str, str]:
+    """One segment's text and the new ``last``.
+
+    ``last`` is the number just written, or '' after a command letter or arc
+    flag (nothing can run into those). ``params`` are (text, is_flag) pairs.
+    """
+    if letter == prev_letter and letter not in 'Zz':
+        # Same command again: the letter is implied
+        parts = []
+    else:
+        parts = [letter]
+        last = ''
+    for text, is_flag in params:
+        if last and text[0] != '-' and not (text[0] == '.' and '.' in last):
+            parts.append(' ')
+        parts.append(text)
+        last = '' if is_flag else text
+    return ''.join(parts), last
+
+
+def _serialize(segments: Iterable[Tuple[str, tuple]], precision: int) -> str:
+    """Absolute grid segments as the shortest path data, choosing a form per segment."""
+    # Written as segments arrive, so a huge path costs its output, not a tuple per segment
+    out = io.StringIO()
+    last = ''
+    # What an omitted command letter would repeat
+    prev_letter = ''
+    x = y = sx = sy = 0
+    cubic = quad = None
+    for cmd, a in segments:
+        if cmd == 'Z':
+            candidates = [('z', ())]
+        elif cmd == 'M':
+            candidates = [('M', a), ('m', (a[0] - x, a[1] - y))]
+        elif cmd == 'L':
+            if a[1] == y:
+                candidates = [('H', a[:1]), ('h', (a[0] - x,))]
+            elif a[0] == x:
+                candidates = [('V', a[1:]), ('v', (a[1] - y,))]
+            else:
+                candidates = [('L', a), ('l', (a[0] - x, a[1] - y))]
+        elif cmd == 'A':
+            candidates = [('A', a), ('a', a[:5] + (a[5] - x, a[6] - y))]
+        else:
+            rel = tuple(v - (x, y)[i % 2] for i, v in enumerate(a))
+            short, prev = ('S', cubic) if cmd == 'C' else ('T', quad)
+            candidates = [(cmd, a), (cmd.lower(), rel)]
+            # S/T imply a first control point mirrored from the previous segment's (or the current point)
+            if a[:2] == ((2 * x - prev[0], 2 * y - prev[1]) if prev else (x, y)):
+                candidates += [(short, a[2:]), (short.lower(), rel[2:])]
+
+        best = None
+        for letter, numbers in candidates:
+            params = [
+                (str(v), True) if letter in 'Aa' and i in (3, 4) else (_format_units(v, precision), False)
+                for i, v in enumerate(numbers)
+            ]
+            encoded = _encode(letter, params, last, prev_letter)
+            if best is None or len(encoded[0]) < len(best[0][0]):
+                best = (encoded, letter)
+        (text, last), letter = best
+        out.write(text)
+        # Coordinates after a moveto are linetos
+        prev_letter = {'M': 'L', 'm': 'l'}.get(letter, letter)
+
+        cubic = a[2:4] if cmd == 'C' else None
+        quad = a[:2] if cmd == 'Q' else None
+        if cmd == 'Z':
+            x, y = sx, sy
+        else:
+            x, y = a[-2:]
+            if cmd == 'M':
+                sx, sy = x, y
+    return out.getvalue()
+
+
+def optimize_path_data(d: str, precision: int = 2, keep_zero_length: bool = False) -> str:
+    """Shortest path data drawing the same as ``d``, with coordinates rounded to ``precision`` decimals.
+
+    Zero-length segments are dropped unless ``keep_zero_length`` (markers
+    are drawn on them). Malformed data is only rounded and tightened.
+    """
+    if not d.lstrip(_PATH_SEPARATORS).startswith(('M', 'm')):
+        return simplify_path_data(round_numbers(d, precision)) if d.strip(_PATH_SEPARATORS) else ''
+    try:
+        segments = _drop_empty(_absolute_segments(_parse_path(d), 10 ** precision), keep_zero_length)
+        return _serialize(segments, precision)
+    except ValueError:
+        return simplify_path_data(round_numbers(d, precision))
+
+
+_REFERENCE_RE = re.compile(
+    r'''
+    # Every alternative starts with one of these; checking first skips most positions cheaply
+    (?=[<uhbea])
+    (?:
+    (?P<comment><!--.*?-->)
+  | url\(\s*['"]?\#(?P<url>[^)'"\s]+)
+  | (?<![\w-])href\s*=\s*(?P<hq>["'])\#(?P<href>.*?)(?P=hq)
+  | (?<![\w:-])(?:begin|end)\s*=\s*(?P<tq>["'])(?P<timing>.*?)(?P=tq)
+  | (?<![\w:-])aria-(?:labelledby|describedby|controls|owns|flowto|details|errormessage|activedescendant)
+    \s*=\s*(?P<aq>["'])(?P<idrefs>.*?)(?P=aq)
+  | <style[^>]*>(?P<css>.*?)</style>
+    )
+    ''',
+    re.DOTALL | re.VERBOSE,
+)
+# "intro.end+1s", "btn.click", "a.repeat(2)" in begin/end: the part before the event is an id
+_TIMING_REF_RE = re.compile(r'\s*(.+?)\.[A-Za-z]+(?:\(\d+\))?\s*(?:[+-].*)?')
+_CSS_ID_RE = re.compile(r'#([A-Za-z_][\w-]*)')
+_URL_REF_RE = re.compile(r'''url\(\s*['"]?#([^)'"\s]+)''')
+
 
-    svg = re.sub(r'rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)', rgb_to_hex, svg)
-    return svg
+def collect_references(svg: str) -> set:
+    """IDs referenced anywhere in the document, in one pass.
 
+    Covers url(#id), href/xlink:href="#id", begin/end animation timing
+    (``id.end+1s``), aria-labelledby and friends, and #id selectors in
+    <style>. Comments don't count.
+    """
+    refs = set()
+    for m in _REFERENCE_RE.finditer(svg):
+        kind = m.lastgroup
+        if kind == 'url' or kind == 'href':
+            refs.add(m.group(kind))
+        elif kind == 'timing':
+            for item in m.group(kind).split(';'):
+                ref = _TIMING_REF_RE.fullmatch(item)
+                if ref:
+                    refs.add(ref.group(1))
+        elif kind == 'idrefs':
+            refs.update(m.group(kind).split())
+        elif kind == 'css':
+            refs.update(_CSS_ID_RE.findall(m.group(kind)))
+            refs.update(_URL_REF_RE.findall(m.group(kind)))
+    return refs
 
-def simplify_path_commands(svg: str) -> str:
-    """Simplify path data commands."""
-    def simplify_path(match):
-        d = match.group(1)
 
-        # Remove unnecessary spaces in path commands
-        d = re.sub(r'([MLHVCSQTAZmlhvcsqtaz])\s+', r'\1', d)
-        d = re.sub(r'\s+([MLHVCSQTAZmlhvcsqtaz])', r'\1', d)
+# --- Single-pass engine -----------------------------------------------------
+#
+# optimize_svg() tokenizes the document once and applies every transform
+# while walking the token stream: comments, metadata and editor elements are
+# dropped, attributes are cleaned per element, and whitespace is collapsed by
+# the writer as output is produced.
 
-        # Use space instead of comma between numbers
-        d = re.sub(r',', ' ', d)
+_TOKEN_RE = re.compile(
+    r'''
+    (?P<comment><!--.*?-->)
+  | (?P<cdata><!\[CDATA\[.*?\]\]>)
+  | (?P<pi><\?.*?\?>)
+  | (?P<decl><![A-Za-z][^\[>]*(?:\[.*?\][^>]*)?>)
+  | (?P<end></[^\s>]+\s*>)
+  | (?P<start><[^\s/>!?][^\s/>]*(?:\s+[^\s=/>]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>/]+))?)*\s*/?>)
+  | (?P<text>[^<]+)
+  | (?P<stray><)
+    ''',
+    re.DOTALL | re.VERBOSE,
+)
+# Markup cut off by the end of a chunk: a prefix of some _TOKEN_RE markup alternative
+_PARTIAL_TOKEN_RE = re.compile(
+    r'''
+    <(?:
+      !--(?:(?!-->).)*
+    | !\[CDATA\[(?:(?!\]\]>).)*
+    | \?(?:(?!\?>).)*
+    | ![A-Za-z]?[^\[>]*(?:\[.*)?
+    | /[^>]*
+    | [^\s/>!?][^\s/>]*(?:\s+[^\s=/>]+(?:\s*=\s*(?:"[^"]*"?|'[^']*'?|[^\s"'>/]*))?)*\s*/?
+    )?\Z
+    ''',
+    re.DOTALL | re.VERBOSE,
+)
+_NAME_RE = re.compile(r'<([^\s/>]+)')
+_ATTR_RE = re.compile(r'''([^\s=/>]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'>/]+))?''')
+# Whitespace runs other than a lone space; sub(' ', ...) collapses every run the same
+# way as [ \t\r\n]+ but leaves single spaces alone, so already-tidy text isn't rebuilt
+_WS_RE = re.compile(r'(?: [ \t\r\n]|[\t\r\n])[ \t\r\n]*')
+_STYLE_PROP_RE = re.compile(r'([A-Za-z-]+)\s*:')
 
-        # Remove space before negative numbers (they have implicit separator)
-        d = re.sub(r'\s+(-)', r'\1', d)
+# Elements dropped with everything inside them
+_DROPPED_ELEMENTS = {'metadata'}
+# Editor namespaces: their elements and attributes go along with their xmlns declarations
+_EDITOR_PREFIXES = {'sodipodi', 'inkscape', 'dc', 'cc', 'rdf'}
 
-        # Collapse multiple spaces
-        d = re.sub(r'\s+', ' ', d)
+# Presentation attributes that inherit: a default value only matters when an
+# ancestor (or a stylesheet) sets something else
+_INHERITED_DEFAULTS = {
+    'fill-opacity': '1',
+    'stroke-opacity': '1',
+    'stroke': 'none',
+    'stroke-width': '1',
+    'fill-rule': 'nonzero',
+    'clip-rule': 'nonzero',
+    'font-style': 'normal',
+    'font-weight': 'normal',
+}
+_PLAIN_DEFAULTS = {
+    'opacity': '1',
+    'x': '0',
+    'y': '0',
+    'cx': '0',
+    'cy': '0',
+}
+_IDENTITY_TRANSFORM_RE = re.compile(
+    r'translate\(0[,\s]+0\)|translate\(0\)|rotate\(0\)|scale\(1\)|scale\(1[,\s]+1\)'
+)
+# Inherited marker properties: markers are drawn at every vertex, zero-length segments included
+_MARKER_PROPERTIES = {'marker', 'marker-start', 'marker-mid', 'marker-end'}
+# Inheritable properties tracked down the element stack and in stylesheets
+_TRACKED_PROPERTIES = set(_INHERITED_DEFAULTS) | _MARKER_PROPERTIES
+_DEFAULTABLE = set(_INHERITED_DEFAULTS) | set(_PLAIN_DEFAULTS) | {'rx', 'ry', 'transform'}
+# Content of these is instantiated elsewhere (use, fill, marker-end, ...), so its context is unknown
+_TEMPLATE_ELEMENTS = {'defs', 'symbol', 'marker', 'pattern', 'clipPath', 'mask'}
+# Attribute values that are names or references, not colors or numbers
+_VERBATIM_ATTRIBUTES = {'id', 'class', 'href', 'xlink:href', 'version'}
+_VALUE_CACHE_SIZE = 4096
+# Longer values (big path data) are rarely repeated; caching them would pin a copy of each
+_VALUE_CACHE_MAX_LENGTH = 1024
+# Characters read at a time by optimize_svg_stream()
+CHUNK_SIZE = 1 << 20
 
-        return f'd="{d.strip()}"'
 
-    svg = re.sub(r'd="([^"]*)"', simplify_path, svg)
-    return svg
+class _Writer:
+    """Output sink that collapses whitespace across everything written to it.
 
+    A run of whitespace in text, even one split by dropped comments or
+    elements, becomes one space. With ``minify`` a run between two tags and
+    at either end of the document is dropped instead.
+    """
 
-def remove_unnecessary_ids(svg: str) -> str:
-    """Remove IDs that aren't referenced anywhere."""
-    # Find all ID definitions
-    ids = re.findall(r'\bid="([^"]+)"', svg)
+    def __init__(self, write, minify: bool = False):
+        self._write = write
+        self.minify = minify
+        self._space = False
+        self._last = ''
 
-    # Check each ID for references
-    for id_val in ids:
-        # Check for url(#id), href="#id", xlink:href="#id"
-        patterns = [
-            f'url\\(#{re.escape(id_val)}\\)',
-            f'href="#{re.escape(id_val)}"',
-            f'xlink:href="#{re.escape(id_val)}"',
-        ]
+    def _flush_space(self, next_char: str) -> None:
+        if self._space:
+            if not (self.minify and (not self._last or (self._last == '>' and next_char == '<'))):
+                self._write(' ')
+            self._space = False
 
-        referenced = any(re.search(p, svg) for p in patterns)
+    def markup(self, s: str) -> None:
+        self._flush_space('<')
+        self._write(s)
+        self._last = '>'
 
-        if not referenced:
-            # Remove the id attribute (but keep the element)
-            svg = re.sub(f'\\s+id="{re.escape(id_val)}"', '', svg)
+    def text(self, s: str) -> None:
+        core = _WS_RE.sub(' ', s)
+        if core.startswith(' '):
+            self._space = True
+            core = core[1:]
+        if not core:
+            return
+        trailing = core.endswith(' ')
+        if trailing:
+            core = core[:-1]
+            if not core:
+                self._space = True
+                return
+        self._flush_space(core[0])
+        self._write(core)
+        self._last = core[-1]
+        self._space = trailing
 
-    return svg
+    def close(self) -> None:
+        if self._space and not self.minify:
+            self._write(' ')
+        self._space = False
+
+
+class _Frame:
+    __slots__ = ('name', 'inherited', 'template')
+
+    def __init__(self, name: str, inherited: frozenset, template: bool):
+        self.name = name
+        # Tracked properties (see _TRACKED_PROPERTIES) an ancestor sets
+        self.inherited = inherited
+        self.template = template
+
+
+class _Engine:
+    """Token-stream transformer behind optimize_svg()."""
+
+    def __init__(
+        self,
+        writer: _Writer,
+        aggressive: bool,
+        precision: int,
+        css_properties: frozenset,
+        references: Optional[set] = None,
+    ):
+        self.w = writer
+        self.aggressive = aggressive
+        self.precision = precision
+        # Tracked properties some stylesheet sets; their defaults are never dropped
+        self.css_properties = css_properties
+        # IDs worth keeping; None keeps every id
+        self.references = references
+        self.stack = [_Frame('', frozenset(), False)]
+        # Depth inside a dropped element
+        self.skip = 0
+        # Open <g> tags not yet written, each with the whitespace seen inside it
+        self.pending = []
+        # (attribute, value) -> cleaned value; exported SVGs repeat the same styles a lot
+        self._values = {}
+        # Pieces of the unfinished token at the end of what has been fed
+        self._carry = []
+
+    def feed(self, data: str) -> None:
+        """Process the next piece of the document; tokens may span calls."""
+        if self._carry:
+            # Markup can't end without a '>', nor text without a '<': until one
+            # arrives, only collect the pieces instead of rescanning the whole token
+            if ('>' if self._carry[0][0] == '<' else '<') not in data:
+                self._carry.append(data)
+                return
+            self._carry.append(data)
+            data = ''.join(self._carry)
+        self._tokens(data, final=False)
+
+    def close(self) -> None:
+        if self._carry:
+            self._tokens(''.join(self._carry), final=True)
+        self._flush_pending()
+        self.w.close()
+
+    def _tokens(self, svg: str, final: bool) -> None:
+        self._carry = []
+        for m in _TOKEN_RE.finditer(svg):
+            kind = m.lastgroup
+            if not final and (
+                kind == 'text' and m.end() == len(svg)
+                or kind == 'stray' and _PARTIAL_TOKEN_RE.match(svg, m.start())
+            ):
+                # May continue in the next piece
+                self._carry = [svg[m.start():]]
+                return
+            token = m.group()
+            if kind == 'start':
+                self.start(token)
+            elif kind == 'end':
+                self.end(token[2:].rstrip(' \t\r\n>'))
+            elif kind == 'text' or kind == 'stray':
+                self.text(token)
+            elif kind == 'cdata':
+                self.cdata(token[9:-3])
+            elif kind != 'comment':
+                if not self.skip:
+                    self._flush_pending()
+                    self.w.markup(re.sub(r'\s+>', '>', _WS_RE.sub(' ', token)))
+
+    def _flush_pending(self) -> None:
+        for tag, spaces in self.pending:
+            self.w.markup(tag)
+            for ws in spaces:
+                self.w.text(ws)
+        self.pending.clear()
+
+    def _dropped(self, name: str) -> bool:
+        return name in _DROPPED_ELEMENTS or name.split(':', 1)[0] in _EDITOR_PREFIXES and ':' in name
+
+    def start(self, token: str) -> None:
+        self_closing = token.endswith('/>')
+        name = _NAME_RE.match(token).group(1)
+        if self.skip or self._dropped(name):
+            if not self_closing:
+                self.skip += 1
+            return
+
+        parent = self.stack[-1]
+        attrs = self._attributes(name, token, len(name) + 1, len(token) - (2 if self_closing else 1), parent)
+        tag = '<' + name + ''.join(f' {a}' for a in attrs) + ('/>' if self_closing else '>')
+
+        if name == 'g':
+            if self_closing:
+                # An empty group draws nothing
+                return
+            self.pending.append((tag, []))
+        else:
+            self._flush_pending()
+            self.w.markup(tag)
+        if not self_closing:
+            self.stack.append(self._frame)
+
+    def _attributes(self, name: str, token: str, start: int, end: int, parent: _Frame) -> list:
+        # Scanned in place: slicing out the attribute source would copy a huge tag once more
+        raw = [m.groups('') for m in _ATTR_RE.finditer(token, start, end)]
+        inherited = parent.inherited
+        template = parent.template or name in _TEMPLATE_ELEMENTS
+        set_here = []
+        out = []
+        for attr, quoted in raw:
+            if ':' in attr:
+                prefix, _, local = attr.rpartition(':')
+                if prefix in _EDITOR_PREFIXES or prefix == 'xmlns' and local in _EDITOR_PREFIXES:
+                    continue
+            if not quoted:
+                out.append(attr)
+                continue
+            if quoted[0] in '"\'':
+                quote = quoted[0]
+                value = quoted[1:-1]
+            else:
+                quote = '"'
+                value = quoted
+            if attr in _DEFAULTABLE and self._is_default(attr, value, raw, inherited, template):
+                continue
+            if attr == 'id' and self.references is not None and value not in self.references:
+                continue
+            if attr in _TRACKED_PROPERTIES:
+                set_here.append(attr)
+            elif attr == 'style':
+                set_here.extend(p for p in _STYLE_PROP_RE.findall(value) if p in _TRACKED_PROPERTIES)
+            if attr == 'd':
+                value = self._value(attr, value, markers=self._has_markers(raw, inherited, template))
+            else:
+                value = self._value(attr, value)
+            out.append(f'{attr}={quote}{value}{quote}')
+        if set_here:
+            inherited = inherited | frozenset(set_here)
+        self._frame = _Frame(name, inherited, template)
+        return out
+
+    def _has_markers(self, raw: list, inherited: frozenset, template: bool) -> bool:
+        """Whether markers may be drawn on this element's path, set here, by an ancestor or by a stylesheet."""
+        if template or not _MARKER_PROPERTIES.isdisjoint(inherited | self.css_properties):
+            return True
+        for attr, quoted in raw:
+            if attr in _MARKER_PROPERTIES or attr == 'style' and 'marker' in quoted:
+                return True
+        return False
+
+    def _is_default(self, attr: str, value: str, raw: list, inherited: frozenset, template: bool) -> bool:
+        if attr in _INHERITED_DEFAULTS:
+            return (
+                value == _INHERITED_DEFAULTS[attr]
+                and attr not in inherited
+                and attr not in self.css_properties
+                and not template
+            )
+        if attr in _PLAIN_DEFAULTS:
+            return value == _PLAIN_DEFAULTS[attr]
+        if attr == 'rx' or attr == 'ry':
+            # rx="0" is only a default when ry doesn't make the auto value non-zero (and vice versa)
+            other = 'ry' if attr == 'rx' else 'rx'
+            return value == '0' and all(q.strip('"\'') == '0' for a, q in raw if a == other)
+        if attr == 'transform':
+            return _IDENTITY_TRANSFORM_RE.fullmatch(value) is not None
+        return False
+
+    def _value(self, attr: str, value: str, markers: bool = False) -> str:
+        if len(value) > _VALUE_CACHE_MAX_LENGTH:
+            return self._clean(attr, value, markers)
+        key = (attr, value, markers)
+        cached = self._values.get(key)
+        if cached is None:
+            cached = self._clean(attr, value, markers)
+            if len(self._values) >= _VALUE_CACHE_SIZE:
+                self._values.clear()
+            self._values[key] = cached
+        return cached
+
+    def _clean(self, attr: str, value: str, markers: bool) -> str:
+        value = _WS_RE.sub(' ', value)
+        if attr == 'd':
+            return self._css(value, path=True, markers=markers)
+        if attr not in _VERBATIM_ATTRIBUTES:
+            return self._css(value)
+        return value
+
+    def _css(self, value: str, path: bool = False, markers: bool = False) -> str:
+        """Colors (and, when aggressive, numbers and path data) in an attribute value or stylesheet."""
+        if path:
+            return optimize_path_data(value, self.precision, keep_zero_length=markers) if self.aggressive else value
+        if 'rgb(' in value:
+            value = RGB_COLOR_RE.sub(_rgb_to_hex, value)
+        if '#' in value:
+            value = HEX_COLOR_RE.sub(_shorten_hex, value)
+        if self.aggressive and '.' in value:
+            value = FLOAT_RE.sub(lambda m: round_number(m.group(), self.precision), value)
+        return value
+
+    def end(self, name: str) -> None:
+        if self.skip:
+            self.skip -= 1
+            return
+        if len(self.stack) > 1:
+            self.stack.pop()
+        if name == 'g' and self.pending:
+            # Nothing but whitespace since the group opened
+            self.pending.pop()
+            return
+        self._flush_pending()
+        self.w.markup(f'</{name}>')
+
+    def text(self, text: str) -> None:
+        if self.skip:
+            return
+        if self.pending and not text.strip(' \t\r\n'):
+            self.pending[-1][1].append(text)
+            return
+        self._flush_pending()
+        if self.stack[-1].name == 'style':
+            text = self._css(text)
+        self.w.text(text)
+
+    def cdata(self, content: str) -> None:
+        if self.skip:
+            return
+        self._flush_pending()
+        if self.stack[-1].name == 'style':
+            content = self._css(content)
+        self.w.markup(f'<![CDATA[{_WS_RE.sub(" ", content)}]]>')
+
+
+def _stylesheet_properties(svg: str) -> frozenset:
+    """Tracked properties (inheritable defaults, markers) mentioned by any <style> element."""
+    if '<style' not in svg:
+        return frozenset()
+    found = set()
+    for css in re.findall(r'<style[^>]*>(.*?)</style>', svg, re.DOTALL):
+        found.update(p for p in _STYLE_PROP_RE.findall(css) if p in _TRACKED_PROPERTIES)
+    return frozenset(found)
 
 
 def optimize_svg(
@@ -190,35 +797,132 @@ def optimize_svg(
     precision: int = 2,
     keep_ids: bool = False,
 ) -> str:
-    """Apply all optimizations to SVG."""
+    """Apply all optimizations to SVG.
+
+    Always: drop comments, metadata, editor markup and empty groups, drop
+    default-valued attributes, shorten colors and collapse whitespace.
+    Unless keep_ids: drop ids nothing references (see collect_references).
+    Aggressive: also round numbers, rewrite path data in its shortest form
+    (see optimize_path_data) and minify whitespace.
+    """
+    out = []
+    engine = _Engine(
+        _Writer(out.append, minify=aggressive),
+        aggressive,
+        precision,
+        _stylesheet_properties(svg),
+        None if keep_ids else collect_references(svg),
+    )
+    engine.feed(svg)
+    engine.close()
+    return ''.join(out)
+
+
+def _utf8_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode('utf-8'))
 
-    # Basic optimizations (always applied)
-    svg = remove_comments(svg)
-    svg = remove_metadata(svg)
-    svg = remove_empty_groups(svg)
-    svg = remove_default_attributes(svg)
-    svg = convert_colors_to_hex(svg)
-    svg = shorten_hex_colors(svg)
-    svg = collapse_whitespace(svg)
 
-    if not keep_ids:
-        svg = remove_unnecessary_ids(svg)
+def _complete_segments(chunks: Iterable[str]) -> Iterator[str]:
+    """Regroup chunks into segments that never split a tag, comment or <style> element."""
+    # Unfinished tail: pieces starting at a '<', and what closes it if it is a comment or <style>
+    tail = []
+    closer = None
+    # Last few characters of the tail, to find a closer split across chunks
+    recent = ''
+    for chunk in chunks:
+        if tail:
+            # Only look at new text: a huge element must not be rescanned on every chunk
+            if closer is None and '<' not in chunk or closer is not None and closer not in recent + chunk:
+                tail.append(chunk)
+                recent = (recent + chunk)[-8:]
+                continue
+            tail.append(chunk)
+            buf = ''.join(tail)
+        else:
+            buf = chunk
+        # Tags can't contain '<', so everything before the last one is whole tags and text
+        cut = buf.rfind('<')
+        if cut == -1:
+            cut = len(buf)
+        closer = None
+        comment = buf.rfind('<!--', 0, cut)
+        if comment != -1 and buf.find('-->', comment, cut) == -1:
+            cut, closer = comment, '-->'
+        style = buf.rfind('<style', 0, cut)
+        if style != -1 and buf.find('</style', style, cut) == -1:
+            cut, closer = style, '</style'
+        tail = [buf[cut:]] if cut < len(buf) else []
+        recent = buf[-8:]
+        yield buf[:cut]
+    yield ''.join(tail)
 
-    # Aggressive optimizations
-    if aggressive:
-        svg = round_numbers(svg, precision)
-        svg = simplify_path_commands(svg)
-        svg = minify_whitespace(svg)
 
-    return svg
+def optimize_svg_stream(
+    src: TextIO,
+    dst: TextIO,
+    aggressive: bool = False,
+    precision: int = 2,
+    keep_ids: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+) -> Tuple[int, int]:
+    """optimize_svg() for files too big to hold in memory; returns (input bytes, output bytes).
+
+    Reads ``src`` in chunks and writes to ``dst`` as it goes. Memory is a
+    few chunks plus several copies of the largest single element (its tag
+    and cleaned attribute values): flat for many small elements, but a
+    25 MB single <path> still peaks near 190 MB. Ids and stylesheet
+    properties come from a cheap first pass, so ``src`` is read twice;
+    unseekable input (stdin) is spooled to a temporary file first. The
+    output is identical to optimize_svg()'s.
+    """
+    if not src.seekable():
+        spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        shutil.copyfileobj(src, spool, chunk_size)
+        spool.seek(0)
+        src = spool
+
+    start = src.tell()
+    css_properties = set()
+    references = None if keep_ids else set()
+    for segment in _complete_segments(iter(lambda: src.read(chunk_size), '')):
+        css_properties.update(_stylesheet_properties(segment))
+        if references is not None:
+            references.update(collect_references(segment))
+    src.seek(start)
+
+    out = []
+    engine = _Engine(
+        _Writer(out.append, minify=aggressive),
+        aggressive,
+        precision,
+        frozenset(css_properties),
+        references,
+    )
+    read = written = 0
+    for chunk in iter(lambda: src.read(chunk_size), ''):
+        read += _utf8_len(chunk)
+        engine.feed(chunk)
+        text = ''.join(out)
+        out.clear()
+        written += _utf8_len(text)
+        dst.write(text)
+    engine.close()
+    text = ''.join(out)
+    written += _utf8_len(text)
+    dst.write(text)
+    return read, written
+
+
+def size_reduction(orig_size: int, opt_size: int) -> float:
+    """Percentage saved going from ``orig_size`` to ``opt_size`` bytes."""
+    return (1 - opt_size / orig_size) * 100 if orig_size > 0 else 0
 
 
 def get_size_stats(original: str, optimized: str) -> Tuple[int, int, float]:
     """Calculate size statistics."""
     orig_size = len(original.encode('utf-8'))
     opt_size = len(optimized.encode('utf-8'))
-    reduction = (1 - opt_size / orig_size) * 100 if orig_size > 0 else 0
-    return orig_size, opt_size, reduction
+    return orig_size, opt_size, size_reduction(orig_size, opt_size)
 
 
 def format_size(size: int) -> str:
@@ -231,11 +935,190 @@ def format_size(size: int) -> str:
         return f"{size / (1024 * 1024):.1f} MB"
 
 
+# --- Batch mode -------------------------------------------------------------
+#
+# Several inputs, directories or globs: every SVG found is optimized in a
+# process pool, into a mirrored tree (-o DIR) or in place. Results are cached
+# by content hash and options, so re-running over an unchanged tree only
+# reads and hashes the files.
+
+DEFAULT_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'optimize_svg', 'cache.json'
+)
+
+
+def is_glob(target: str) -> bool:
+    return any(c in target for c in '*?[') and not os.path.exists(target)
+
+
+def is_batch(targets: List[str]) -> bool:
+    """Whether ``targets`` need batch mode rather than the single-file path."""
+    return len(targets) > 1 or any(os.path.isdir(t) or is_glob(t) for t in targets)
+
+
+def find_svgs(targets: List[str]) -> List[Tuple[str, str]]:
+    """(file, root) for every SVG under ``targets``; mirrored output keeps the path below root."""
+    found = []
+    for target in targets:
+        if os.path.isdir(target):
+            for dirpath, dirnames, filenames in os.walk(target):
+                dirnames.sort()
+                found.extend((os.path.join(dirpath, f), target) for f in sorted(filenames) if f.lower().endswith('.svg'))
+        elif is_glob(target):
+            # Mirror below the directory part of the pattern before its first wildcard
+            root = os.path.dirname(re.split(r'[*?\[]', target, 1)[0]) or '.'
+            found.extend((f, root) for f in sorted(glob.glob(target, recursive=True)) if os.path.isfile(f))
+        else:
+            found.append((target, os.path.dirname(target) or '.'))
+
+    seen = set()
+    unique = []
+    for path, root in found:
+        real = os.path.realpath(path)
+        if real not in seen:
+            seen.add(real)
+            unique.append((path, root))
+    return unique
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _options_key(aggressive: bool, precision: int, keep_ids: bool) -> str:
+    # This script's own hash, so editing the optimizer invalidates old results
+    with open(os.path.abspath(__file__), 'rb') as f:
+        version = hashlib.sha256(f.read()).hexdigest()[:16]
+    return f'{version}:{int(aggressive)}:{precision}:{int(keep_ids)}'
+
+
+def load_cache(path: str) -> dict:
+    """Cache entries: "<input sha256>:<options>" -> [output sha256, input bytes, output bytes]."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: str, cache: dict) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def _optimize_file(job: tuple) -> Tuple[str, int, int, Optional[str], Optional[str]]:
+    """Pool worker: optimize one file; returns (src, input bytes, output bytes, output sha256, error)."""
+    src, dest, aggressive, precision, keep_ids, stream = job
+    try:
+        dest_dir = os.path.dirname(dest) or '.'
+        os.makedirs(dest_dir, exist_ok=True)
+        # Write beside the destination and rename, so an in-place run never leaves a half-written file
+        fd, tmp = tempfile.mkstemp(dir=dest_dir, prefix='.', suffix='.svg.tmp')
+        try:
+            with open(src, 'r', encoding='utf-8', newline='') as f_in, \
+                    os.fdopen(fd, 'w', encoding='utf-8', newline='') as f_out:
+                if stream:
+                    orig_size, opt_size = optimize_svg_stream(
+                        f_in, f_out, aggressive=aggressive, precision=precision, keep_ids=keep_ids
+                    )
+                else:
+                    svg = f_in.read()
+                    optimized = optimize_svg(svg, aggressive=aggressive, precision=precision, keep_ids=keep_ids)
+                    f_out.write(optimized)
+                    orig_size, opt_size, _ = get_size_stats(svg, optimized)
+            shutil.copymode(src, tmp)
+            os.replace(tmp, dest)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except (OSError, UnicodeDecodeError) as e:
+        return src, 0, 0, None, str(e)
+    return src, orig_size, opt_size, _file_sha256(dest), None
+
+
+def batch_optimize(
+    targets: List[str],
+    out_dir: Optional[str] = None,
+    aggressive: bool = False,
+    precision: int = 2,
+    keep_ids: bool = False,
+    stream: bool = False,
+    jobs: Optional[int] = None,
+    cache_path: Optional[str] = DEFAULT_CACHE,
+) -> dict:
+    """Optimize every SVG under ``targets`` into ``out_dir`` (mirrored) or, without it, in place.
+
+    Returns totals: files, optimized, cached, failed, orig_size, opt_size.
+    """
+    options = _options_key(aggressive, precision, keep_ids)
+    cache = load_cache(cache_path) if cache_path else {}
+    out_abs = os.path.abspath(out_dir) + os.sep if out_dir else None
+    totals = {'files': 0, 'optimized': 0, 'cached': 0, 'failed': 0, 'orig_size': 0, 'opt_size': 0}
+
+    todo = []
+    digests = {}
+    for src, root in find_svgs(targets):
+        if out_abs and os.path.abspath(src).startswith(out_abs):
+            # Output of an earlier run inside an input directory
+            continue
+        totals['files'] += 1
+        dest = os.path.join(out_dir, os.path.relpath(src, root)) if out_dir else src
+        digest = _file_sha256(src)
+        entry = cache.get(f'{digest}:{options}')
+        if entry and (digest if dest == src else _file_sha256(dest)) == entry[0]:
+            totals['cached'] += 1
+            totals['orig_size'] += entry[1]
+            totals['opt_size'] += entry[2]
+            continue
+        digests[src] = digest
+        todo.append((src, dest, aggressive, precision, keep_ids, stream))
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(todo) < 2:
+        results = map(_optimize_file, todo)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_optimize_file, todo, chunksize=max(1, len(todo) // (jobs * 8)))
+
+    try:
+        for src, orig_size, opt_size, out_digest, error in results:
+            if error:
+                print(f"ERROR: {src}: {error}", file=sys.stderr)
+                totals['failed'] += 1
+                continue
+            totals['optimized'] += 1
+            totals['orig_size'] += orig_size
+            totals['opt_size'] += opt_size
+            cache[f'{digests[src]}:{options}'] = [out_digest, orig_size, opt_size]
+            # Optimizing an already optimized file changes nothing, so an in-place
+            # re-run can skip the file it just wrote
+            cache[f'{out_digest}:{options}'] = [out_digest, opt_size, opt_size]
+    finally:
+        if pool:
+            pool.shutdown()
+
+    if cache_path and totals['optimized']:
+        save_cache(cache_path, cache)
+    return totals
+
+
 def main():
     parser = argparse.ArgumentParser(description="Optimize SVG files")
 
-    parser.add_argument("input", nargs="?", help="Input SVG file (or stdin if omitted)")
-    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("input", nargs="*",
+                       help="Input SVG file (or stdin if omitted); several files, directories or globs run a batch")
+    parser.add_argument("-o", "--output", help="Output file, or output directory for a batch (default: stdout)")
     parser.add_argument("--aggressive", action="store_true",
                        help="Apply aggressive optimizations (minification, path simplification)")
     parser.add_argument("--precision", type=int, default=2,
@@ -244,9 +1127,31 @@ def main():
                        help="Keep all IDs even if unreferenced")
     parser.add_argument("--stats", action="store_true",
                        help="Show size statistics")
+    parser.add_argument("--stream", action="store_true",
+                       help="Stream in chunks (for very large files); memory is a few chunks "
+                            "plus several times the largest single element")
+    parser.add_argument("--in-place", action="store_true",
+                       help="Batch: overwrite each input instead of writing to -o DIR")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                       help="Batch: worker processes (default: CPU count)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE,
+                       help=f"Batch: result cache file (default: {DEFAULT_CACHE})")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Batch: optimize every file even if unchanged since the last run")
 
     args = parser.parse_args()
 
+    if args.in_place or is_batch(args.input):
+        if args.in_place == bool(args.output):
+            parser.error("a batch needs exactly one of -o DIR or --in-place")
+        batch_main(args)
+        return
+    args.input = args.input[0] if args.input else None
+
+    if args.stream:
+        stream_main(args)
+        return
+
     # Read input
     if args.input:
         with open(args.input, 'r') as f:
@@ -273,11 +1178,68 @@ def main():
 
     # Stats
     if args.stats:
-        orig_size, opt_size, reduction = get_size_stats(svg, optimized)
-        print(f"\nOptimization Statistics:", file=sys.stderr)
-        print(f"  Original:  {format_size(orig_size)}", file=sys.stderr)
-        print(f"  Optimized: {format_size(opt_size)}", file=sys.stderr)
-        print(f"  Reduction: {reduction:.1f}%", file=sys.stderr)
+        print_stats(*get_size_stats(svg, optimized))
+
+
+def batch_main(args):
+    """main() for several inputs: optimize them in parallel and print totals."""
+    totals = batch_optimize(
+        args.input,
+        out_dir=args.output,
+        aggressive=args.aggressive,
+        precision=args.precision,
+        keep_ids=args.keep_ids,
+        stream=args.stream,
+        jobs=args.jobs,
+        cache_path=None if args.no_cache else args.cache,
+    )
+    print(
+        f"{totals['files']} files: {totals['optimized']} optimized, "
+        f"{totals['cached']} unchanged (cached), {totals['failed']} failed",
+        file=sys.stderr,
+    )
+    print_stats(totals['orig_size'], totals['opt_size'], size_reduction(totals['orig_size'], totals['opt_size']))
+    if totals['failed']:
+        sys.exit(1)
+
+
+def stream_main(args):
+    """main() for --stream: same outputs, without holding the document in memory."""
+    src = open(args.input, 'r') if args.input else sys.stdin
+    if args.output:
+        dst = open(args.output, 'w')
+    elif args.stats:
+        # Like the in-memory path, --stats without -o prints no SVG
+        dst = open(os.devnull, 'w')
+    else:
+        dst = sys.stdout
+    try:
+        orig_size, opt_size = optimize_svg_stream(
+            src,
+            dst,
+            aggressive=args.aggressive,
+            precision=args.precision,
+            keep_ids=args.keep_ids,
+        )
+        if dst is sys.stdout:
+            dst.write('\n')
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+    if args.output:
+        print(f"Optimized: {args.output}", file=sys.stderr)
+    if args.stats:
+        print_stats(orig_size, opt_size, size_reduction(orig_size, opt_size))
+
+
+def print_stats(orig_size: int, opt_size: int, reduction: float) -> None:
+    print(f"\nOptimization Statistics:", file=sys.stderr)
+    print(f"  Original:  {format_size(orig_size)}", file=sys.stderr)
+    print(f"  Optimized: {format_size(opt_size)}", file=sys.stderr)
+    print(f"  Reduction: {reduction:.1f}%", file=sys.stderr)
 
 
 if __name__ == "__main__":
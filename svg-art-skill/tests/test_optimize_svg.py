@@ -0,0 +1,196 @@
+"""Tests for scripts/optimize_svg.py.
+
+The single-pass engine replaced a chain of regex transforms. ``_legacy``
+below is that chain as it shipped, kept here as an oracle: on the
+generator output the two must agree, except where the engine fixes a
+known bug of the old chain (those cases are tested on their own).
+"""
+
+import io
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+sys.path.insert(0, SCRIPTS)
+
+import optimize_svg  # noqa: E402
+from optimize_svg import optimize_path_data, optimize_svg_stream  # noqa: E402
+
+# (generator script, arguments) for every fixture
+GENERATORS = [
+    ('generate_chart.py', ['--bar', '--data', '3,5,2,8']),
+    ('generate_chart.py', ['--pie', '--data', '3,5,2,8']),
+    ('generate_chart.py', ['--line', '--data', '3,5,2,8', '--show-points']),
+    ('generate_fractal.py', ['--tree', '--depth', '5']),
+    ('generate_fractal.py', ['--koch', '--depth', '3']),
+    ('generate_grid.py', ['-c', '5', '-r', '5', '--seed', '1', '--vary-hue']),
+    ('generate_icon.py', ['--icon', 'star']),
+    ('generate_particles.py', ['-n', '50', '--constellation', '--seed', '1']),
+    ('generate_radial.py', ['--spiral', '-n', '30']),
+    ('generate_wave.py', ['--layers', '3']),
+]
+
+EDGE_CASES = {
+    'style_ref': '<svg><style>#a { fill: red; }</style><rect id="a" width="1"/><rect id="b" width="1"/></svg>',
+    'begin_ref': '<svg><rect id="intro" width="1"><animate begin="intro.end+1s" attributeName="x"/></rect></svg>',
+    'rx_ry': '<svg><rect rx="0" ry="5" width="10" height="10"/><rect rx="0" ry="0" width="1" height="1"/></svg>',
+    'stroke_none': '<svg><g stroke="red"><rect stroke="none" width="1"/></g><rect stroke="none" width="1"/></svg>',
+    'gt_in_attr': '<svg><text data-rule="a > b" x="0">x &gt; y</text><g title=">"><rect width="1"/></g></svg>',
+    'comments': '<svg><!-- a <rect/> in a comment --><g>\n  <!-- only a comment -->\n</g><rect width="1"/></svg>',
+    'stray_lt': '<svg><text>a < b, a<b</text><a b="x"c/><!-- x > y --><style>p > a { fill: red; }</style></svg>',
+    'markers': (
+        '<svg><g marker-end="url(#m)"><path d="M0 0L0 0L10 10"/></g>'
+        '<path style="marker-mid: url(#m)" d="M0 0L5 5L5 5L10 10"/><path d="M0 0L0 0L10 10"/></svg>'
+    ),
+}
+
+
+# --- The regex chain optimize_svg() used to run ----------------------------
+
+def _legacy(svg, aggressive=False, precision=2, keep_ids=False):
+    svg = re.sub(r'<!--[\s\S]*?-->', '', svg)
+    svg = re.sub(r'<metadata[\s\S]*?</metadata>', '', svg, flags=re.IGNORECASE)
+    svg = re.sub(r'<sodipodi:[^>]*/?>', '', svg)
+    svg = re.sub(r'<inkscape:[^>]*/?>', '', svg)
+    svg = re.sub(r'\s+xmlns:(sodipodi|inkscape|dc|cc|rdf)="[^"]*"', '', svg)
+    prev = ''
+    while prev != svg:
+        prev = svg
+        svg = re.sub(r'<g[^>]*>\s*</g>', '', svg)
+    for attr, value in [
+        ('fill-opacity', '1'), ('stroke-opacity', '1'), ('opacity', '1'), ('stroke', 'none'),
+        ('stroke-width', '1'), ('fill-rule', 'nonzero'), ('clip-rule', 'nonzero'),
+        ('font-style', 'normal'), ('font-weight', 'normal'),
+    ]:
+        svg = re.sub(rf'\s+{attr}="{value}"', '', svg)
+    for attr in ('x', 'y', 'cx', 'cy', 'rx', 'ry'):
+        svg = re.sub(rf'\s+{attr}="0"(?=[\s/>])', '', svg)
+    svg = re.sub(r'\s+transform="(?:translate\(0[,\s]+0\)|translate\(0\)|rotate\(0\)|scale\(1\)|scale\(1[,\s]+1\))"',
+                 '', svg)
+    svg = optimize_svg.RGB_COLOR_RE.sub(optimize_svg._rgb_to_hex, svg)
+    svg = optimize_svg.HEX_COLOR_RE.sub(optimize_svg._shorten_hex, svg)
+    svg = re.sub(r'\s+', ' ', svg)
+    svg = re.sub(r'\s+/>', '/>', svg)
+    svg = re.sub(r'\s+>', '>', svg)
+    svg = re.sub(r'<\s+', '<', svg)
+    if not keep_ids:
+        refs = optimize_svg.collect_references(svg)
+        svg = re.sub(r'''\s+id=(["'])(.*?)\1''', lambda m: m.group() if m.group(2) in refs else '', svg)
+    if aggressive:
+        svg = optimize_svg.round_numbers(svg, precision)
+        svg = re.sub(r'(?<![\w:-])d="([^"]*)"', lambda m: f'd="{optimize_svg.simplify_path_data(m.group(1))}"', svg)
+        svg = re.sub(r'>\s+<', '><', svg)
+        svg = re.sub(r'\s+', ' ', svg).strip()
+    return svg
+
+
+def _geometry(d, precision=2):
+    """Absolute grid segments of ``d``, for comparing path data written in different forms."""
+    parsed = optimize_svg._parse_path(d)
+    segments = optimize_svg._drop_empty(optimize_svg._absolute_segments(parsed, 10 ** precision), False)
+    return [(cmd, tuple(a)) for cmd, a in segments]
+
+
+def _same_geometry(a, b, tolerance=2):
+    """Whether two segment lists match within ``tolerance`` grid units (relative rounding drifts)."""
+    return len(a) == len(b) and all(
+        ca == cb and len(pa) == len(pb) and all(abs(x - y) <= tolerance for x, y in zip(pa, pb))
+        for (ca, pa), (cb, pb) in zip(a, b)
+    )
+
+
+_D_RE = re.compile(r'(?<![\w:-])d="([^"]*)"')
+
+
+@pytest.fixture(scope='module')
+def fixtures(tmp_path_factory):
+    out = tmp_path_factory.mktemp('fixtures')
+    svgs = {}
+    for i, (script, args) in enumerate(GENERATORS):
+        path = out / f'{i}-{script[:-3]}.svg'
+        subprocess.run([sys.executable, os.path.join(SCRIPTS, script), *args, '-o', str(path)],
+                       check=True, capture_output=True)
+        svgs[path.name] = path.read_text(encoding='utf-8')
+    return svgs
+
+
+def test_basic_matches_legacy(fixtures):
+    for name, svg in fixtures.items():
+        # Legacy drops ids it can't see referenced (aria-labelledby); compare everything else
+        assert optimize_svg.optimize_svg(svg, keep_ids=True) == _legacy(svg, keep_ids=True), name
+
+
+def test_aggressive_matches_legacy_geometry(fixtures):
+    for name, svg in fixtures.items():
+        new = optimize_svg.optimize_svg(svg, aggressive=True, keep_ids=True)
+        old = _legacy(svg, aggressive=True, keep_ids=True)
+        # Path data is rewritten in its shortest form; everything around it is unchanged
+        assert _D_RE.sub('d=""', new) == _D_RE.sub('d=""', old), name
+        for d_new, d_old in zip(_D_RE.findall(new), _D_RE.findall(old)):
+            assert _same_geometry(_geometry(d_new), _geometry(d_old)), (name, d_new, d_old)
+
+
+def test_ids_referenced_from_style_and_timing_are_kept():
+    out = optimize_svg.optimize_svg(EDGE_CASES['style_ref'])
+    assert 'id="a"' in out and 'id="b"' not in out
+    assert 'id="intro"' in optimize_svg.optimize_svg(EDGE_CASES['begin_ref'])
+
+
+def test_rx_zero_kept_when_ry_set():
+    out = optimize_svg.optimize_svg(EDGE_CASES['rx_ry'])
+    assert '<rect rx="0" ry="5"' in out
+    assert '<rect width="1" height="1"/>' in out
+
+
+def test_stroke_none_kept_under_stroked_ancestor():
+    out = optimize_svg.optimize_svg(EDGE_CASES['stroke_none'])
+    assert '<g stroke="red"><rect stroke="none" width="1"/></g>' in out
+    assert out.endswith('<rect width="1"/></svg>')
+
+
+def test_gt_inside_attribute_values():
+    out = optimize_svg.optimize_svg(EDGE_CASES['gt_in_attr'])
+    assert '<text data-rule="a > b">x &gt; y</text>' in out
+    assert '<g title=">"><rect width="1"/></g>' in out
+
+
+def test_comment_only_group_is_dropped():
+    assert optimize_svg.optimize_svg(EDGE_CASES['comments'], aggressive=True) == '<svg><rect width="1"/></svg>'
+
+
+def test_path_data_shortest_form():
+    assert optimize_path_data('M 10.004 20 L 10 30 L 20 30 Z') == 'M10 20V30H20z'
+    assert optimize_path_data('M0 0 L0 0 L10 10') == 'M0 0 10 10'
+    assert optimize_path_data('M0 0 L0 0 L10 10', keep_zero_length=True) == 'M0 0H0L10 10'
+    # A lone zero-length segment is a dot with round caps
+    assert optimize_path_data('M5 5 L5 5') == 'M5 5H5'
+    # Malformed data (a missing coordinate) is only rounded and tightened
+    assert optimize_path_data('M 0 0 L 1.234') == 'M0 0L1.23'
+
+
+def test_zero_length_segments_kept_under_inherited_markers():
+    out = optimize_svg.optimize_svg(EDGE_CASES['markers'], aggressive=True)
+    assert '<g marker-end="url(#m)"><path d="M0 0H0L10 10"/></g>' in out
+    assert '<path style="marker-mid: url(#m)" d="M0 0 5 5H5l5 5"/>' in out
+    # No marker anywhere above this one: the zero-length segment goes
+    assert out.endswith('<path d="M0 0 10 10"/></svg>')
+
+    styled = '<svg><style>.a { marker-start: url(#m); }</style><path class="a" d="M0 0L0 0L10 10"/></svg>'
+    assert 'd="M0 0H0L10 10"' in optimize_svg.optimize_svg(styled, aggressive=True)
+
+
+def _stream(svg, chunk_size, **options):
+    dst = io.StringIO()
+    optimize_svg_stream(io.StringIO(svg), dst, chunk_size=chunk_size, **options)
+    return dst.getvalue()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 64])
+@pytest.mark.parametrize('aggressive', [False, True])
+def test_stream_matches_in_memory(fixtures, chunk_size, aggressive):
+    for name, svg in [*fixtures.items(), *EDGE_CASES.items()]:
+        assert _stream(svg, chunk_size, aggressive=aggressive) == optimize_svg.optimize_svg(svg, aggressive), name